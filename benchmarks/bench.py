@@ -0,0 +1,253 @@
+# benchmarks/bench.py
+# Reproducible micro/macro benchmarks: encoders, resonance kernel, ingest and full-scan search.
+#
+#   python -m benchmarks.bench --profile quick --out benchmarks/latest.json
+#   python -m benchmarks.bench --profile full --precision q8 --baseline benchmarks/baseline.json
+
+from __future__ import annotations
+from typing import Callable, Dict, List
+import argparse
+import hashlib
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+
+import numpy as np
+
+from encoders.char_wave import char_to_wave
+from encoders.embed_wave import EmbedWaveEncoder
+from encoders.factory import CharWaveEncoder
+from encoders.resonance import resonance_score
+from store.memory import MemoryStore
+
+PROFILES = {
+    "quick":    {"sizes": [1000, 10000],                    "N": [256, 512],  "K": [16, 128]},
+    "standard": {"sizes": [1000, 10000, 100000],            "N": [512, 1024], "K": [16, 128]},
+    "full":     {"sizes": [1000, 10000, 100000, 1000000],   "N": [512, 1024], "K": [16, 128]},
+}
+
+TEXT = ("the quick brown fox jumps over the lazy dog while complex waves resonate "
+        "across phase bins of a memory trace built from ordinary passage text")
+QUERY = "how do complex waves resonate in memory"
+
+
+class StubSentenceModel:
+    """
+    Offline stand-in for SentenceTransformer.encode(): a deterministic
+    Gaussian vector per text (seeded by its sha1), so the wave projection
+    is benchmarked without downloading or running a transformer.
+    """
+
+    def __init__(self, dim: int = 384):
+        self.dim = dim
+
+    def encode(self, sentences, batch_size: int = 32, convert_to_numpy: bool = True,
+               normalize_embeddings: bool = False, show_progress_bar: bool = False, **kwargs) -> np.ndarray:
+        if isinstance(sentences, str):
+            return self.encode([sentences], normalize_embeddings=normalize_embeddings)[0]
+        out = np.zeros((len(sentences), self.dim), dtype=np.float32)
+        for i, t in enumerate(sentences):
+            seed = int.from_bytes(hashlib.sha1(t.encode("utf-8")).digest()[:8], "little")
+            out[i] = np.random.default_rng(seed).standard_normal(self.dim)
+        if normalize_embeddings:
+            out /= np.linalg.norm(out, axis=1, keepdims=True)
+        return out
+
+
+def synthetic_store(n: int, N: int, precision: str = "exact", seed: int = 0) -> MemoryStore:
+    """
+    Store of n random traces (max-normalized magnitudes, uniform phases),
+    written straight into the columns: search cost does not depend on the
+    spectra, and encoding 1M passages would dominate the benchmark.
+    """
+    mem = MemoryStore(N=N, decay=0.0, encoder=CharWaveEncoder(N=N), precision=precision)
+    rng = np.random.default_rng(seed)
+    mem._reserve(n)
+    block = 16 * mem.doc_block
+    for d0 in range(0, n, block):
+        d1 = min(n, d0 + block)
+        mag = rng.random((d1 - d0, N), dtype=np.float32)
+        mag /= mag.max(axis=1, keepdims=True)
+        phasor = np.exp(1j * rng.uniform(-np.pi, np.pi, (d1 - d0, N))).astype(np.complex64)
+        mem._set_spectrum(slice(d0, d1), mag, phasor)
+    mem._strength[:n] = 1.0
+    mem.ids = [f"syn{i}" for i in range(n)]
+    mem.rows = {doc_id: i for i, doc_id in enumerate(mem.ids)}
+    mem.texts = [""] * n
+    mem._touch()
+    return mem
+
+
+def measure(fn: Callable[[], object], inner: int = 1, repeat: int = 20, budget_s: float = 2.0) -> Dict[str, float]:
+    """
+    Per-call latency in ms: one warm-up call, then up to `repeat` samples of
+    `inner` calls each (at least 3, fewer once budget_s is spent).
+    """
+    fn()
+    samples = []
+    start = time.perf_counter()
+    while len(samples) < repeat and (len(samples) < 3 or time.perf_counter() - start < budget_s):
+        t0 = time.perf_counter()
+        for _ in range(inner):
+            fn()
+        samples.append((time.perf_counter() - t0) * 1000.0 / inner)
+    a = np.array(samples)
+    return {"mean_ms": float(a.mean()), "p50_ms": float(np.percentile(a, 50)),
+            "p95_ms": float(np.percentile(a, 95)), "min_ms": float(a.min()), "samples": len(a)}
+
+
+# ---------- benchmarks ----------
+
+def bench_char_to_wave(N: int, repeat: int, budget_s: float) -> dict:
+    return measure(lambda: char_to_wave(TEXT, N=N), inner=50, repeat=repeat, budget_s=budget_s)
+
+
+def bench_embed_encode_text(N: int, repeat: int, budget_s: float) -> dict:
+    enc = EmbedWaveEncoder(N=N, model=StubSentenceModel())
+    return measure(lambda: enc.encode_text(TEXT), inner=50, repeat=repeat, budget_s=budget_s)
+
+
+def bench_resonance_score(N: int, K: int, repeat: int, budget_s: float) -> dict:
+    q, m = char_to_wave(QUERY, N=N), char_to_wave(TEXT, N=N)
+    return measure(lambda: resonance_score(q, m, K=K), inner=50, repeat=repeat, budget_s=budget_s)
+
+
+def bench_add_document(N: int, repeat: int, budget_s: float) -> dict:
+    mem = MemoryStore(N=N, encoder=CharWaveEncoder(N=N))
+    count = iter(range(1 << 62))
+    return measure(lambda: mem.add_document(f"d{next(count)}", TEXT), inner=20, repeat=repeat, budget_s=budget_s)
+
+
+def bench_search(mem: MemoryStore, K: int, topk: int, repeat: int, budget_s: float) -> dict:
+    out = measure(lambda: mem.search(QUERY, topk=topk, K=K, lam=1.0), repeat=repeat, budget_s=budget_s)
+    out["traces_per_s"] = len(mem) / (out["mean_ms"] / 1000.0)
+    return out
+
+
+def run_suite(sizes: List[int], Ns: List[int], Ks: List[int], precision: str = "exact", topk: int = 100,
+              repeat: int = 20, budget_s: float = 2.0, max_gb: float = 4.0) -> List[dict]:
+    results = []
+
+    def record(name: str, params: dict, stats: dict):
+        results.append({"name": name, "params": params, **stats})
+        print(f"{name:<22}{json.dumps(params):<66}p50={stats['p50_ms']:10.4f} ms  "
+              f"p95={stats['p95_ms']:10.4f} ms  (n={stats['samples']})", flush=True)
+
+    # ---- 1. Encoders, kernel and ingest (independent of store size) ----
+    for N in Ns:
+        record("char_to_wave", {"N": N}, bench_char_to_wave(N, repeat, budget_s))
+        record("embed_encode_text", {"N": N, "model": "stub-384"}, bench_embed_encode_text(N, repeat, budget_s))
+        for K in Ks:
+            record("resonance_score", {"N": N, "K": K}, bench_resonance_score(N, K, repeat, budget_s))
+        record("add_document", {"N": N, "encoder": "char"}, bench_add_document(N, repeat, budget_s))
+
+    # ---- 2. Full-scan search over synthetic stores ----
+    for N in Ns:
+        for n in sizes:
+            params = {"n": n, "N": N, "precision": precision}
+            need_gb = n * MemoryStore(N=N, precision=precision).bytes_per_trace() / 2**30
+            if need_gb > max_gb:
+                print(f"{'search':<22}{json.dumps(params):<66}skipped: needs {need_gb:.1f} GB > --max-gb {max_gb}")
+                results.append({"name": "search", "params": params, "skipped": f"needs {need_gb:.1f} GB"})
+                continue
+            t0 = time.perf_counter()
+            mem = synthetic_store(n, N, precision)
+            print(f"  built {n} synthetic traces (N={N}, {precision}) in {time.perf_counter() - t0:.1f}s", flush=True)
+            for K in Ks:
+                record("search", {**params, "K": K, "topk": topk}, bench_search(mem, K, topk, repeat, budget_s))
+            del mem
+    return results
+
+
+# ---------- results and baselines ----------
+
+def environment() -> dict:
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True,
+                                text=True, timeout=10).stdout.strip()
+    except Exception:
+        commit = ""
+    return {"python": platform.python_version(), "numpy": np.__version__, "machine": platform.machine(),
+            "processor": platform.processor(), "system": platform.system(), "cpus": os.cpu_count(),
+            "node": platform.node(), "commit": commit, "time": time.strftime("%Y-%m-%dT%H:%M:%S")}
+
+
+def result_key(r: dict) -> str:
+    return r["name"] + " " + json.dumps(r["params"], sort_keys=True)
+
+
+def compare(results: List[dict], baseline: dict, threshold: float) -> List[dict]:
+    """
+    Per benchmark present in both runs: p50 ratio against the baseline.
+    A ratio above 1 + threshold is a regression.
+    """
+    base = {result_key(r): r for r in baseline.get("results", []) if "p50_ms" in r}
+    rows = []
+    for r in results:
+        b = base.get(result_key(r))
+        if b is None or "p50_ms" not in r:
+            continue
+        ratio = r["p50_ms"] / max(b["p50_ms"], 1e-9)
+        rows.append({"key": result_key(r), "base_ms": b["p50_ms"], "p50_ms": r["p50_ms"], "ratio": ratio,
+                     "regression": ratio > 1.0 + threshold})
+    return rows
+
+
+def main():
+    ap = argparse.ArgumentParser("CWM benchmark suite")
+    ap.add_argument("--profile",    default="quick", choices=sorted(PROFILES))
+    ap.add_argument("--sizes",      type=int, nargs="+", default=None, help="synthetic store sizes (overrides profile)")
+    ap.add_argument("--N",          type=int, nargs="+", default=None, help="wave lengths (overrides profile)")
+    ap.add_argument("--K",          type=int, nargs="+", default=None, help="top-K bins (overrides profile)")
+    ap.add_argument("--precision",  default="exact", choices=["exact", "q16", "q8"])
+    ap.add_argument("--topk",       type=int, default=100)
+    ap.add_argument("--repeat",     type=int, default=20, help="max samples per benchmark")
+    ap.add_argument("--budget",     type=float, default=2.0, help="seconds per benchmark before sampling stops")
+    ap.add_argument("--max-gb",     type=float, default=4.0, help="skip stores larger than this")
+    ap.add_argument("--out",        default="benchmarks/latest.json")
+    ap.add_argument("--baseline",   default=None, help="baseline JSON to compare against")
+    ap.add_argument("--threshold",  type=float, default=0.25, help="allowed p50 slowdown vs baseline (0.25 = 25%%)")
+    ap.add_argument("--save-baseline", action="store_true", help="also write the results to --baseline")
+    args = ap.parse_args()
+
+    prof = PROFILES[args.profile]
+    sizes, Ns, Ks = args.sizes or prof["sizes"], args.N or prof["N"], args.K or prof["K"]
+    results = run_suite(sizes, Ns, Ks, args.precision, args.topk, args.repeat, args.budget, args.max_gb)
+    report = {"profile": args.profile, "environment": environment(), "results": results}
+
+    os.makedirs(os.path.dirname(os.path.abspath(args.out)), exist_ok=True)
+    with open(args.out, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+    print(f"\nWrote {len(results)} results to {args.out}")
+
+    if not args.baseline:
+        return
+    if args.save_baseline:
+        with open(args.baseline, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+        print(f"Saved baseline to {args.baseline}")
+        return
+
+    with open(args.baseline, "r", encoding="utf-8") as f:
+        baseline = json.load(f)
+    env, base_env = report["environment"], baseline.get("environment", {})
+    if any(env.get(k) != base_env.get(k) for k in ("node", "machine", "cpus")):
+        print(f"Warning: baseline was recorded on {base_env.get('node')} ({base_env.get('cpus')} cpus), "
+              f"not this machine; ratios compare hardware as well as code")
+
+    rows = compare(results, baseline, args.threshold)
+    print(f"\n{'benchmark':<80}{'base ms':>11}{'now ms':>11}{'ratio':>8}")
+    for r in rows:
+        flag = "  REGRESSION" if r["regression"] else ""
+        print(f"{r['key']:<80}{r['base_ms']:11.4f}{r['p50_ms']:11.4f}{r['ratio']:8.2f}{flag}")
+    bad = [r for r in rows if r["regression"]]
+    print(f"\n{len(rows)} compared, {len(bad)} slower than baseline by more than {args.threshold:.0%}")
+    if bad:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,119 @@
+# benchmarks/service_load.py
+# Closed-loop HTTP load against the search service (store/service.py), on localhost.
+#
+#   python -m benchmarks.service_load --url 127.0.0.1:8080 --concurrency 32 --requests 2000
+#   python -m benchmarks.service_load --inprocess --n 20000 --N 512   # batched vs one scan per request
+
+from __future__ import annotations
+from typing import List
+import argparse
+import asyncio
+import json
+import time
+
+import numpy as np
+
+
+async def _worker(host: str, port: int, queries: List[str], next_i, n_total: int, topk: int,
+                  latencies: List[float], errors: List[int]):
+    reader, writer = await asyncio.open_connection(host, port)
+    try:
+        while True:
+            i = next_i()
+            if i >= n_total:
+                break
+            body = json.dumps({"query": queries[i % len(queries)], "topk": topk}).encode("utf-8")
+            t0 = time.perf_counter()
+            writer.write(b"POST /search HTTP/1.1\r\nHost: x\r\nContent-Type: application/json\r\n"
+                         + f"Content-Length: {len(body)}\r\n\r\n".encode("latin-1") + body)
+            await writer.drain()
+            status = int((await reader.readline()).split()[1])
+            length = 0
+            while True:
+                h = await reader.readline()
+                if h in (b"\r\n", b""):
+                    break
+                if h.lower().startswith(b"content-length:"):
+                    length = int(h.split(b":", 1)[1])
+            await reader.readexactly(length)
+            latencies.append(time.perf_counter() - t0)
+            if status != 200:
+                errors.append(status)
+    finally:
+        writer.close()
+
+
+async def run_load(host: str, port: int, queries: List[str], concurrency: int, n_total: int,
+                   topk: int = 10) -> dict:
+    """n_total searches from `concurrency` keep-alive clients; QPS and latency percentiles."""
+    counter = iter(range(1 << 62))
+    latencies: List[float] = []
+    errors: List[int] = []
+    start = time.perf_counter()
+    await asyncio.gather(*[_worker(host, port, queries, lambda: next(counter), n_total, topk, latencies, errors)
+                           for _ in range(concurrency)])
+    elapsed = time.perf_counter() - start
+    lat = np.array(latencies) * 1000.0
+    return {"requests": len(lat), "errors": len(errors), "seconds": elapsed, "qps": len(lat) / elapsed,
+            "p50_ms": float(np.percentile(lat, 50)), "p95_ms": float(np.percentile(lat, 95)),
+            "p99_ms": float(np.percentile(lat, 99))}
+
+
+async def compare_inprocess(mem, queries: List[str], concurrency: int, n_total: int, window_ms: float,
+                            max_batch: int, topk: int, K: int, lam: float) -> List[dict]:
+    """Same store and load, unbatched (max_batch=1) vs micro-batched."""
+    from store.service import SearchService, SearchServer
+
+    rows = []
+    for label, window, batch in (("one scan per request", 0.0, 1), ("micro-batched", window_ms, max_batch)):
+        server = SearchServer(SearchService(mem, window_ms=window, max_batch=batch, topk=topk, K=K, lam=lam),
+                              port=0)
+        await server.start()
+        try:
+            res = await run_load(server.host, server.port, queries, concurrency, n_total, topk)
+            res["mean_batch"] = server.service.stats()["batch_size"]["mean"]
+        finally:
+            await server.stop()
+        rows.append({"mode": label, "window_ms": window, "max_batch": batch, **res})
+    return rows
+
+
+def main():
+    ap = argparse.ArgumentParser("CWM service load generator")
+    ap.add_argument("--url", default="127.0.0.1:8080", help="host:port of a running store.service")
+    ap.add_argument("--queries", default="data/queries.tsv")
+    ap.add_argument("--concurrency", type=int, default=32)
+    ap.add_argument("--requests", type=int, default=1000)
+    ap.add_argument("--topk", type=int, default=10)
+    ap.add_argument("--inprocess", action="store_true",
+                    help="Serve a synthetic store in this process and compare batched vs unbatched")
+    ap.add_argument("--n", type=int, default=20000, help="synthetic traces (--inprocess)")
+    ap.add_argument("--N", type=int, default=512)
+    ap.add_argument("--K", type=int, default=128)
+    ap.add_argument("--lam", type=float, default=1.0)
+    ap.add_argument("--window-ms", type=float, default=3.0)
+    ap.add_argument("--max-batch", type=int, default=64)
+    args = ap.parse_args()
+
+    from evaluation.runner import load_queries
+    queries = [q for _qid, q in load_queries(args.queries)]
+
+    if args.inprocess:
+        from benchmarks.bench import synthetic_store
+        mem = synthetic_store(args.n, args.N)
+        rows = asyncio.run(compare_inprocess(mem, queries, args.concurrency, args.requests, args.window_ms,
+                                             args.max_batch, args.topk, args.K, args.lam))
+        print(f"{args.n} traces, N={args.N}, K={args.K}, {args.concurrency} clients, {args.requests} requests")
+        print(f"{'mode':<24}{'QPS':>9}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}{'batch':>7}{'errors':>8}")
+        for r in rows:
+            print(f"{r['mode']:<24}{r['qps']:>9.1f}{r['p50_ms']:>9.1f}{r['p95_ms']:>9.1f}{r['p99_ms']:>9.1f}"
+                  f"{r['mean_batch']:>7.1f}{r['errors']:>8}")
+        return
+
+    host, port = args.url.rsplit(":", 1)
+    res = asyncio.run(run_load(host, int(port), queries, args.concurrency, args.requests, args.topk))
+    print(json.dumps(res, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,120 @@
+# benchmarks/startup.py
+# Cold-start budgets: import time of each entry point, from `python -X importtime`,
+# and a check that none of them pulls in the heavy optional stacks.
+#
+#   python -m benchmarks.startup
+#   python -m benchmarks.startup --repeat 5 --scale 2.0 --out benchmarks/startup.json
+
+from __future__ import annotations
+from typing import Dict, List, Tuple
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# name -> (python arguments, cumulative import budget in ms); {snap} is a small char snapshot
+ENTRY_POINTS: Dict[str, Tuple[List[str], float]] = {
+    "main.py info":      (["main.py", "--path", "{snap}", "info"], 400.0),
+    "main.py list":      (["main.py", "--path", "{snap}", "list"], 400.0),
+    "evaluation.runner": (["-c", "import evaluation.runner"],      500.0),
+    "evaluation.sweep":  (["-c", "import evaluation.sweep"],       500.0),
+    "store.service":     (["-c", "import store.service"],          400.0),
+    "store.shard":       (["-c", "import store.shard"],            500.0),
+    "benchmarks.bench":  (["-c", "import benchmarks.bench"],       400.0),
+}
+
+# Loaded only by the code paths that need them (embed encoder, FAISS shortlist)
+HEAVY = ("torch", "sentence_transformers", "transformers", "faiss")
+
+
+def parse_importtime(stderr: str) -> List[Tuple[str, int, int, int]]:
+    """(module, depth, self us, cumulative us) per line of -X importtime output."""
+    out = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:"):
+            continue
+        parts = line[len("import time:"):].split("|")
+        if len(parts) != 3 or not parts[0].strip().isdigit():
+            continue                                    # column header
+        name = parts[2][1:]
+        depth = (len(name) - len(name.lstrip(" "))) // 2
+        out.append((name.strip(), depth, int(parts[0]), int(parts[1])))
+    return out
+
+
+def measure(args: List[str], repeat: int = 3) -> dict:
+    """Fastest of `repeat` cold runs: total top-level import time, wall time, heavy modules seen."""
+    best = None
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        proc = subprocess.run([sys.executable, "-X", "importtime", *args], cwd=ROOT,
+                              capture_output=True, text=True)
+        wall = time.perf_counter() - t0
+        if proc.returncode != 0:
+            raise RuntimeError(f"{' '.join(args)} exited {proc.returncode}: {proc.stderr[-500:]}")
+        rows = parse_importtime(proc.stderr)
+        top = sorted((r for r in rows if r[1] == 0), key=lambda r: -r[3])
+        run = {"import_ms": sum(r[3] for r in top) / 1000.0, "wall_ms": 1000.0 * wall,
+               "modules": len(rows), "slowest": [[r[0], r[3] / 1000.0] for r in top[:3]],
+               "heavy": sorted({r[0] for r in rows if r[0].split(".")[0] in HEAVY})}
+        if best is None or run["import_ms"] < best["import_ms"]:
+            best = run
+    return best
+
+
+def small_snapshot(path: str):
+    """A few char-encoded traces, enough for info/list to read a real header and columns."""
+    from encoders.factory import make_encoder
+    from store.memory import MemoryStore
+
+    m = MemoryStore(N=256, encoder=make_encoder("char", N=256))
+    for i in range(8):
+        m.add_document(f"d{i}", f"startup benchmark passage number {i}")
+    m.save(path)
+
+
+def run(repeat: int = 3, scale: float = 1.0) -> List[dict]:
+    with tempfile.TemporaryDirectory() as tmp:
+        snap = os.path.join(tmp, "memory")
+        small_snapshot(snap)
+        results = []
+        for name, (args, budget_ms) in ENTRY_POINTS.items():
+            r = measure([a.format(snap=snap) for a in args], repeat)
+            r.update(entry=name, budget_ms=budget_ms * scale,
+                     ok=r["import_ms"] <= budget_ms * scale and not r["heavy"])
+            results.append(r)
+    return results
+
+
+def main():
+    ap = argparse.ArgumentParser("CWM startup-time budgets")
+    ap.add_argument("--repeat", type=int, default=3, help="cold runs per entry point (fastest counts)")
+    ap.add_argument("--scale",  type=float, default=1.0, help="multiply every budget (slow machines, CI)")
+    ap.add_argument("--out",    default=None, help="also write the results as JSON")
+    args = ap.parse_args()
+
+    results = run(args.repeat, args.scale)
+    print(f"{'entry point':<20}{'import ms':>10}{'budget':>8}{'wall ms':>9}{'modules':>9}  slowest top-level imports")
+    for r in results:
+        slowest = ", ".join(f"{m} {ms:.0f}" for m, ms in r["slowest"])
+        flag = "" if r["ok"] else "  <-- OVER" if not r["heavy"] else f"  <-- loads {', '.join(r['heavy'])}"
+        print(f"{r['entry']:<20}{r['import_ms']:>10.1f}{r['budget_ms']:>8.0f}{r['wall_ms']:>9.1f}"
+              f"{r['modules']:>9}  {slowest}{flag}")
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            json.dump({"python": sys.version.split()[0], "results": results}, f, indent=2)
+
+    failed = [r["entry"] for r in results if not r["ok"]]
+    if failed:
+        print(f"Startup budget exceeded: {', '.join(failed)}")
+        sys.exit(1)
+    print("All entry points within their startup budgets.")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,38 +1,67 @@
 # encoders/char_wave.py
 # Step 4: simple character-to-wave encoder
 
+from functools import lru_cache
+from typing import List
 import numpy as np
 
+N_BINS = 64
+
 def base_freq(ch: str) -> int:
     """
     Deterministic mapping from character -> frequency bin.
     Uses ASCII code as a simple base.
     """
-    return ord(ch) % 64 + 1  # keeps it small and stable
+    return ord(ch) % N_BINS + 1  # keeps it small and stable
 
-def char_to_wave(text: str, N: int = 1024) -> np.ndarray:
+@lru_cache(maxsize=8)
+def _basis(N: int) -> np.ndarray:
     """
-    Encode text into a complex-valued waveform of length N.
+    (N_BINS + 1, N) complex sinusoids exp(2j*pi*f*n/N), with the Hann window
+    folded in. Row f is the windowed tone of frequency bin f (row 0 unused).
     """
-    wave = np.zeros(N, dtype=np.complex64)
-    text = text.lower().strip()
+    f = np.arange(N_BINS + 1, dtype=np.float64)
+    n = np.arange(N, dtype=np.float64)
+    return np.exp(2j * np.pi * np.outer(f, n) / N) * np.hanning(N)
 
-    for i, ch in enumerate(text):
-        f = base_freq(ch)
-        phi = np.pi * i / max(1, len(text))  # gentle phase progression
-        for n in range(N):
-            wave[n] += np.exp(1j * (2 * np.pi * f * n / N + phi))
+def _char_coeffs(text: str) -> np.ndarray:
+    """
+    Per-bin complex weight of a text: sum of exp(i*phi) over the characters
+    that map to each bin, phi = pi * i / len(text) as in the sample loop.
+    """
+    text = text.lower().strip()
+    codes = np.frombuffer(text.encode("utf-32-le"), dtype=np.uint32)
+    bins = codes % N_BINS + 1
+    phi = np.pi * np.arange(len(codes)) / max(1, len(codes))  # gentle phase progression
+    re = np.bincount(bins, weights=np.cos(phi), minlength=N_BINS + 1)
+    im = np.bincount(bins, weights=np.sin(phi), minlength=N_BINS + 1)
+    return re + 1j * im
 
-    # Hann window to reduce leakage
-    hann = np.hanning(N)
-    wave = wave * hann
+def char_to_waves(texts: List[str], N: int = 1024) -> np.ndarray:
+    """
+    Encode a batch of texts into (B, N) complex waveforms.
+    Each wave is a sum of sinusoids at the characters' bins, so it is the
+    per-bin weights times a precomputed (windowed) basis. einsum keeps every
+    row bitwise independent of batch size, so this matches char_to_wave.
+    Only bins near the N_BINS character tones carry signal; the rest hold
+    float64 rounding noise, not the per-sample complex64 noise of the
+    original loop, so scores with K past the signal bins differ from it.
+    """
+    C = np.stack([_char_coeffs(t) for t in texts]) if len(texts) else np.zeros((0, N_BINS + 1))
+    waves = np.einsum("bf,fn->bn", C, _basis(N))
 
     # Normalize to unit length
-    norm = np.linalg.norm(wave)
-    if norm > 0:
-        wave = wave / norm
+    for w in waves:
+        norm = np.linalg.norm(w)
+        if norm > 0:
+            w /= norm
+    return waves
 
-    return wave
+def char_to_wave(text: str, N: int = 1024) -> np.ndarray:
+    """
+    Encode text into a complex-valued waveform of length N.
+    """
+    return char_to_waves([text], N=N)[0]
 
 if __name__ == "__main__":
     w = char_to_wave("Hello CWM", N=64)
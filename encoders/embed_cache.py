@@ -0,0 +1,148 @@
+# encoders/embed_cache.py
+# Content-addressed sentence-embedding cache: (model name, text hash) -> float32 row.
+
+from __future__ import annotations
+from pathlib import Path
+from typing import Dict, List
+import hashlib
+import json
+import os
+import re
+import threading
+
+import numpy as np
+
+EMBS = "embs.f32"
+KEYS = "keys.txt"
+META = "meta.json"
+_KEY_BYTES = 41          # sha1 hex digest + "\n"
+
+
+def text_key(text: str) -> str:
+    return hashlib.sha1(text.encode("utf-8")).hexdigest()
+
+
+class EmbeddingCache:
+    """
+    Append-only embedding store for one model, in its own directory:
+
+        embs.f32   (count, dim) raw float32 rows, memory-mapped for reads
+        keys.txt   one sha1 text hash per row
+        meta.json  model, dim, count; written last, so "count" commits rows
+
+    Rows past the committed count (an interrupted append) are truncated
+    away on the next append. Meant for one writer at a time.
+    """
+
+    def __init__(self, root: str, model_name: str):
+        self.model_name = model_name
+        self.dir = Path(root) / re.sub(r"[^A-Za-z0-9._-]+", "_", model_name)
+        self.dim = 0
+        self.count = 0
+        self.rows: Dict[str, int] = {}
+        self._mm = None
+        meta_path = self.dir / META
+        if meta_path.exists():
+            with open(meta_path, "r", encoding="utf-8") as f:
+                meta = json.load(f)
+            if meta.get("model") != model_name:
+                raise ValueError(f"{self.dir} caches {meta.get('model')!r}, not {model_name!r}")
+            self.dim, self.count = int(meta["dim"]), int(meta["count"])
+            with open(self.dir / KEYS, "r", encoding="utf-8") as f:
+                for row in range(self.count):
+                    self.rows[f.readline().rstrip("\n")] = row
+            self._map()
+
+    def __len__(self):
+        return self.count
+
+    def _map(self):
+        self._mm = (np.memmap(self.dir / EMBS, dtype=np.float32, mode="r", shape=(self.count, self.dim))
+                    if self.count else None)
+
+    def get(self, rows: np.ndarray) -> np.ndarray:
+        return np.array(self._mm[rows], dtype=np.float32)
+
+    def append(self, keys: List[str], embs: np.ndarray):
+        embs = np.ascontiguousarray(embs, dtype=np.float32)
+        if len(keys) == 0:
+            return
+        if self.dim and embs.shape[1] != self.dim:
+            raise ValueError(f"embedding dim {embs.shape[1]} != cached dim {self.dim}")
+        self.dim = embs.shape[1]
+        self.dir.mkdir(parents=True, exist_ok=True)
+        self._mm = None                       # release the mapping before growing the file
+
+        for name, size, data in ((EMBS, self.count * self.dim * 4, embs.tobytes()),
+                                 (KEYS, self.count * _KEY_BYTES, "".join(k + "\n" for k in keys).encode("ascii"))):
+            with open(self.dir / name, "ab") as f:
+                f.truncate(size)
+                f.write(data)
+                f.flush()
+                os.fsync(f.fileno())
+
+        for k in keys:
+            self.rows[k] = self.count
+            self.count += 1
+        tmp = self.dir / (META + ".tmp")
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump({"model": self.model_name, "dim": self.dim, "count": self.count}, f)
+        os.replace(tmp, self.dir / META)
+        self._map()
+
+
+class CachedSentenceModel:
+    """
+    Stand-in for SentenceTransformer.encode() that reads through an
+    EmbeddingCache. The transformer is only loaded when a text misses, so
+    runs over cached collections and queries never touch it. Safe to share
+    between threads: model calls run unlocked, cache reads/appends locked.
+    """
+
+    def __init__(self, model_name: str, device: str | None = None, cache_dir: str = "data/emb_cache"):
+        self.model_name = model_name
+        self.device = device
+        self.cache = EmbeddingCache(cache_dir, model_name)
+        self._model = None
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    @property
+    def model(self):
+        with self._lock:
+            if self._model is None:
+                from sentence_transformers import SentenceTransformer
+                self._model = SentenceTransformer(self.model_name, device=self.device)
+        return self._model
+
+    def encode(self, sentences, batch_size: int = 32, convert_to_numpy: bool = True,
+               normalize_embeddings: bool = False, show_progress_bar: bool = False, **kwargs) -> np.ndarray:
+        if isinstance(sentences, str):
+            return self.encode([sentences], batch_size, convert_to_numpy, normalize_embeddings)[0]
+        sentences = list(sentences)
+        keys = [text_key(t) for t in sentences]
+
+        # ---- 1. Embed texts not in the cache (each distinct text once) ----
+        with self._lock:
+            todo: Dict[str, str] = {}
+            for k, t in zip(keys, sentences):
+                if k not in self.cache.rows and k not in todo:
+                    todo[k] = t
+            self.misses += len(todo)
+            self.hits += len(sentences) - len(todo)
+        if todo:
+            embs = self.model.encode(list(todo.values()), batch_size=batch_size, convert_to_numpy=True,
+                                     normalize_embeddings=False, show_progress_bar=show_progress_bar)
+            with self._lock:
+                fresh = [i for i, k in enumerate(todo) if k not in self.cache.rows]
+                self.cache.append([list(todo)[i] for i in fresh], embs[fresh])
+
+        # ---- 2. Gather rows in input order ----
+        if not sentences:
+            return np.zeros((0, self.cache.dim), dtype=np.float32)
+        with self._lock:
+            out = self.cache.get(np.array([self.cache.rows[k] for k in keys], dtype=np.int64))
+        if normalize_embeddings:
+            out /= np.maximum(np.linalg.norm(out, axis=1, keepdims=True), 1e-12)
+        return out
@@ -2,18 +2,24 @@
 from __future__ import annotations
 from typing import Optional
 import numpy as np
-from .char_wave import char_to_wave
+from .char_wave import char_to_wave, char_to_waves
 
 class CharWaveEncoder:
+    name = "char"
+
     def __init__(self, N: int = 1024):
         self.N = int(N)
     def encode_text(self, text: str) -> np.ndarray:
         return char_to_wave(text, N=self.N)
+    def encode_batch(self, texts) -> np.ndarray:
+        return char_to_waves(list(texts), N=self.N)
 
 def make_encoder(name: str = "char",
                  N: int = 1024,
                  model_name: Optional[str] = "all-MiniLM-L6-v2",
-                 device: Optional[str] = None):
+                 device: Optional[str] = None,
+                 cache_dir: Optional[str] = None,
+                 direct_spectra: bool = False):
     key = (name or "char").lower()
     if key in ("char", "char_wave"):
         return CharWaveEncoder(N=N)
@@ -26,5 +32,20 @@ def make_encoder(name: str = "char",
                 "Embed encoder requested but 'sentence-transformers' is not available. "
                 "Install it with: pip install sentence-transformers"
             ) from e
-        return EmbedWaveEncoder(model_name=model_name, N=N, device=device)
+        return EmbedWaveEncoder(model_name=model_name, N=N, device=device, cache_dir=cache_dir,
+                                direct_spectra=direct_spectra)
     raise ValueError(f"Unknown encoder: {name}")
+
+
+def encoder_identity(enc) -> dict:
+    """
+    Minimal description of an encoder, stored in snapshot headers so a store
+    is never reattached to an encoder that produced different traces.
+    """
+    if enc is None:
+        return {}
+    ident = {"name": getattr(enc, "name", type(enc).__name__), "N": int(getattr(enc, "N", 0))}
+    model_name = getattr(enc, "model_name", None)
+    if model_name:
+        ident["model"] = model_name
+    return ident
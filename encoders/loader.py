@@ -3,19 +3,27 @@
 
 from pathlib import Path
 
+def iter_corpus(collection_path: str, offset: int = 0):
+    """
+    Stream a TSV file (doc_id<TAB>text per line) from a byte offset.
+    Yields (doc_id, text, next_offset); next_offset is where reading resumes
+    after this line, so callers can checkpoint it.
+    """
+    with open(collection_path, "rb") as f:
+        f.seek(offset)
+        for raw in f:
+            offset += len(raw)
+            parts = raw.decode("utf-8").strip().split("\t")
+            if len(parts) == 2:
+                doc_id, text = parts
+                yield doc_id, text, offset
+
 def load_corpus(collection_path: str):
     """
     Loads a TSV file where each line is: doc_id<TAB>text
     Returns: list of (doc_id, text)
     """
-    docs = []
-    with open(collection_path, "r", encoding="utf-8") as f:
-        for line in f:
-            parts = line.strip().split("\t")
-            if len(parts) == 2:
-                doc_id, text = parts
-                docs.append((doc_id, text))
-    return docs
+    return [(doc_id, text) for doc_id, text, _offset in iter_corpus(collection_path)]
 
 if __name__ == "__main__":
     # Make a tiny dummy file first if none exists
@@ -34,6 +34,82 @@ def resonance_score(q_wave: np.ndarray, m_wave: np.ndarray, K: int = 16, lam: fl
 
     return float(mag_term + lam * phase_term)
 
+
+# ---------- precomputed spectra ----------
+
+def spectra(waves: np.ndarray):
+    """
+    Precompute the resonance view of one wave (N,) or a block of waves (B, N).
+    Returns (mag, phasor): max-normalized FFT magnitude (float32) and unit
+    phasor exp(i*angle) (complex64), exactly as resonance_score derives them.
+    """
+    F = np.fft.fft(np.asarray(waves), axis=-1)
+    mag = np.abs(F)
+    mag = mag / (mag.max(axis=-1, keepdims=True) + 1e-8)
+    phasor = np.exp(1j * np.angle(F))
+    return mag.astype(np.float32), phasor.astype(np.complex64)
+
+
+def query_bins(q_wave: np.ndarray, K: int = 16):
+    """
+    FFT the query once and pick its top-K bins.
+    Returns (idx, q_mag[idx], q_phasor[idx]).
+    """
+    q_mag, q_phasor = spectra(q_wave)
+    idx = np.argsort(q_mag)[-K:]
+    return idx, q_mag[idx], q_phasor[idx]
+
+
+def gathered_terms(idx: np.ndarray, q_mag: np.ndarray, q_phc: np.ndarray,
+                   mags: np.ndarray, phasors: np.ndarray):
+    """
+    resonance_terms() for one query given as its top-K bins (q_phc is the
+    conjugate phasor): only the K gathered columns of the tile are read,
+    which beats the dense N-wide product while K is well below N.
+    """
+    return mags[:, idx] @ q_mag, (phasors[:, idx] @ q_phc).real
+
+
+def query_weights(q_waves: np.ndarray, K: int = 16):
+    """
+    Dense per-query weights for block scoring: (Q, N) matrices holding each
+    query's normalized magnitude and conjugate phasor on its top-K bins and
+    zero elsewhere, so a plain matrix product sums over exactly those bins.
+    """
+    # FFT each query on its own: batched FFTs may round differently, and the
+    # weights must not depend on which block a query arrived in
+    q_waves = np.atleast_2d(q_waves)
+    q_mag = np.empty(q_waves.shape, dtype=np.float32)
+    q_phasor = np.empty(q_waves.shape, dtype=np.complex64)
+    for j, q in enumerate(q_waves):
+        q_mag[j], q_phasor[j] = spectra(q)
+    idx = np.argsort(q_mag, axis=-1)[:, -K:]
+    w_mag = np.zeros_like(q_mag)
+    w_phc = np.zeros_like(q_phasor)
+    np.put_along_axis(w_mag, idx, np.take_along_axis(q_mag, idx, axis=-1), axis=-1)
+    np.put_along_axis(w_phc, idx, np.conj(np.take_along_axis(q_phasor, idx, axis=-1)), axis=-1)
+    return w_mag, w_phc
+
+
+def resonance_terms(w_mag: np.ndarray, w_phc: np.ndarray, mags: np.ndarray, phasors: np.ndarray):
+    """
+    Magnitude and phase terms of resonance_block(), before lam combines them:
+    a score for any lam is mag_term + lam * phase_term.
+    """
+    return mags @ w_mag.T, (phasors @ w_phc.T).real
+
+
+def resonance_block(w_mag: np.ndarray, w_phc: np.ndarray,
+                    mags: np.ndarray, phasors: np.ndarray, lam: float = 0.5) -> np.ndarray:
+    """
+    Score a tile of documents (n, N) against weights from query_weights():
+    one query (N,) -> (n,) scores, or a query tile (Q, N) -> (n, Q).
+    Re(conj(m) * q) == Re(m * conj(q)), so the document tile is never conjugated.
+    """
+    mag_term, phase_term = resonance_terms(w_mag, w_phc, mags, phasors)
+    return mag_term + lam * phase_term
+
+
 if __name__ == "__main__":
     from char_wave import char_to_wave
 
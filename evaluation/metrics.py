@@ -1,7 +1,7 @@
 from typing import Dict, List, Tuple
 import math
 
-__all__ = ["mrr_at_10", "ndcg_at_10", "recall_at_k"]
+__all__ = ["mrr_at_10", "ndcg_at_10", "recall_at_k", "overlap_at_k"]
 
 def mrr_at_10(ranked: Dict[str, List[Tuple[str, float]]],
               qrels: Dict[str, Dict[str, int]]) -> float:
@@ -43,3 +43,16 @@ def recall_at_k(ranked: Dict[str, List[Tuple[str, float]]],
         total += len(relevant & retrieved) / len(relevant)
         count += 1
     return total / count if count else 0.0
+
+def overlap_at_k(ranked: Dict[str, List[Tuple[str, float]]],
+                 reference: Dict[str, List[Tuple[str, float]]], k: int = 10) -> float:
+    """Mean |top-k ∩ reference top-k| / k: recall of an approximate ranking against an exact one."""
+    total, count = 0.0, 0
+    for qid, ref in reference.items():
+        expected = {doc_id for doc_id, _ in ref[:k]}
+        if not expected:
+            continue
+        got = {doc_id for doc_id, _ in ranked.get(qid, [])[:k]}
+        total += len(expected & got) / len(expected)
+        count += 1
+    return total / count if count else 0.0
@@ -0,0 +1,67 @@
+# evaluation/precision_report.py
+# Compare compact trace precisions against the exact complex64 path on one corpus.
+
+from __future__ import annotations
+from typing import Dict, List
+import argparse
+import time
+
+import evaluation.metrics as metrics
+from evaluation.runner import load_collection, load_queries, load_qrels, build_memory, run_search
+
+
+def precision_report(mem, queries, qrels, topk: int, K: int, lam: float,
+                     precisions=("exact", "q16", "q8")) -> List[Dict[str, float]]:
+    """
+    Re-code one exact store at each precision (no re-encoding) and evaluate it.
+    Deltas are relative to the exact row.
+    """
+    rows = []
+    for p in precisions:
+        m = mem if p == mem.precision else mem.quantized(p)
+        start = time.time()
+        ranked, lat = run_search(m, queries, topk=topk, K=K, lam=lam)
+        rows.append({
+            "precision": p,
+            "bytes_per_trace": m.bytes_per_trace(),
+            "mrr@10": metrics.mrr_at_10(ranked, qrels),
+            "ndcg@10": metrics.ndcg_at_10(ranked, qrels),
+            "recall@100": metrics.recall_at_k(ranked, qrels, k=100),
+            "p50_ms": lat["p50"],
+            "wall_s": time.time() - start,
+        })
+    base = rows[0]
+    for r in rows:
+        r["d_mrr@10"] = r["mrr@10"] - base["mrr@10"]
+        r["d_ndcg@10"] = r["ndcg@10"] - base["ndcg@10"]
+    return rows
+
+
+def main():
+    ap = argparse.ArgumentParser("CWM precision report")
+    ap.add_argument("--collection", default="data/collection.tsv")
+    ap.add_argument("--queries",    default="data/queries.tsv")
+    ap.add_argument("--qrels",      default="data/qrels.txt")
+    ap.add_argument("--encoder",    default="char", choices=["char", "embed"])
+    ap.add_argument("--model",      default="all-MiniLM-L6-v2")
+    ap.add_argument("--device",     default=None)
+    ap.add_argument("--N",          type=int, default=512)
+    ap.add_argument("--topk",       type=int, default=100)
+    ap.add_argument("--K",          type=int, default=128)
+    ap.add_argument("--lam",        type=float, default=1.0)
+    args = ap.parse_args()
+
+    docs    = load_collection(args.collection)
+    queries = load_queries(args.queries)
+    qrels   = load_qrels(args.qrels)
+    mem = build_memory(docs, args.encoder, args.N, 0.10, 0.0, args.model, args.device)
+
+    rows = precision_report(mem, queries, qrels, args.topk, args.K, args.lam)
+    print(f"{'precision':<10}{'B/trace':>9}{'MRR@10':>9}{'dMRR':>9}{'nDCG@10':>9}{'dnDCG':>9}{'R@100':>8}{'p50 ms':>9}")
+    for r in rows:
+        print(f"{r['precision']:<10}{r['bytes_per_trace']:>9d}{r['mrr@10']:>9.4f}{r['d_mrr@10']:>+9.4f}"
+              f"{r['ndcg@10']:>9.4f}{r['d_ndcg@10']:>+9.4f}{r['recall@100']:>8.4f}{r['p50_ms']:>9.2f}")
+
+
+if __name__ == "__main__":
+    main()
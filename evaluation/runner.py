@@ -4,6 +4,7 @@
 from __future__ import annotations
 from typing import Dict, List, Tuple
 import argparse
+import os
 import time
 import numpy as np
 from tqdm import tqdm
@@ -11,32 +12,42 @@ from tqdm import tqdm
 
 # local modules
 from store.memory import MemoryStore
+from store.textstore import read_tsv
 from encoders.factory import make_encoder
 import evaluation.metrics as metrics  # mrr_at_10, ndcg_at_10, recall_at_k
 
-# optional: FAISS + SentenceTransformers for shortlist
-import faiss
-from sentence_transformers import SentenceTransformer
+# sentence-transformers (torch) and FAISS are imported only on the paths that use them:
+# the embed encoder (encoders.embed_wave) and the shortlist (evaluation.shortlist)
 
 
 # ---------- loaders ----------
 
-def load_collection(path: str) -> List[Tuple[str, str]]:
-    out = []
-    with open(path, "r", encoding="utf-8-sig") as f:
-        for line in f:
-            line = line.strip()
-            if not line:
-                continue
-            if "\t" in line:
-                doc_id, text = line.split("\t", 1)
-            else:
-                parts = line.split(None, 1)
-                if len(parts) != 2:
-                    continue
-                doc_id, text = parts
-            out.append((doc_id, text))
-    return out
+class Collection:
+    """
+    (doc_id, text) pairs of a collection TSV. Doc ids are held in RAM; texts
+    stay in the memory-mapped file (store.textstore.TextStore) and are
+    decoded per item, so a slice costs only the texts it returns.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self.ids, self.texts = read_tsv(path)
+
+    def __len__(self):
+        return len(self.ids)
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            return [(self.ids[j], self.texts[j]) for j in range(*i.indices(len(self.ids)))]
+        return self.ids[i], self.texts[i]
+
+    def __iter__(self):
+        for i in range(len(self.ids)):
+            yield self.ids[i], self.texts[i]
+
+
+def load_collection(path: str) -> Collection:
+    return Collection(path)
 
 
 def load_queries(path: str) -> List[Tuple[str, str]]:
@@ -89,58 +100,186 @@ def build_memory(docs: List[Tuple[str, str]],
                  eta: float,
                  decay: float,
                  model_name: str | None,
-                 device: str | None) -> MemoryStore:
-    enc = make_encoder(name=encoder_name, N=N, model_name=model_name, device=device)
-    mem = MemoryStore(N=N, eta=eta, decay=decay, encoder=enc)
-    for doc_id, text in docs:
-        mem.add_document(doc_id, text, strength=1.0)
+                 device: str | None,
+                 precision: str = "exact",
+                 batch_size: int = 256,
+                 emb_cache: str | None = None,
+                 workers: int = 0,
+                 direct_spectra: bool = False,
+                 K: int = 128) -> MemoryStore:
+    enc = make_encoder(name=encoder_name, N=N, model_name=model_name, device=device, cache_dir=emb_cache,
+                       direct_spectra=direct_spectra)
+    if getattr(enc, "direct_spectra", False):
+        # traces skip the FFT but queries do not: check that both agree on this K
+        from encoders.embed_wave import check_direct_spectra
+        check = check_direct_spectra(enc, [text for _id, text in docs[:64]], K=min(K, N))
+        print(f"Direct spectra vs FFT on {min(64, len(docs))} docs: max |mag| err {check['max_mag_err']:.2e}, "
+              f"max phase err on top-{min(K, N)} bins {check['max_phase_err_topk']:.2e}")
+    mem = MemoryStore(N=N, eta=eta, decay=decay, encoder=enc, precision=precision)
+    # a Collection's texts stay in its TSV: store rows are pointed at them, not copied
+    linked = isinstance(docs, Collection)
+    start = time.time()
+    if workers and workers > 1:
+        from store.parallel import build_parallel
+        with tqdm(total=len(docs), desc=f"Encoding traces ({workers} workers)", unit="doc") as bar:
+            build_parallel(mem, docs, workers, batch_size=batch_size, strength=1.0, progress=bar.update)
+        if linked:
+            mem.texts.link([mem.rows[d] for d in docs.ids], docs.texts, range(len(docs)))
+    else:
+        for i in tqdm(range(0, len(docs), batch_size), desc="Encoding traces", unit="batch"):
+            mem.add_documents(docs[i:i + batch_size], strength=1.0)
+            if linked:
+                hi = min(i + batch_size, len(docs))
+                mem.texts.link([mem.rows[d] for d in docs.ids[i:hi]], docs.texts, range(i, hi))
+    elapsed = time.time() - start
+    print(f"Built {len(mem)} traces in {elapsed:.1f} s ({len(docs) / max(elapsed, 1e-9):.0f} docs/s)")
     return mem
 
 
-from tqdm import tqdm
-
 def run_search(mem: MemoryStore,
                queries: List[Tuple[str, str]],
                topk: int,
                K: int,
                lam: float,
                shortlist: int | None = None,
-               faiss_index=None,
-               st_model=None,
-               doc_ids=None) -> Tuple[Dict[str, List[Tuple[str, float]]], Dict[str, float]]:
+               stage1=None,
+               batch_size: int = 1,
+               nprobe: int | None = None,
+               survivors: int | None = None,
+               instruments=None) -> Tuple[Dict[str, List[Tuple[str, float]]], Dict[str, float]]:
 
     ranked: Dict[str, List[Tuple[str, float]]] = {}
     latencies = []
+    blocks = []             # (block ms, queries) when queries are scored in blocks
+    ins = instruments       # store.instrument.Instruments or None (no timing)
+    # approximate modes; only MemoryStore takes these
+    approx = {k: v for k, v in (("nprobe", nprobe), ("survivors", survivors)) if v}
+    if approx and not isinstance(mem, MemoryStore):
+        raise ValueError(f"{type(mem).__name__} runs exact scans only; "
+                         f"search approximate modes ({', '.join(approx)}) on the MemoryStore")
+
+    # Two-stage: shortlist a block of queries with one FAISS call, then
+    # rescore each query against exactly its shortlisted store rows.
+    if shortlist and stage1 is not None and hasattr(mem, "rerank_batch"):
+        row_map = stage1.store_rows(mem.mem if hasattr(mem, "mem") else mem)
+        step = max(1, batch_size)
+        with tqdm(total=len(queries), desc="Running queries", unit="q") as bar:
+            for i in range(0, len(queries), step):
+                block = queries[i:i + step]
+                texts = [qtext for _qid, qtext in block]
+                clock = ins.clock() if ins is not None else None
+                start = time.time()
+                cand = row_map[stage1.search(texts, shortlist)]
+                if clock is not None:
+                    clock.lap("faiss")
+                results, _q = mem.rerank_batch(texts, cand, topk=topk, K=K, lam=lam)
+                end = time.time()
+                if clock is not None:
+                    clock.lap("rerank")
+                for (qid, _qtext), rows in zip(block, results):
+                    hits = [(doc_id, score) for (doc_id, _text, score, _strength) in rows]
+                    ranked[qid] = hits          # already best first, ties by doc id
+                    latencies.append((end - start) * 1000.0 / len(block))  # ms
+                blocks.append(((end - start) * 1000.0, len(block)))
+                if clock is not None:
+                    clock.lap("assemble")
+                    _finish_block(ins, clock, len(block), "shortlist")
+                bar.update(len(block))
+        return ranked, _latency_stats(latencies, blocks if step > 1 else None)
+
+    # Full scan: score blocks of queries in one pass over the trace store.
+    # Per-query latency is the block time amortized over the block, so the
+    # stats also carry the block times (the only tail signal left).
+    if not (shortlist and stage1 is not None) and batch_size > 1:
+        with tqdm(total=len(queries), desc="Running queries", unit="q") as bar:
+            for i in range(0, len(queries), batch_size):
+                block = queries[i:i + batch_size]
+                clock = ins.clock() if ins is not None else None
+                start = time.time()
+                results, _q = mem.search_batch([qtext for _qid, qtext in block],
+                                               topk=topk, K=K, lam=lam, **approx)
+                end = time.time()
+                if clock is not None:
+                    clock.lap("search")
+                for (qid, _qtext), rows in zip(block, results):
+                    hits = [(doc_id, score) for (doc_id, _text, score, _strength) in rows]
+                    ranked[qid] = hits          # already best first, ties by doc id
+                    latencies.append((end - start) * 1000.0 / len(block))  # ms
+                blocks.append(((end - start) * 1000.0, len(block)))
+                if clock is not None:
+                    clock.lap("assemble")
+                    _finish_block(ins, clock, len(block), "batch")
+                bar.update(len(block))
+        return ranked, _latency_stats(latencies, blocks)
 
     # wrap queries with tqdm
     for qid, qtext in tqdm(queries, desc="Running queries", unit="q"):
+        clock = ins.clock() if ins is not None else None
         start = time.time()
 
-        # Stage 1: shortlist with FAISS (if enabled)
-        if shortlist and faiss_index is not None:
-            q_emb = st_model.encode([qtext], convert_to_numpy=True, normalize_embeddings=True)
-            D, I = faiss_index.search(q_emb, shortlist)
-            candidate_ids = set(doc_ids[i] for i in I[0])
+        # Stage 1: shortlist with FAISS (if enabled); remote shards take doc ids
+        if shortlist and stage1 is not None:
+            I = stage1.search([qtext], shortlist)
+            candidate_ids = set(stage1.doc_ids[i] for i in I[0] if i >= 0)
+            if clock is not None:
+                clock.lap("faiss")
         else:
             candidate_ids = None  # full scan
 
         # Stage 2: CWM resonance search
-        rows, _q = mem.search(qtext, topk=topk, K=K, lam=lam, restrict_ids=candidate_ids)
+        rows, _q = mem.search(qtext, topk=topk, K=K, lam=lam, restrict_ids=candidate_ids,
+                              **(approx if candidate_ids is None else {}))
 
         end = time.time()
+        if clock is not None:
+            clock.lap("search")
 
-        hits = [(doc_id, score) for (doc_id, _text, score, _strength) in rows]
-        hits = sorted(hits, key=lambda x: (-x[1], x[0]))
-        ranked[qid] = hits
+        # searchers return hits best first with ties by doc id (store.topk)
+        ranked[qid] = [(doc_id, score) for (doc_id, _text, score, _strength) in rows]
 
         latencies.append((end - start) * 1000.0)  # ms
+        if clock is not None:
+            clock.lap("assemble")
+            _finish_block(ins, clock, 1, "single")
+
+    return ranked, _latency_stats(latencies)
 
-    latency_stats = {
+
+def _finish_block(ins, clock, queries: int, mode: str):
+    """Record a runner block: its stages, plus the amortized per-query latency."""
+    per_query = (clock.t - clock.start) / max(queries, 1)
+    ins.finish(clock, "runner", queries=queries, mode=mode)
+    for _ in range(queries):
+        ins.observe("runner.query", per_query)
+
+
+def _latency_stats(latencies: List[float], blocks: List[Tuple[float, int]] | None = None) -> Dict[str, float]:
+    """
+    Per-query latency summary (ms). With blocks, the per-query numbers are
+    amortized block times; the block times themselves are added as block_*.
+    """
+    if not latencies:
+        return {"mean": 0.0, "p50": 0.0, "p95": 0.0}
+    stats = {
         "mean": float(np.mean(latencies)),
         "p50": float(np.percentile(latencies, 50)),
         "p95": float(np.percentile(latencies, 95)),
     }
-    return ranked, latency_stats
+    if blocks:
+        block_ms = [ms for ms, _n in blocks]
+        stats.update(amortized=True, block_queries=float(np.mean([n for _ms, n in blocks])),
+                     block_mean=float(np.mean(block_ms)), block_p50=float(np.percentile(block_ms, 50)),
+                     block_p95=float(np.percentile(block_ms, 95)))
+    return stats
+
+
+def _latency_line(stats: Dict[str, float], label: str = "Latency") -> str:
+    line = f"mean={stats['mean']:.2f} ms, p50={stats['p50']:.2f} ms, p95={stats['p95']:.2f} ms"
+    if not stats.get("amortized"):
+        return f"{label} {line}"
+    return (f"{label} (amortized over blocks of {stats['block_queries']:.0f} queries) {line}; "
+            f"block mean={stats['block_mean']:.2f} ms, p50={stats['block_p50']:.2f} ms, "
+            f"p95={stats['block_p95']:.2f} ms")
 
 
 def main():
@@ -159,6 +298,51 @@ def main():
     ap.add_argument("--lam",        type=float, default=1.0)
     ap.add_argument("--shortlist",  type=int, default=None,
                     help="If set, use FAISS to shortlist this many candidates before CWM re-ranking")
+    ap.add_argument("--faiss-cache", default="data/faiss",
+                    help="Directory of FAISS shortlist indexes, one per (collection fingerprint, model)")
+    ap.add_argument("--precision",  default="exact", choices=["exact", "q16", "q8"],
+                    help="Trace storage: complex64 spectra, or 8-bit magnitude + 16/8-bit phase codes")
+    ap.add_argument("--index",      action="store_true",
+                    help="Scan a bin-major copy of the traces (2x trace memory) that reads only the query's K bins")
+    ap.add_argument("--clusters",   type=int, default=None,
+                    help="Build the approximate clustered spectral index with this many clusters "
+                         "(0 = 4*sqrt(n)); searched with --nprobe")
+    ap.add_argument("--clusters-path", default=None,
+                    help="Load the clustered index from this directory, or build and save it there")
+    ap.add_argument("--nprobe",     type=int, default=None,
+                    help="Approximate search: score only the nprobe closest clusters, and report "
+                         "recall@topk against the exact full scan")
+    ap.add_argument("--cascade",    type=int, default=None,
+                    help="Cascade search: rank all traces on their strongest bins, re-score this many "
+                         "survivors per query at full resolution, and report overlap with the full scan")
+    ap.add_argument("--cascade-bins", type=int, default=64,
+                    help="FFT bins kept in the cascade's low-resolution view")
+    ap.add_argument("--search-workers", type=int, default=0,
+                    help="Score full scans on this many processes over shared-memory shards (0 = in-process)")
+    ap.add_argument("--shards",     default=None,
+                    help="Comma-separated host:port shard servers (python -m store.shard); "
+                         "search them instead of building memory locally")
+    ap.add_argument("--shard-timeout", type=float, default=5.0,
+                    help="Seconds to wait for a shard before returning partial results")
+    ap.add_argument("--direct-spectra", action="store_true",
+                    help="embed: build traces from the closed-form spectrum instead of the FFT "
+                         "(agrees with the FFT queries only for K within the embedding dim + 2 bins)")
+    ap.add_argument("--batch",      type=int, default=1,
+                    help="Queries per block: one pass over the store in full-scan mode, one FAISS "
+                         "call in shortlist mode (default 1 = one at a time; with blocks the "
+                         "per-query latency is amortized and block latency is reported)")
+    ap.add_argument("--query-cache", type=int, default=0,
+                    help="LRU-cache this many query waves and ranked results in the store (0 = off)")
+    ap.add_argument("--workers",    type=int, default=0,
+                    help="Encode the collection on this many workers (processes for char, "
+                         "threads sharing the model for embed; 0 = serial)")
+    ap.add_argument("--emb-cache",  default="data/emb_cache",
+                    help="Sentence-embedding cache directory shared by the embed encoder and the "
+                         "FAISS shortlist ('' disables)")
+    ap.add_argument("--metrics",    action="store_true",
+                    help="Time search stages; write per-call events (JSON lines) and a Prometheus "
+                         "text dump to --log-dir")
+    ap.add_argument("--log-dir",    default="logs")
     args = ap.parse_args()
 
     # --- load data ---
@@ -166,57 +350,97 @@ def main():
     queries = load_queries(args.queries)
     qrels   = load_qrels(args.qrels)
 
-    # --- build memory ---
-    mem = build_memory(docs, args.encoder, args.N, args.eta, args.decay, args.model, args.device)
+    # --- build memory (or attach to remote shards) ---
+    mem = None
+    if args.shards:
+        from store.shard import ShardCoordinator
+        enc = make_encoder(name=args.encoder, N=args.N, model_name=args.model, device=args.device,
+                           cache_dir=args.emb_cache)
+        searcher = ShardCoordinator(args.shards.split(","), enc, timeout=args.shard_timeout)
+        print(f"Searching {len(searcher.addresses)} shard servers")
+    else:
+        mem = build_memory(docs, args.encoder, args.N, args.eta, args.decay, args.model, args.device,
+                           precision=args.precision, emb_cache=args.emb_cache, workers=args.workers,
+                           direct_spectra=args.direct_spectra, K=args.K)
+        searcher = mem
+    if args.index and mem is not None:
+        print(f"Building bin-major trace copy over {len(mem)} traces...")
+        mem.build_index()
+    if mem is not None and (args.clusters is not None or args.clusters_path or args.nprobe):
+        if args.clusters_path and os.path.exists(os.path.join(args.clusters_path, "clusters.json")):
+            try:
+                mem.load_clusters(args.clusters_path)
+                print(f"Loaded clustered index from {args.clusters_path}")
+            except ValueError as e:
+                print(f"Ignoring stale clustered index: {e}")
+        if mem.clusters is None:
+            start = time.time()
+            mem.build_clusters(nlist=args.clusters or None)
+            print(f"Built clustered index: {mem.clusters.nlist} clusters in {time.time() - start:.1f} s")
+            if args.clusters_path:
+                mem.clusters.save(args.clusters_path)
+    if args.cascade and mem is not None:
+        start = time.time()
+        mem.build_cascade(bins=args.cascade_bins)
+        print(f"Built cascade view: {len(mem.cascade.bins)} of {mem.N} bins in {time.time() - start:.1f} s")
+    if args.query_cache and mem is not None:
+        mem.enable_cache(max_entries=args.query_cache)
 
-    # --- optional FAISS index ---
-    faiss_index = None
+    # --- optional FAISS shortlist (stage 1) ---
+    stage1 = None
     st_model = None
-    doc_ids = [doc_id for (doc_id, _text) in docs]
 
     if args.shortlist and args.shortlist > 0:
-        import os
-        from tqdm import tqdm
-
-        index_path = "data/cwm_index.faiss"
-
-        if os.path.exists(index_path):
-            print(f"Loading existing FAISS index from {index_path}...")
-            faiss_index = faiss.read_index(index_path)
-            st_model = SentenceTransformer(args.model, device=args.device)
+        from evaluation.shortlist import Shortlist
+
+        # one embedding model for the shortlist and the embed encoder, so each
+        # document and query is embedded at most once (and cached across runs)
+        enc = mem.encoder if mem is not None else searcher.encoder
+        if getattr(enc, "model_name", None) == args.model:
+            st_model = enc.model
+        elif args.emb_cache:
+            from encoders.embed_cache import CachedSentenceModel
+            st_model = CachedSentenceModel(args.model, device=args.device, cache_dir=args.emb_cache)
         else:
-            print(f"Building FAISS index over {len(docs)} docs...")
+            from sentence_transformers import SentenceTransformer
             st_model = SentenceTransformer(args.model, device=args.device)
 
-            batch_size = 512
-            all_embs = []
-            for i in tqdm(range(0, len(docs), batch_size), desc="Encoding docs"):
-                batch_texts = [text for (_id, text) in docs[i:i+batch_size]]
-                batch_embs = st_model.encode(
-                    batch_texts,
-                    convert_to_numpy=True,
-                    normalize_embeddings=True,
-                    batch_size=batch_size,
-                    show_progress_bar=False
-                )
-                all_embs.append(batch_embs)
-
-            doc_embs = np.vstack(all_embs)
+        stage1 = Shortlist.build_or_load(docs, st_model, args.model, cache_dir=args.faiss_cache)
 
-            dim = doc_embs.shape[1]
-            faiss_index = faiss.IndexFlatIP(dim)
-            faiss_index.add(doc_embs)
-
-            print(f"Saving FAISS index to {index_path}...")
-            faiss.write_index(faiss_index, index_path)
+    # --- optional multi-core full scan (exact scans only; --nprobe/--cascade run on mem) ---
+    parallel = None
+    if args.search_workers and args.search_workers > 0 and mem is not None:
+        from store.parallel import ParallelSearcher
+        parallel = ParallelSearcher(mem, workers=args.search_workers)
+        print(f"Parallel search: {parallel.workers} workers, {len(parallel.shards)} shards")
+        if args.nprobe or args.cascade:
+            print("Approximate search runs in-process; the parallel searcher serves the exact comparison scan")
+        else:
+            searcher = parallel
+
+    # --- optional per-stage instrumentation ---
+    instruments = None
+    if args.metrics:
+        from store.instrument import Instruments, JsonlSink
+        stamp = time.strftime("%Y%m%d-%H%M%S")
+        events_path = os.path.join(args.log_dir, f"search-{stamp}.jsonl")
+        instruments = Instruments(sinks=[JsonlSink(events_path)])
+        if mem is not None:
+            mem.instrument(instruments=instruments)
 
     # --- run search (ranked results + latency stats) ---
-    ranked, latency_stats = run_search(mem, queries,
+    ranked, latency_stats = run_search(searcher, queries,
                                        topk=args.topk, K=args.K, lam=args.lam,
                                        shortlist=args.shortlist,
-                                       faiss_index=faiss_index,
-                                       st_model=st_model,
-                                       doc_ids=doc_ids)
+                                       stage1=stage1,
+                                       batch_size=args.batch,
+                                       nprobe=args.nprobe if mem is not None else None,
+                                       survivors=args.cascade if mem is not None else None,
+                                       instruments=instruments)
+    if searcher is not mem and searcher is not parallel:
+        searcher.close()
+    if mem is not None:
+        mem.instruments = None      # later comparison scans are not part of this run
 
     # --- compute metrics ---
     mrr  = metrics.mrr_at_10(ranked, qrels)
@@ -230,16 +454,65 @@ def main():
     print(f"Recall@10 : {r10:.4f}")
     print(f"Recall@100: {r100:.4f}")
 
-    print(f"Latency mean={latency_stats['mean']:.2f} ms, "
-          f"p50={latency_stats['p50']:.2f} ms, "
-          f"p95={latency_stats['p95']:.2f} ms")
+    print(_latency_line(latency_stats))
+
+    if instruments is not None:
+        prom_path = os.path.join(args.log_dir, f"metrics-{stamp}.prom")
+        instruments.write_prometheus(prom_path)
+        instruments.close()
+        snap = instruments.snapshot()
+        print(f"{'stage':<26}{'count':>8}{'mean ms':>10}{'p50':>9}{'p95':>9}{'p99':>9}{'max':>9}")
+        for stage, st in snap["stages"].items():
+            print(f"{stage:<26}{st['count']:>8}{st['mean_ms']:>10.3f}{st['p50_ms']:>9.3f}"
+                  f"{st['p95_ms']:>9.3f}{st['p99_ms']:>9.3f}{st['max_ms']:>9.3f}")
+        print("Counters: " + ", ".join(f"{k}={v}" for k, v in snap["counters"].items()))
+        print(f"Stage events: {events_path}\nPrometheus dump: {prom_path}")
+
+    if st_model is not None and hasattr(st_model, "hits"):
+        print(f"Embedding cache: {st_model.hits} hits, {st_model.misses} misses "
+              f"({len(st_model.cache)} cached)")
+
+    if mem is not None and mem.cache is not None:
+        st = mem.cache.stats()
+        for kind in ("waves", "results"):
+            c = st[kind]
+            print(f"Query cache ({kind}): {c['hits']} hits, {c['misses']} misses, "
+                  f"{c['evictions']} evictions, {c['entries']} entries / {c['bytes'] / 1024:.0f} KB")
+
+    if getattr(searcher, "partial_calls", 0):
+        print(f"WARNING: {searcher.partial_calls} search call(s) returned partial results "
+              f"(shards timed out or failed)")
+
+    # --- approximate modes: compare against the single-stage exact full scan ---
+    if mem is not None and (args.nprobe or args.cascade) and not args.shortlist:
+        clusters, cascade = mem.clusters, mem.cascade
+        if args.nprobe and clusters is not None and clusters.searches:
+            print(f"Approximate (nprobe={args.nprobe} of {clusters.nlist} clusters): "
+                  f"{clusters.total_scored / clusters.searches:.0f} of {len(mem)} traces scored per query")
+        elif args.cascade and cascade is not None and cascade.searches:
+            print(f"Cascade stages per query: low-res scan of {len(mem)} traces "
+                  f"{1000.0 * cascade.coarse_s / cascade.searches:.2f} ms, full-res re-score of "
+                  f"{args.cascade} survivors {1000.0 * cascade.rescore_s / cascade.searches:.2f} ms")
+        exact, exact_latency = run_search(parallel or mem, queries, topk=args.topk, K=args.K, lam=args.lam,
+                                          batch_size=args.batch)
+        print(f"Overlap with full scan: @10 {metrics.overlap_at_k(ranked, exact, k=10):.4f}  "
+              f"@{args.topk} {metrics.overlap_at_k(ranked, exact, k=args.topk):.4f}")
+        print(f"{_latency_line(exact_latency, 'Full scan latency')} "
+              f"(MRR@10 {metrics.mrr_at_10(exact, qrels):.4f})")
+
+    if parallel is not None:
+        parallel.close()
+
+    if mem is not None and mem.index is not None and mem.index.searches:
+        scored = mem.index.total_scored / mem.index.searches
+        rescored = mem.index.total_rescored / mem.index.searches
+        print(f"Bin-major scan: {scored:.0f} traces scored per query on K of {mem.N} bins, "
+              f"{rescored:.0f} re-scored with the row kernel")
 
     # --- memory footprint ---
-    if len(mem.store) > 0:
-        first_doc = next(iter(mem.store.values()))
-        text, wave, last_used, strength = first_doc
-        bytes_per_entry = wave.nbytes
-        total_bytes = bytes_per_entry * len(mem.store)
+    if mem is not None and len(mem) > 0:
+        bytes_per_entry = mem.bytes_per_trace()
+        total_bytes = bytes_per_entry * len(mem)
         print(f"Memory per entry: {bytes_per_entry/1024:.2f} KB")
         print(f"Total memory: {total_bytes/(1024*1024):.2f} MB")
 
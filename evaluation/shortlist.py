@@ -0,0 +1,92 @@
+# evaluation/shortlist.py
+# Stage 1 of two-stage retrieval: FAISS shortlist over sentence embeddings,
+# cached on disk per (collection fingerprint, model).
+
+from __future__ import annotations
+from pathlib import Path
+from typing import List, Tuple
+import hashlib
+import json
+import re
+
+import numpy as np
+from tqdm import tqdm
+
+
+def collection_fingerprint(docs: List[Tuple[str, str]]) -> str:
+    """sha1 over (doc_id, text) in order: any edit, reorder or resize changes it."""
+    h = hashlib.sha1()
+    for doc_id, text in docs:
+        h.update(doc_id.encode("utf-8") + b"\t" + text.encode("utf-8") + b"\n")
+    return h.hexdigest()
+
+
+class Shortlist:
+    """
+    Inner-product FAISS index over normalized sentence embeddings of a
+    collection. FAISS row i is docs[i]; store_rows() maps those rows to a
+    MemoryStore's rows so the re-ranker gathers exactly the shortlisted traces.
+    """
+
+    def __init__(self, index, st_model, doc_ids: List[str]):
+        self.index = index
+        self.st_model = st_model
+        self.doc_ids = doc_ids
+
+    @classmethod
+    def build_or_load(cls, docs: List[Tuple[str, str]], st_model, model_name: str,
+                      cache_dir: str = "data/faiss", batch_size: int = 512) -> "Shortlist":
+        """
+        Load the cached index for this exact collection and model, or build
+        and cache it. The file name carries the model and the collection
+        fingerprint, and a sidecar JSON is checked on load, so an index built
+        from other documents or another model is never reused.
+        """
+        import faiss
+
+        fp = collection_fingerprint(docs)
+        slug = re.sub(r"[^A-Za-z0-9._-]+", "_", model_name)
+        root = Path(cache_dir)
+        index_path = root / f"{slug}-{fp[:16]}.faiss"
+        meta_path = index_path.with_suffix(".json")
+        doc_ids = [doc_id for doc_id, _text in docs]
+
+        if index_path.exists() and meta_path.exists():
+            with open(meta_path, "r", encoding="utf-8") as f:
+                meta = json.load(f)
+            if meta.get("fingerprint") == fp and meta.get("model") == model_name:
+                print(f"Loading FAISS index from {index_path}...")
+                return cls(faiss.read_index(str(index_path)), st_model, doc_ids)
+            print(f"Ignoring stale FAISS index {index_path} (built for {meta.get('model')})")
+
+        print(f"Building FAISS index over {len(docs)} docs...")
+        all_embs = []
+        for i in tqdm(range(0, len(docs), batch_size), desc="Encoding docs"):
+            batch_texts = [text for (_id, text) in docs[i:i + batch_size]]
+            all_embs.append(st_model.encode(batch_texts, convert_to_numpy=True, normalize_embeddings=True,
+                                            batch_size=batch_size, show_progress_bar=False))
+        doc_embs = np.vstack(all_embs).astype(np.float32)
+
+        index = faiss.IndexFlatIP(doc_embs.shape[1])
+        index.add(doc_embs)
+
+        print(f"Saving FAISS index to {index_path}...")
+        root.mkdir(parents=True, exist_ok=True)
+        faiss.write_index(index, str(index_path))
+        with open(meta_path, "w", encoding="utf-8") as f:
+            json.dump({"fingerprint": fp, "model": model_name, "count": len(docs),
+                       "dim": int(doc_embs.shape[1])}, f, indent=2)
+        return cls(index, st_model, doc_ids)
+
+    def search(self, queries: List[str], k: int) -> np.ndarray:
+        """(Q, k) FAISS rows for a block of queries, one encode and one search call; -1 pads."""
+        q_embs = self.st_model.encode(list(queries), convert_to_numpy=True, normalize_embeddings=True)
+        _D, I = self.index.search(np.ascontiguousarray(q_embs, dtype=np.float32), k)
+        return I
+
+    def store_rows(self, mem) -> np.ndarray:
+        """
+        FAISS row -> store row, -1 where the doc is not in the store. One extra
+        trailing -1 makes FAISS's own -1 padding map to -1 as well.
+        """
+        return np.array([mem.rows.get(d, -1) for d in self.doc_ids] + [-1], dtype=np.int64)
@@ -0,0 +1,149 @@
+# evaluation/sweep.py
+# Hyperparameter sweep: one build per N, one scan per (N, K) shared by every lam and topk.
+
+from __future__ import annotations
+from typing import Dict, List, Tuple
+import argparse
+import json
+import os
+import time
+
+import numpy as np
+
+import evaluation.metrics as metrics
+from evaluation.runner import load_collection, load_queries, load_qrels, build_memory
+from store.memory import MemoryStore
+from store.topk import empty, finalize, merge_topk
+
+
+def sweep_store(mem: MemoryStore, q_waves: np.ndarray, Ks: List[int], lams: List[float], topk: int):
+    """
+    Full-scan top-k of every query for every (K, lam) in one pass per K.
+
+    Per query and tile, the magnitude and phase terms (MemoryStore._tile_terms)
+    are computed once; each lam only adds mag + lam * phase, scales by
+    strength and merges, so scores match search() bitwise. topk is the
+    largest cut wanted: smaller cuts are prefixes of the same ranking.
+
+    Returns {(K, lam): ([(rows, scores)] per query, scan seconds)}. The time
+    shared by the lams of one K is split evenly between them.
+    """
+    n, Q = len(mem), len(q_waves)
+    out = {}
+    for K in Ks:
+        t0 = time.perf_counter()
+        prep = mem._prepare(q_waves, K)
+        best = {lam: [empty() for _ in range(Q)] for lam in lams}
+        lam_s = dict.fromkeys(lams, 0.0)
+        for d0 in range(0, n, mem.doc_block):
+            sel = slice(d0, min(n, d0 + mem.doc_block))
+            tile_rows = np.arange(sel.start, sel.stop)
+            tile = mem._spectral(sel)
+            strength = mem._strength_at(sel)
+            for j in range(Q):
+                mag, phase = mem._tile_terms(prep, j, tile)
+                for lam in lams:
+                    t = time.perf_counter()
+                    s = (mag + lam * phase) * strength
+                    best[lam][j] = merge_topk(best[lam][j], tile_rows, s, topk)
+                    lam_s[lam] += time.perf_counter() - t
+        shared = (time.perf_counter() - t0 - sum(lam_s.values())) / len(lams)
+        for lam in lams:
+            out[(K, lam)] = ([finalize(b, topk, mem.ids) for b in best[lam]], shared + lam_s[lam])
+    return out
+
+
+def evaluate(ranked: Dict[str, List[Tuple[str, float]]], qrels) -> Dict[str, float]:
+    return {"mrr@10": metrics.mrr_at_10(ranked, qrels), "ndcg@10": metrics.ndcg_at_10(ranked, qrels),
+            "recall@10": metrics.recall_at_k(ranked, qrels, k=10),
+            "recall@100": metrics.recall_at_k(ranked, qrels, k=100)}
+
+
+def sweep(docs, queries, qrels, Ns: List[int], Ks: List[int], lams: List[float], topks: List[int],
+          encoder: str = "char", model_name: str | None = None, device: str | None = None,
+          precision: str = "exact", emb_cache: str | None = None, workers: int = 0) -> List[dict]:
+    """One row per (N, K, lam, topk): retrieval metrics and amortized scan latency."""
+    rows = []
+    max_k = max(topks)
+    for N in Ns:
+        # ---- 1. Encode the collection and the queries once per N ----
+        t0 = time.perf_counter()
+        mem = build_memory(docs, encoder, N, 0.10, 0.0, model_name, device, precision=precision,
+                           emb_cache=emb_cache, workers=workers)
+        build_s = time.perf_counter() - t0
+        t0 = time.perf_counter()
+        q_waves = mem._encode_batch([qtext for _qid, qtext in queries])
+        encode_ms = 1000.0 * (time.perf_counter() - t0) / max(len(queries), 1)
+
+        # ---- 2. One scan per K, shared by every lam; every topk cut from the largest ----
+        for (K, lam), (best, scan_s) in sweep_store(mem, q_waves, Ks, lams, max_k).items():
+            full = {qid: [(mem.ids[r], float(s)) for r, s in zip(rs, ss)]
+                    for (qid, _qtext), (rs, ss) in zip(queries, best)}
+            for topk in topks:
+                ranked = {qid: hits[:topk] for qid, hits in full.items()}
+                rows.append({"N": N, "K": K, "lam": lam, "topk": topk, **evaluate(ranked, qrels),
+                             "scan_ms_per_query": 1000.0 * scan_s / max(len(queries), 1),
+                             "encode_ms_per_query": encode_ms, "build_s": build_s})
+        del mem
+    return rows
+
+
+COLUMNS = ["N", "K", "lam", "topk", "mrr@10", "ndcg@10", "recall@10", "recall@100",
+           "scan_ms_per_query", "encode_ms_per_query", "build_s"]
+
+
+def write_table(rows: List[dict], path: str):
+    """Tab-separated grid table (plus the same rows as JSON next to it)."""
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    with open(path, "w", encoding="utf-8") as f:
+        f.write("\t".join(COLUMNS) + "\n")
+        for r in rows:
+            f.write("\t".join(f"{r[c]:.6g}" if isinstance(r[c], float) else str(r[c]) for c in COLUMNS) + "\n")
+    with open(os.path.splitext(path)[0] + ".json", "w", encoding="utf-8") as f:
+        json.dump(rows, f, indent=2)
+
+
+def main():
+    ap = argparse.ArgumentParser("CWM hyperparameter sweep")
+    ap.add_argument("--collection", default="data/collection.tsv")
+    ap.add_argument("--queries",    default="data/queries.tsv")
+    ap.add_argument("--qrels",      default="data/qrels.txt")
+    ap.add_argument("--encoder",    default="char", choices=["char", "embed"])
+    ap.add_argument("--model",      default="all-MiniLM-L6-v2")
+    ap.add_argument("--device",     default=None)
+    ap.add_argument("--precision",  default="exact", choices=["exact", "q16", "q8"])
+    ap.add_argument("--N",          type=int, nargs="+", default=[512])
+    ap.add_argument("--K",          type=int, nargs="+", default=[16, 32, 64, 128, 256])
+    ap.add_argument("--lam",        type=float, nargs="+", default=[0.0, 0.25, 0.5, 1.0, 2.0])
+    ap.add_argument("--topk",       type=int, nargs="+", default=[10, 100])
+    ap.add_argument("--emb-cache",  default="data/emb_cache")
+    ap.add_argument("--workers",    type=int, default=0)
+    ap.add_argument("--out",        default=None, help="grid table (TSV); default logs/sweep-<timestamp>.tsv")
+    args = ap.parse_args()
+
+    docs    = load_collection(args.collection)
+    queries = load_queries(args.queries)
+    qrels   = load_qrels(args.qrels)
+
+    grid = len(args.N) * len(args.K) * len(args.lam) * len(args.topk)
+    print(f"Sweeping {grid} configurations: {len(args.N)} builds, {len(args.N) * len(args.K)} scans")
+    start = time.time()
+    rows = sweep(docs, queries, qrels, args.N, args.K, args.lam, args.topk, args.encoder, args.model,
+                 args.device, args.precision, args.emb_cache or None, args.workers)
+    elapsed = time.time() - start
+
+    out = args.out or os.path.join("logs", f"sweep-{time.strftime('%Y%m%d-%H%M%S')}.tsv")
+    write_table(rows, out)
+
+    print(f"{'N':>6}{'K':>6}{'lam':>7}{'topk':>6}{'MRR@10':>9}{'nDCG@10':>9}{'R@10':>8}{'R@100':>8}{'scan ms':>9}")
+    for r in rows:
+        print(f"{r['N']:>6}{r['K']:>6}{r['lam']:>7.2f}{r['topk']:>6}{r['mrr@10']:>9.4f}{r['ndcg@10']:>9.4f}"
+              f"{r['recall@10']:>8.4f}{r['recall@100']:>8.4f}{r['scan_ms_per_query']:>9.2f}")
+    best = max(rows, key=lambda r: (r["ndcg@10"], r["mrr@10"]))
+    print(f"Best nDCG@10: N={best['N']} K={best['K']} lam={best['lam']} topk={best['topk']} "
+          f"({best['ndcg@10']:.4f}, MRR@10 {best['mrr@10']:.4f})")
+    print(f"Swept {grid} configurations in {elapsed:.1f} s; table written to {out}")
+
+
+if __name__ == "__main__":
+    main()
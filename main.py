@@ -4,43 +4,34 @@ import os
 from store.memory import MemoryStore
 from encoders.factory import make_encoder
 
-print("MAIN START")
 
-
-def get_mem(path="runs/memory.json",
+def get_mem(path="runs/memory",
            N=128, eta=0.1, decay=0.25,
            encoder=None, *,
            encoder_name=None, model_name=None, device=None):
     """
-    Load existing memory and ensure the attached encoder matches the snapshot's N.
+    Load existing memory with the encoder recorded in its header (or the one
+    named), at the snapshot's N. set_encoder raises ValueError when the named
+    encoder is not the one the snapshot was built with.
     If file doesn't exist, create a fresh store with provided hyperparams.
     """
     try:
         m = MemoryStore.load(path)  # legacy snapshots won't have encoder stored
 
-        # Build/adjust encoder to match snapshot N
-        if encoder is not None:
-            try:
-                enc_N = getattr(encoder, "N", None)
-                if enc_N is None or enc_N != m.N:
-                    encoder = make_encoder(encoder_name or "char",
-                                           N=m.N, model_name=model_name, device=device)
-            except Exception:
-                encoder = make_encoder(encoder_name or "char",
-                                       N=m.N, model_name=model_name, device=device)
-        else:
-            encoder = make_encoder(encoder_name or "char",
-                                   N=m.N, model_name=model_name, device=device)
-
-        # Attach encoder
-        try:
-            m.set_encoder(encoder)
-        except Exception:
-            m.encoder = encoder
+        # Build an encoder matching the snapshot: its kind/model and its N
+        if encoder is None or getattr(encoder, "N", None) != m.N:
+            info = m.encoder_info or {}
+            encoder = make_encoder(encoder_name or info.get("name", "char"), N=m.N,
+                                   model_name=model_name or info.get("model", "all-MiniLM-L6-v2"),
+                                   device=device)
+        m.set_encoder(encoder)
         return m
 
     except FileNotFoundError:
         # Fresh store
+        if encoder is None:
+            encoder = make_encoder(encoder_name or "char", N=N, model_name=model_name or "all-MiniLM-L6-v2",
+                                   device=device)
         try:
             return MemoryStore(N=N, eta=eta, decay=decay, encoder=encoder)
         except TypeError:
@@ -80,66 +71,130 @@ def cmd_update(a):
 def cmd_decay(a):
     m = get_mem(a.path, N=a.N, eta=a.eta, decay=a.decay, encoder=a._encoder,
                 encoder_name=a.encoder, model_name=a.model)
-    for _ in range(a.steps):
-        m.decay_traces()
+    m.decay_traces(a.steps)
     m.save(a.path)
     print(f"decayed {a.steps} step(s)")
 
 
 def cmd_list(a):
-    m = get_mem(a.path, N=a.N, eta=a.eta, decay=a.decay, encoder=a._encoder,
-                encoder_name=a.encoder, model_name=a.model)
-    for doc_id, (text, wave, last_used, strength) in m.store.items():
+    # snapshot columns only: no encoder, no wave reconstruction
+    try:
+        m = MemoryStore.load(a.path)
+    except FileNotFoundError:
+        return
+    for doc_id, text, last_used, strength in zip(m.ids, m.texts, m.last_used, m.strength):
         print(f"{doc_id}\tstr={strength:.3f}\tlast_used={last_used}\t{text[:60]}")
 
 
 def cmd_info(a):
-    m = get_mem(a.path, N=a.N, eta=a.eta, decay=a.decay, encoder=a._encoder,
-                encoder_name=a.encoder, model_name=a.model)
+    # header metadata only; a missing snapshot reports the settings a fresh store would get
+    try:
+        h = MemoryStore.read_header(a.path)
+    except FileNotFoundError:
+        h = {"N": a.N, "eta": a.eta, "decay": a.decay, "step": 0, "count": 0}
     print(f"path: {a.path}")
-    print(f"N: {m.N}")
-    print(f"eta: {m.eta}")
-    print(f"decay: {m.decay}")
-    print(f"step: {m.step}")
-    print(f"docs: {len(m.store)}")
+    print(f"N: {h['N']}")
+    print(f"eta: {h['eta']}")
+    print(f"decay: {h['decay']}")
+    print(f"step: {h['step']}")
+    print(f"docs: {h['count']}")
 
 
 def cmd_bulk(a):
-    # Adjust this import if your loader lives elsewhere (utils.loader).
-    from encoders.loader import load_corpus
+    """
+    Stream a TSV into the snapshot at --path. Documents are encoded in
+    batches of --batch and appended to the snapshot every --flush docs
+    (MemoryStore.append_to), together with a checkpoint of the TSV byte
+    offset, so RAM stays bounded by the flush size and --resume continues
+    after the last committed flush.
+    """
+    import time
+    from encoders.loader import iter_corpus
+    from store.memory import HEADER
 
     # Validate TSV path
     if not os.path.exists(a.tsv):
         print(f"[bulk] TSV not found: {a.tsv}")
         return
-
-    # If --truncate, start a fresh store; else load/attach encoder (auto-matching N)
-    if a.truncate:
-        m = MemoryStore(N=a.N, eta=a.eta, decay=a.decay, encoder=a._encoder)
-        print(f"[bulk] starting fresh store (truncate enabled)")
-    else:
-        m = get_mem(a.path, N=a.N, eta=a.eta, decay=a.decay, encoder=a._encoder,
-                    encoder_name=a.encoder, model_name=a.model)
-
-    docs = load_corpus(a.tsv)
-    added = 0
-    for doc_id, text in docs:
-        m.add_document(doc_id, text)
-        added += 1
+    if a.truncate and a.resume:
+        print("[bulk] --truncate and --resume are mutually exclusive")
+        return
+    source = os.path.abspath(a.tsv)
+
+    # Fresh snapshot on --truncate or first run; else append, matching its N/precision
+    enc = None
+    if a.truncate or not os.path.exists(os.path.join(a.path, HEADER)):
+        enc = make_encoder(a.encoder or "char", N=a.N, model_name=a.model or "all-MiniLM-L6-v2")
+        MemoryStore(N=a.N, eta=a.eta, decay=a.decay, encoder=enc).save(a.path)
+        print(f"[bulk] starting fresh store at {a.path}")
+    header = MemoryStore.read_header(a.path)
+    N, precision = int(header["N"]), header.get("precision", "exact")
+    if getattr(enc, "N", None) != N:
+        info = header.get("encoder") or {}
+        enc = make_encoder(a.encoder or info.get("name", "char"), N=N,
+                           model_name=a.model or info.get("model", "all-MiniLM-L6-v2"))
+
+    offset, docs_read = 0, 0
+    if a.resume:
+        cp = header.get("checkpoint")
+        if not cp or cp.get("source") != source:
+            print(f"[bulk] no checkpoint for {a.tsv} in {a.path}; run without --resume")
+            return
+        offset, docs_read = int(cp["offset"]), int(cp["docs"])
+        print(f"[bulk] resuming {a.tsv} at byte {offset} (doc {docs_read})")
+
+    # only ids are held for the whole corpus; traces live in the snapshot
+    n_rows = int(header["count"])
+    seen = set(MemoryStore.read_ids(a.path))
+
+    def new_stage():
+        st = MemoryStore(N=N, eta=header["eta"], decay=header["decay"], encoder=enc, precision=precision)
+        st.step = int(header["step"])
+        return st
+
+    stage, batch = new_stage(), []
+    added = skipped = 0
+    t0 = time.time()
+
+    def commit():
+        nonlocal stage, batch, n_rows
+        if batch:
+            stage.add_documents(batch)
+            batch = []
+        n_rows = stage.append_to(a.path, checkpoint={"source": source, "offset": offset, "docs": docs_read})
+        stage = new_stage()
+
+    for doc_id, text, next_offset in iter_corpus(a.tsv, offset):
         if a.limit and added >= a.limit:
             break
+        offset, docs_read = next_offset, docs_read + 1
+        if doc_id in seen:
+            skipped += 1
+            continue
+        seen.add(doc_id)
+        batch.append((doc_id, text))
+        added += 1
+        if len(batch) >= a.batch:
+            stage.add_documents(batch)
+            batch = []
+        if len(stage) + len(batch) >= a.flush:
+            commit()
         if a.every and added % a.every == 0:
-            print(f"...added {added}")
+            print(f"...added {added} ({added / max(1e-9, time.time() - t0):.0f} docs/s)")
+    commit()
 
-    m.save(a.path)
-    print(f"bulk added {added} docs from {a.tsv} → {a.path}")
+    msg = f"bulk added {added} docs from {a.tsv} → {a.path} ({n_rows} total)"
+    if skipped:
+        msg += f", skipped {skipped} duplicate id(s)"
+    print(msg)
 
 
 if __name__ == "__main__":
     p = argparse.ArgumentParser()
-    p.add_argument("--path", default="runs/memory.json")
-    p.add_argument("--encoder", default="char", choices=["char", "embed"])
-    p.add_argument("--model", default="all-MiniLM-L6-v2")
+    p.add_argument("--path", default="runs/memory", help="Snapshot directory (see MemoryStore.save)")
+    p.add_argument("--encoder", default=None, choices=["char", "embed"],
+                   help="Encoder of a new store (default char); an existing snapshot uses its own")
+    p.add_argument("--model", default=None, help="Sentence model for embed (default all-MiniLM-L6-v2)")
     p.add_argument("--N", type=int, default=1024)
     p.add_argument("--eta", type=float, default=0.1)
     p.add_argument("--decay", type=float, default=0.25)
@@ -172,6 +227,11 @@ if __name__ == "__main__":
     b.add_argument("--limit", type=int, default=None, help="Optionally cap docs ingested")
     b.add_argument("--truncate", action="store_true", help="Start fresh (ignore existing snapshot)")
     b.add_argument("--every", type=int, default=500, help="Print progress every N docs")
+    b.add_argument("--batch", type=int, default=256, help="Docs per encode_batch call")
+    b.add_argument("--flush", type=int, default=10000,
+                   help="Append encoded traces to the snapshot (and checkpoint) every N docs")
+    b.add_argument("--resume", action="store_true",
+                   help="Continue from the checkpoint of an interrupted bulk run of the same TSV")
     b.set_defaults(func=cmd_bulk)
 
     i = sub.add_parser("info")
@@ -179,9 +239,9 @@ if __name__ == "__main__":
 
     args = p.parse_args()
 
-    # Build encoder ONCE for fresh stores; for existing snapshots,
-    # get_mem() will rebuild to match m.N if needed.
-    args._encoder = make_encoder(args.encoder, N=args.N, model_name=args.model)
+    # The encoder (and, for embed, sentence-transformers/torch) is only built
+    # by commands that encode text: get_mem() makes one matching the snapshot's N.
+    args._encoder = None
 
     # dispatch
     args.func(args)
@@ -0,0 +1,102 @@
+# store/cascade.py
+# Coarse-to-fine search: score every trace on its strongest bins only, then
+# re-score the best survivors at full resolution.
+
+from __future__ import annotations
+import time
+
+import numpy as np
+
+from encoders.resonance import query_weights
+from store.topk import empty, merge_topk
+
+
+class CascadeIndex:
+    """
+    Low-resolution view of every trace: its spectrum at the `bins` FFT bins
+    with the highest mean magnitude over the store (encoders put most of
+    their energy in a narrow band, e.g. bins 1..65 for the char encoder).
+
+    The resonance score is a sum over the query's top-K bins, so restricting
+    it to the kept bins is a dense (n, bins) product instead of (n, N).
+    Stage 1 ranks the whole store this way and keeps `survivors` rows per
+    query. Stage 2 runs the exact kernel (MemoryStore._scan) on those rows
+    only, so returned scores are exact. Only the survivor cut is approximate.
+
+    Rows added or rewritten after the build get their low-resolution view
+    on the next search.
+    """
+
+    def __init__(self, bins: np.ndarray, low_mags: np.ndarray, low_phasors: np.ndarray):
+        self.bins = bins                    # (L,) int64, kept FFT bins (sorted)
+        self.low_mags = low_mags            # (n, L) float32
+        self.low_phasors = low_phasors      # (n, L) complex64
+        self.n = len(low_mags)
+        self.dirty: set[int] = set()
+        self.searches = 0
+        self.coarse_s = 0.0                 # cumulative stage times (seconds)
+        self.rescore_s = 0.0
+
+    @classmethod
+    def build(cls, mem, bins: int = 64) -> "CascadeIndex":
+        n, L = len(mem), max(1, min(bins, mem.N))
+        energy = np.zeros(mem.N, dtype=np.float64)
+        for d0 in range(0, n, mem.doc_block):
+            energy += mem._spectrum(slice(d0, min(n, d0 + mem.doc_block)))[0].sum(axis=0)
+        keep = np.sort(np.argsort(-energy, kind="stable")[:L]).astype(np.int64)
+        index = cls(keep, np.zeros((0, L), dtype=np.float32), np.zeros((0, L), dtype=np.complex64))
+        index.refresh(mem)
+        return index
+
+    def _low(self, mem, sel):
+        mags, phasors = mem._spectrum(sel)
+        return mags[:, self.bins].astype(np.float32), phasors[:, self.bins].astype(np.complex64)
+
+    def mark_dirty(self, row: int):
+        self.dirty.add(int(row))
+
+    def refresh(self, mem):
+        """Extend the view to rows added since the build and recompute rewritten rows."""
+        n_all = len(mem)
+        if n_all > self.n:
+            parts = [self._low(mem, slice(d0, min(n_all, d0 + mem.doc_block)))
+                     for d0 in range(self.n, n_all, mem.doc_block)]
+            self.low_mags = np.concatenate([self.low_mags[:self.n]] + [m for m, _ in parts])
+            self.low_phasors = np.concatenate([self.low_phasors[:self.n]] + [p for _, p in parts])
+            self.n = n_all
+        if self.dirty:
+            rows = np.array(sorted(self.dirty), dtype=np.int64)
+            self.low_mags[rows], self.low_phasors[rows] = self._low(mem, rows)
+            self.dirty.clear()
+
+    def search(self, mem, q_waves: np.ndarray, topk: int, K: int, lam: float, survivors: int):
+        """Per query (rows, scores), best first; exact scores over the survivors."""
+        self.refresh(mem)
+        Q = len(q_waves)
+        start = time.perf_counter()
+
+        # ---- stage 1: every trace at low resolution, all queries per tile ----
+        w_mag, w_phc = query_weights(q_waves, K)
+        wl_mag = np.ascontiguousarray(w_mag[:, self.bins])
+        wl_phc = np.ascontiguousarray(w_phc[:, self.bins])
+        keep = [empty() for _ in range(Q)]
+        for d0 in range(0, self.n, mem.doc_block):
+            sel = slice(d0, min(self.n, d0 + mem.doc_block))
+            s = self.low_mags[sel] @ wl_mag.T + lam * (self.low_phasors[sel] @ wl_phc.T).real
+            s *= mem._strength_at(sel)[:, None]
+            tile_rows = np.arange(sel.start, sel.stop)
+            for j in range(Q):
+                keep[j] = merge_topk(keep[j], tile_rows, s[:, j], survivors)
+        mid = time.perf_counter()
+
+        # ---- stage 2: exact kernel over the survivors ----
+        best = []
+        for j in range(Q):
+            (r, s), = mem._scan(q_waves[j:j + 1], topk, K, lam, rows=np.sort(keep[j][0]))
+            best.append((r, s))
+        end = time.perf_counter()
+
+        self.searches += Q
+        self.coarse_s += mid - start
+        self.rescore_s += end - mid
+        return best
@@ -0,0 +1,169 @@
+# store/cluster_index.py
+# Approximate search: k-means over trace spectra, score only the nprobe best clusters.
+
+from __future__ import annotations
+from pathlib import Path
+import json
+import os
+
+import numpy as np
+
+from encoders.resonance import query_weights, resonance_block
+
+CLUSTER_FORMAT = "cic-clusters"
+CLUSTER_HEADER = "clusters.json"
+CLUSTER_FILES = {                 # attribute -> (file, dtype)
+    "centroid_mags":    ("centroid_mags.f32",    np.float32),
+    "centroid_phasors": ("centroid_phasors.c64", np.complex64),
+    "order":            ("order.i32",            np.int32),
+    "offsets":          ("offsets.i64",          np.int64),
+}
+
+
+def _features(mags: np.ndarray, phasors: np.ndarray, phase_weight: float) -> np.ndarray:
+    """Real k-means features of spectra: [mag, w*Re(phasor), w*Im(phasor)]."""
+    return np.hstack([mags, phase_weight * phasors.real, phase_weight * phasors.imag]).astype(np.float32)
+
+
+def _group_sum(a: np.ndarray, X: np.ndarray, nlist: int) -> np.ndarray:
+    """Per-cluster sum of the rows of X (sort + reduceat; np.add.at is much slower)."""
+    out = np.zeros((nlist,) + X.shape[1:], dtype=np.result_type(X.dtype, np.float64))
+    order = np.argsort(a, kind="stable")
+    present, starts = np.unique(a[order], return_index=True)
+    if len(present):
+        out[present] = np.add.reduceat(X[order], starts, axis=0)
+    return out
+
+
+def _nearest(X: np.ndarray, C: np.ndarray) -> np.ndarray:
+    d = (C * C).sum(axis=1)[None, :] - 2.0 * (X @ C.T)      # |x|^2 is constant per row
+    return np.argmin(d, axis=1)
+
+
+class ClusterIndex:
+    """
+    Coarse partition of the store by spectral signature (IVF-style).
+
+    Traces are clustered with k-means on their magnitude and phasor
+    columns. Each cluster keeps the mean magnitude and mean phasor of its
+    members. The resonance kernel is linear in both, so scoring a query
+    against a centroid gives the average unweighted score of the cluster.
+    A query scores all centroids, then runs the exact kernel over the rows
+    of the `nprobe` best clusters only.
+
+    Rows appended after the build, and rows rewritten in place
+    (mark_dirty), are always scored. Results are approximate: a true top-k
+    row in an unprobed cluster is missed. `store` is the fingerprint of the
+    rows it was built over (MemoryStore.fingerprint), saved with the index
+    and checked by MemoryStore.load_clusters.
+    """
+
+    train_size = 64          # k-means training rows per cluster (sampled)
+    iters = 10
+
+    def __init__(self, centroid_mags: np.ndarray, centroid_phasors: np.ndarray,
+                 order: np.ndarray, offsets: np.ndarray):
+        self.centroid_mags = centroid_mags          # (C, N) float32
+        self.centroid_phasors = centroid_phasors    # (C, N) complex64
+        self.order = order                          # (n,) int32, rows grouped by cluster
+        self.offsets = offsets                      # (C + 1,) int64, cluster c = order[offsets[c]:offsets[c+1]]
+        self.n = len(order)
+        self.dirty: set[int] = set()
+        self.store: dict | None = None
+        self.last_scored = 0
+        self.total_scored = 0
+        self.searches = 0
+
+    @property
+    def nlist(self) -> int:
+        return len(self.centroid_mags)
+
+    @classmethod
+    def build(cls, mem, nlist: int | None = None, phase_weight: float = 1.0, seed: int = 0) -> "ClusterIndex":
+        n = len(mem)
+        nlist = max(1, min(n, nlist or int(4 * np.sqrt(max(n, 1)))))
+        rng = np.random.default_rng(seed)
+
+        # ---- 1. k-means on a sample ----
+        train = np.sort(rng.choice(n, size=min(n, nlist * cls.train_size), replace=False))
+        X = _features(*mem._spectrum(train), phase_weight)
+        C = X[rng.choice(len(X), size=nlist, replace=False)]
+        for _ in range(cls.iters):
+            a = _nearest(X, C)
+            counts = np.bincount(a, minlength=nlist)
+            empty = counts == 0
+            C = (_group_sum(a, X, nlist) / np.maximum(counts, 1)[:, None]).astype(np.float32)
+            C[empty] = X[rng.choice(len(X), size=int(empty.sum()))]
+
+        # ---- 2. Assign every row; centroids become member means of the spectra ----
+        assign = np.empty(n, dtype=np.int64)
+        c_mag = np.zeros((nlist, mem.N), dtype=np.float64)
+        c_ph = np.zeros((nlist, mem.N), dtype=np.complex128)
+        for d0 in range(0, n, mem.doc_block):
+            sel = slice(d0, min(n, d0 + mem.doc_block))
+            mags, phasors = mem._spectrum(sel)
+            a = _nearest(_features(mags, phasors, phase_weight), C)
+            assign[sel] = a
+            c_mag += _group_sum(a, mags, nlist)
+            c_ph += _group_sum(a, phasors, nlist)
+        counts = np.bincount(assign, minlength=nlist)
+        c_mag /= np.maximum(counts, 1)[:, None]
+        c_ph /= np.maximum(counts, 1)[:, None]
+
+        order = np.argsort(assign, kind="stable").astype(np.int32)
+        offsets = np.concatenate([[0], np.cumsum(counts)]).astype(np.int64)
+        return cls(c_mag.astype(np.float32), c_ph.astype(np.complex64), order, offsets)
+
+    def mark_dirty(self, row: int):
+        self.dirty.add(int(row))
+
+    def candidates(self, q_wave: np.ndarray, K: int, lam: float, nprobe: int, n_all: int) -> np.ndarray:
+        """Sorted store rows to score for one query."""
+        w_mag, w_phc = query_weights(q_wave[None, :], K)
+        c_scores = resonance_block(w_mag[0], w_phc[0], self.centroid_mags, self.centroid_phasors, lam)
+        probe = np.argsort(-c_scores, kind="stable")[:max(1, nprobe)]
+        parts = [self.order[self.offsets[c]:self.offsets[c + 1]] for c in probe]
+        parts.append(np.arange(self.n, n_all))                  # rows added after the build
+        parts.append(np.fromiter(self.dirty, dtype=np.int64, count=len(self.dirty)))
+        return np.unique(np.concatenate(parts).astype(np.int64))
+
+    def search(self, mem, q_wave: np.ndarray, topk: int, K: int, lam: float, nprobe: int):
+        """Approximate top-k for one query: (rows, scores), best first, as MemoryStore._scan."""
+        rows = self.candidates(q_wave, K, lam, nprobe, len(mem))
+        (r, s), = mem._scan(q_wave[None, :], topk, K, lam, rows=rows)
+        self.last_scored = len(rows)
+        self.total_scored += len(rows)
+        self.searches += 1
+        return r, s
+
+    # ---------- persistence ----------
+
+    def save(self, path: str):
+        """Directory of raw arrays plus clusters.json, written last."""
+        root = Path(path)
+        root.mkdir(parents=True, exist_ok=True)
+        for attr, (fname, dtype) in CLUSTER_FILES.items():
+            tmp = root / (fname + ".tmp")
+            np.ascontiguousarray(getattr(self, attr), dtype=dtype).tofile(tmp)
+            os.replace(tmp, root / fname)
+        header = {"format": CLUSTER_FORMAT, "nlist": self.nlist, "N": int(self.centroid_mags.shape[1]),
+                  "count": self.n, "store": self.store}
+        tmp = root / (CLUSTER_HEADER + ".tmp")
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(header, f, indent=2)
+        os.replace(tmp, root / CLUSTER_HEADER)
+
+    @classmethod
+    def load(cls, path: str) -> "ClusterIndex":
+        root = Path(path)
+        with open(root / CLUSTER_HEADER, "r", encoding="utf-8") as f:
+            header = json.load(f)
+        if header.get("format") != CLUSTER_FORMAT:
+            raise ValueError(f"{path} is not a {CLUSTER_FORMAT} index")
+        C, N, n = int(header["nlist"]), int(header["N"]), int(header["count"])
+        shapes = {"centroid_mags": (C, N), "centroid_phasors": (C, N), "order": (n,), "offsets": (C + 1,)}
+        arrays = {attr: np.fromfile(root / fname, dtype=dtype).reshape(shapes[attr])
+                  for attr, (fname, dtype) in CLUSTER_FILES.items()}
+        out = cls(**arrays)
+        out.store = header.get("store")
+        return out
@@ -0,0 +1,171 @@
+# store/instrument.py
+# Hot-path instrumentation: per-stage timers, counters and latency summaries,
+# with pluggable event sinks (JSON lines) and a Prometheus text-format dump.
+
+from __future__ import annotations
+from pathlib import Path
+from typing import Dict, List
+import json
+import os
+import random
+import time
+
+
+class Summary:
+    """
+    Latency samples of one stage, in seconds. Count, sum and max are exact;
+    quantiles come from a bounded uniform reservoir (exact below max_samples).
+    """
+
+    def __init__(self, max_samples: int = 100_000, seed: int = 0):
+        self.max_samples = max_samples
+        self.samples: List[float] = []
+        self.count = 0
+        self.sum = 0.0
+        self.max = 0.0
+        self._rng = random.Random(seed)
+
+    def add(self, v: float):
+        self.count += 1
+        self.sum += v
+        if v > self.max:
+            self.max = v
+        if len(self.samples) < self.max_samples:
+            self.samples.append(v)
+        else:
+            i = self._rng.randrange(self.count)
+            if i < self.max_samples:
+                self.samples[i] = v
+
+    def quantile(self, q: float) -> float:
+        if not self.samples:
+            return 0.0
+        s = sorted(self.samples)
+        return s[min(len(s) - 1, int(q * len(s)))]
+
+    def stats(self) -> Dict[str, float]:
+        return {"count": self.count, "sum_ms": 1000.0 * self.sum,
+                "mean_ms": 1000.0 * self.sum / max(self.count, 1),
+                "p50_ms": 1000.0 * self.quantile(0.50), "p95_ms": 1000.0 * self.quantile(0.95),
+                "p99_ms": 1000.0 * self.quantile(0.99), "max_ms": 1000.0 * self.max}
+
+
+class Clock:
+    """
+    Lap timer for one call. lap(stage) charges the time since the previous
+    lap to `stage`; split(stage, s) charges time measured inside the current
+    lap to `stage`, and the enclosing lap is charged the remainder.
+    """
+
+    __slots__ = ("start", "t", "nested", "laps", "docs")
+
+    def __init__(self):
+        self.start = self.t = time.perf_counter()
+        self.nested = 0.0
+        self.laps: Dict[str, float] = {}
+        self.docs = 0
+
+    def lap(self, stage: str):
+        now = time.perf_counter()
+        self.laps[stage] = self.laps.get(stage, 0.0) + (now - self.t - self.nested)
+        self.t, self.nested = now, 0.0
+
+    def split(self, stage: str, seconds: float):
+        self.laps[stage] = self.laps.get(stage, 0.0) + seconds
+        self.nested += seconds
+
+
+class JsonlSink:
+    """Appends one JSON object per event to a file (e.g. logs/search-<stamp>.jsonl)."""
+
+    def __init__(self, path: str):
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+        self.path = path
+        self.f = open(path, "a", encoding="utf-8")
+
+    def write(self, record: dict):
+        self.f.write(json.dumps(record) + "\n")
+
+    def close(self):
+        if not self.f.closed:
+            self.f.close()
+
+
+class Instruments:
+    """
+    Aggregates stage timings and counters of instrumented calls.
+
+    Call sites hold `instruments` as None when disabled and skip all timing,
+    so the disabled cost is one `is None` test per stage. When enabled, each
+    call takes a clock(), laps its stages and hands it to finish(), which
+    updates the per-stage summaries and writes one event to every sink
+    (any object with write(record) and close()).
+    """
+
+    def __init__(self, sinks=(), max_samples: int = 100_000):
+        self.sinks = list(sinks)
+        self.max_samples = max_samples
+        self.stages: Dict[str, Summary] = {}
+        self.counters: Dict[str, int] = {}
+
+    def clock(self) -> Clock:
+        return Clock()
+
+    def observe(self, stage: str, seconds: float):
+        summary = self.stages.get(stage)
+        if summary is None:
+            summary = self.stages[stage] = Summary(self.max_samples)
+        summary.add(seconds)
+
+    def count(self, name: str, n: int = 1):
+        self.counters[name] = self.counters.get(name, 0) + int(n)
+
+    def finish(self, clock: Clock, event: str, queries: int = 1, **fields):
+        """Close a call: stage and total timings, counters, one sink event."""
+        total = time.perf_counter() - clock.start
+        for stage, seconds in clock.laps.items():
+            self.observe(f"{event}.{stage}", seconds)
+        self.observe(f"{event}.total", total)
+        self.count(f"{event}_calls")
+        self.count(f"{event}_queries", queries)
+        if clock.docs:
+            self.count(f"{event}_docs_scored", clock.docs)
+        if self.sinks:
+            record = {"ts": time.time(), "event": event, "queries": queries, "docs_scored": clock.docs,
+                      "total_ms": 1000.0 * total,
+                      "stages_ms": {k: 1000.0 * v for k, v in clock.laps.items()}, **fields}
+            for sink in self.sinks:
+                sink.write(record)
+
+    def snapshot(self) -> dict:
+        return {"stages": {k: s.stats() for k, s in sorted(self.stages.items())},
+                "counters": dict(sorted(self.counters.items()))}
+
+    def prometheus(self, prefix: str = "cic") -> str:
+        """Prometheus text exposition: one summary per stage (seconds), one counter per count."""
+        lines = [f"# HELP {prefix}_stage_seconds Wall time per instrumented stage.",
+                 f"# TYPE {prefix}_stage_seconds summary"]
+        for stage, s in sorted(self.stages.items()):
+            for q in (0.5, 0.95, 0.99):
+                lines.append(f'{prefix}_stage_seconds{{stage="{stage}",quantile="{q}"}} {s.quantile(q):.9g}')
+            lines.append(f'{prefix}_stage_seconds_sum{{stage="{stage}"}} {s.sum:.9g}')
+            lines.append(f'{prefix}_stage_seconds_count{{stage="{stage}"}} {s.count}')
+        lines.append(f"# HELP {prefix}_stage_seconds_max Slowest observation per stage.")
+        lines.append(f"# TYPE {prefix}_stage_seconds_max gauge")
+        for stage, s in sorted(self.stages.items()):
+            lines.append(f'{prefix}_stage_seconds_max{{stage="{stage}"}} {s.max:.9g}')
+        for name, v in sorted(self.counters.items()):
+            lines.append(f"# TYPE {prefix}_{name}_total counter")
+            lines.append(f"{prefix}_{name}_total {v}")
+        return "\n".join(lines) + "\n"
+
+    def write_prometheus(self, path: str, prefix: str = "cic"):
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+        tmp = path + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            f.write(self.prometheus(prefix))
+        os.replace(tmp, path)
+
+    def close(self):
+        for sink in self.sinks:
+            sink.close()
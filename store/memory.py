@@ -1,48 +1,865 @@
 # store/memory.py
 
 import numpy as np
-from typing import Dict, Tuple
-from encoders.resonance import resonance_score
+from typing import Dict, List, Tuple
+from encoders.resonance import spectra, query_bins, query_weights, gathered_terms, resonance_terms
+from encoders.factory import encoder_identity
+from store import quant
+from store.query_cache import QueryCache, restrict_key, rows_key
+from store.spectral_index import SpectralIndex
+from store.cluster_index import ClusterIndex
+from store.cascade import CascadeIndex
+from store.instrument import Instruments
+from store.topk import merge_topk, finalize
+from store.textstore import TextStore, line_bounds, open_mmap, write_jsonl
+import hashlib
+import io
 import json
+import os
 from pathlib import Path
+import time
 
 Entry = Tuple[str, np.ndarray, int, float]
 
+# On-disk snapshot: a directory holding header.json plus one raw file per column.
+# header.json is written last and its "count" says how many rows are valid.
+FORMAT = "cic-store"
+FORMAT_VERSION = 1
+HEADER = "header.json"
+SPECTRAL_COLUMNS = {              # precision -> attribute -> (file, dtype), one (N,) row per doc
+    "exact": {"_mags":        ("mags.f32",        np.float32),
+              "_phasors":     ("phasors.c64",     np.complex64)},
+    "q16":   {"_mag_codes":   ("mag_codes.u8",    np.uint8),
+              "_phase_codes": ("phase_codes.u16", np.uint16)},
+    "q8":    {"_mag_codes":   ("mag_codes.u8",    np.uint8),
+              "_phase_codes": ("phase_codes.u8",  np.uint8)},
+}
+ROW_COLUMNS = {                   # attribute -> (file, dtype), one scalar per doc
+    "_strength":  ("strength.f32",  np.float32),
+    "_last_used": ("last_used.i64", np.int64),
+}
+IDS = "ids.txt"
+TEXTS = "texts.jsonl"
+TEXT_OFFSETS = "text_offsets.i64"  # count + 1 byte offsets of the texts.jsonl lines
+
+
+def _text_sizes(root: Path, n: int) -> Dict[str, int]:
+    """Byte length of the first n lines of ids/texts, for headers without "sizes"."""
+    sizes = {}
+    for name in (IDS, TEXTS):
+        with open(root / name, "rb") as f:
+            sizes[name] = sum(len(line) for _, line in zip(range(n), f))
+    return sizes
+
+
+def _read_lines(path: Path, n: int) -> List[str]:
+    # line by line in binary: bytes past the committed rows may be a torn append
+    with open(path, "rb") as f:
+        return [line.decode("utf-8").rstrip("\n") for _, line in zip(range(n), f)]
+
+
+def _text_bounds(root: Path, n: int, header: dict) -> np.ndarray | None:
+    """
+    Memory-mapped line offsets of the first n texts, or None when the index is
+    missing or was not kept in step with texts.jsonl (older writers).
+    """
+    path = root / TEXT_OFFSETS
+    if TEXT_OFFSETS not in header.get("columns", {}) or not path.exists() \
+            or path.stat().st_size < 8 * (n + 1):
+        return None
+    bounds = np.memmap(path, dtype=np.int64, mode="r", shape=(n + 1,))
+    size = (header.get("sizes") or {}).get(TEXTS)
+    if size is not None and int(bounds[n]) != int(size):
+        return None
+    return bounds
+
+
+class _EntryView:
+    """
+    Read-only dict-like view of the columnar store, yielding legacy
+    (text, wave, last_used, strength) entries on demand.
+    """
+
+    def __init__(self, mem: "MemoryStore"):
+        self._mem = mem
+
+    def __len__(self):
+        return len(self._mem.ids)
+
+    def __contains__(self, doc_id):
+        return doc_id in self._mem.rows
+
+    def __iter__(self):
+        return iter(self._mem.ids)
+
+    def __getitem__(self, doc_id: str) -> Entry:
+        return self._mem.entry(self._mem.rows[doc_id])
+
+    def keys(self):
+        return list(self._mem.ids)
+
+    def values(self):
+        return (self._mem.entry(r) for r in range(len(self._mem.ids)))
+
+    def items(self):
+        return ((d, self._mem.entry(r)) for r, d in enumerate(self._mem.ids))
+
+
 class MemoryStore:
 
+    # Scan tiling: each document tile is read once and stays cache-resident
+    # while every query in the block is scored against it.
+    doc_block = 1024
+    # Exact scans gather the query's K columns while K * gather_ratio < N and
+    # use the dense (Q, N) weight product above that, where it is cheaper.
+    gather_ratio = 8
+
     def _encode(self, text: str):
         if self.encoder is None:
             raise ValueError("No encoder set. Pass one when creating MemoryStore or call set_encoder().")
         w = self.encoder.encode_text(text)
         return w / (np.linalg.norm(w) + 1e-8)
 
-    def __init__(self, N: int = 1024, eta: float = 0.1, decay: float = 0.5, encoder=None):
+    def _encode_batch(self, texts: List[str]) -> np.ndarray:
+        if self.encoder is None:
+            raise ValueError("No encoder set. Pass one when creating MemoryStore or call set_encoder().")
+        if hasattr(self.encoder, "encode_batch"):
+            W = np.asarray(self.encoder.encode_batch(list(texts)))
+        else:
+            W = np.stack([self.encoder.encode_text(t) for t in texts])
+        # same per-row expression as _encode, so batched and single queries agree bitwise
+        return np.stack([w / (np.linalg.norm(w) + 1e-8) for w in W])
+
+    def __init__(self, N: int = 1024, eta: float = 0.1, decay: float = 0.5, encoder=None,
+                 precision: str = "exact"):
+        if precision not in quant.PRECISIONS:
+            raise ValueError(f"Unknown precision: {precision} (choose from {quant.PRECISIONS})")
         self.N = N
         self.eta = eta
         self.decay = decay
         self.encoder = encoder
+        self.encoder_info = encoder_identity(encoder)
         self.step = 0
-        self.store: Dict[str, Entry] = {}
+
+        # Columnar trace store: one row per document, spectra precomputed at add time
+        self.ids: List[str] = []
+        self.rows: Dict[str, int] = {}
+        self.texts = TextStore()       # read from the snapshot on demand, see store/textstore.py
+        # exact: _mags = max-normalized |FFT| (float32), _phasors = exp(i*angle(FFT));
+        # q16/q8: _mag_codes (uint8) and _phase_codes (16/8-bit), see store/quant.py
+        self.precision = precision
+        for attr, (_fname, dtype) in SPECTRAL_COLUMNS[precision].items():
+            setattr(self, attr, np.zeros((0, N), dtype=dtype))
+        self._strength = np.zeros(0, dtype=np.float32)
+        self._last_used = np.zeros(0, dtype=np.int64)
+
+        # Optional bin-major copy of the traces (build_index): exact full scan that reads
+        # only the query's K bins per row; None means the row-major scan
+        self.index: SpectralIndex | None = None
+        # Optional approximate coarse index (build_clusters); used when search() gets nprobe
+        self.clusters: ClusterIndex | None = None
+        # Optional low-resolution view for two-stage cascade search (build_cascade)
+        self.cascade: CascadeIndex | None = None
+
+        # Resume point of a streaming ingest (see append_to), kept in the header
+        self.checkpoint: dict | None = None
+
+        # Bumped on every mutation; cached search results are tied to one generation.
+        # row_version only counts changes to row contents (not decay steps).
+        self.generation = 0
+        self.row_version = 0
+        self.cache: QueryCache | None = None
+        # Per-stage timers and counters (instrument()); None = disabled, no timing at all
+        self.instruments: Instruments | None = None
+
+    def set_encoder(self, encoder):
+        """
+        Attach an encoder. It must produce traces of this store's N and, if the
+        store was built by a known encoder, be the same kind of encoder.
+        """
+        ident = encoder_identity(encoder)
+        if ident.get("N") != self.N:
+            raise ValueError(f"Encoder N={ident.get('N')} does not match store N={self.N}")
+        if self.encoder_info and len(self.ids) > 0:
+            for key in ("name", "model"):
+                if self.encoder_info.get(key) != ident.get(key):
+                    raise ValueError(f"Encoder {ident} does not match store encoder {self.encoder_info}")
+        self.encoder = encoder
+        self.encoder_info = ident
+        self._touch()
+
+    def _touch(self, rows: bool = True):
+        """Record a mutation: results cached for the previous generation are stale."""
+        self.generation += 1
+        if rows:
+            self.row_version += 1
+
+    def enable_cache(self, max_entries: int = 10000, max_bytes: int = 256 << 20) -> QueryCache:
+        """Cache query waves and ranked results of search()/search_batch() (LRU)."""
+        self.cache = QueryCache(max_entries=max_entries, max_bytes=max_bytes)
+        return self.cache
+
+    def instrument(self, sinks=(), instruments: Instruments | None = None) -> Instruments:
+        """Time search stages (encode, score, select, assemble) and count traces scored."""
+        self.instruments = instruments if instruments is not None else Instruments(sinks)
+        return self.instruments
+
+    def _query_waves(self, texts: List[str]) -> np.ndarray:
+        """_encode_batch() through the query-wave cache, encoding only the misses."""
+        if self.cache is None:
+            return self._encode_batch(texts)
+        ident = tuple(sorted(self.encoder_info.items()))
+        keys = [(ident, self.N, t) for t in texts]
+        found = [self.cache.get_wave(k) for k in keys]
+        miss = [i for i, w in enumerate(found) if w is None]
+        if miss:
+            fresh = self._encode_batch([texts[i] for i in miss])
+            for i, w in zip(miss, fresh):
+                self.cache.put_wave(keys[i], w)
+                found[i] = w
+        return np.stack(found)
+
+    # ---------- columns ----------
+
+    def __len__(self):
+        return len(self.ids)
+
+    @property
+    def store(self) -> _EntryView:
+        return _EntryView(self)
+
+    def _columns(self) -> Dict[str, Tuple[str, type]]:
+        return {**SPECTRAL_COLUMNS[self.precision], **ROW_COLUMNS}
+
+    def _spectral(self, sel=slice(None)) -> List[np.ndarray]:
+        return [getattr(self, attr)[sel] for attr in SPECTRAL_COLUMNS[self.precision]]
+
+    def _spectrum(self, sel):
+        """(mag, phasor) of a row or rows; compact codes are dequantized."""
+        a, b = self._spectral(sel)
+        if self.precision == "exact":
+            return a, b
+        return quant.dequantize(a, b, quant.PHASE_BITS[self.precision])
+
+    def _set_spectrum(self, row, mag: np.ndarray, phasor: np.ndarray):
+        if self.precision != "exact":
+            mag, phasor = quant.quantize(mag, phasor, quant.PHASE_BITS[self.precision])
+        for attr, col in zip(SPECTRAL_COLUMNS[self.precision], (mag, phasor)):
+            getattr(self, attr)[row] = col
+
+    @property
+    def mags(self) -> np.ndarray:
+        return self._spectrum(slice(0, len(self)))[0]
+
+    @property
+    def phasors(self) -> np.ndarray:
+        return self._spectrum(slice(0, len(self)))[1]
+
+    def bytes_per_trace(self) -> int:
+        """Resident bytes per document across all trace columns."""
+        return sum(np.dtype(dtype).itemsize * (self.N if attr in SPECTRAL_COLUMNS[self.precision] else 1)
+                   for attr, (_fname, dtype) in self._columns().items())
+
+    @property
+    def strength(self) -> np.ndarray:
+        """Decayed strength of every row at the current step (see _strength_at)."""
+        return self._strength_at(slice(0, len(self)))
+
+    def _strength_at(self, sel) -> np.ndarray:
+        """
+        Lazy decay: the stored strength is as of the row's last_used step, so
+        the strength now is strength * (1 - decay)^(step - last_used).
+        Rows touched at the current step come back bitwise unchanged.
+        """
+        s = self._strength[sel]
+        if self.decay == 0:
+            return s
+        age = self.step - self._last_used[sel]
+        return (s * np.power(1.0 - self.decay, age)).astype(np.float32)
+
+    @property
+    def last_used(self) -> np.ndarray:
+        return self._last_used[:len(self)]
+
+    def _reserve(self, n: int):
+        """Grow column capacity (amortized doubling) to hold at least n rows."""
+        cap = self._strength.shape[0]
+        if n <= cap:
+            return
+        cap = max(n, 2 * cap, 64)
+        used = len(self.ids)
+
+        def grow(a: np.ndarray) -> np.ndarray:
+            out = np.zeros((cap,) + a.shape[1:], dtype=a.dtype)
+            out[:used] = a[:used]
+            return out
+
+        for attr in self._columns():
+            setattr(self, attr, grow(getattr(self, attr)))
+
+    def wave(self, row: int) -> np.ndarray:
+        """
+        Rebuild the unit-norm time-domain trace of a row from its spectrum.
+        Parseval fixes the scale dropped by max-normalization: sum|F|^2 = N.
+        """
+        mag, phasor = self._spectrum(row)
+        F = mag.astype(np.complex64) * phasor
+        energy = float(np.sum(np.abs(F) ** 2))
+        if energy > 0:
+            F = F * np.sqrt(self.N / energy)
+        return np.fft.ifft(F).astype(np.complex64)
+
+    def entry(self, row: int) -> Entry:
+        return (self.texts[row], self.wave(row),
+                int(self._last_used[row]), float(self._strength_at(row)))
+
+    # ---------- mutation ----------
+
+    def _trace_spectra(self, texts: List[str]):
+        """
+        (mags, phasors) for new traces. Encoders that can build spectra
+        directly (direct_spectra) skip time-domain synthesis and the FFT.
+        """
+        if getattr(self.encoder, "direct_spectra", False) and hasattr(self.encoder, "encode_spectra"):
+            return self.encoder.encode_spectra(texts)
+        return spectra(self._encode_batch(texts))
 
     def add_document(self, doc_id: str, text: str, strength: float = 1.0):
-        wave = self._encode(text)
-        self.store[doc_id] = (text, wave, self.step, float(strength))
+        if getattr(self.encoder, "direct_spectra", False):
+            mags, phasors = self._trace_spectra([text])
+            mag, phasor = mags[0], phasors[0]
+        else:
+            mag, phasor = spectra(self._encode(text))
+        self._put(doc_id, text, mag, phasor, strength)
+
+    def add_documents(self, docs: List[Tuple[str, str]], strength: float = 1.0):
+        """
+        Add a block of (doc_id, text) pairs: encoded with one encode_batch
+        call and transformed with one batched FFT (or built directly in the
+        spectral domain, see _trace_spectra).
+        """
+        docs = list(docs)
+        if not docs:
+            return
+        mags, phasors = self._trace_spectra([text for _doc_id, text in docs])
+        self._reserve(len(self.ids) + len(docs))
+        for (doc_id, text), mag, phasor in zip(docs, mags, phasors):
+            self._put(doc_id, text, mag, phasor, strength)
+
+    def _put(self, doc_id: str, text: str, mag: np.ndarray, phasor: np.ndarray, strength: float):
+        row = self.rows.get(doc_id)
+        if row is None:
+            row = len(self.ids)
+            self._reserve(row + 1)
+            self.ids.append(doc_id)
+            self.texts.append(text)
+            self.rows[doc_id] = row
+        else:
+            self.texts[row] = text
+            for index in (self.index, self.clusters, self.cascade):
+                if index is not None:
+                    index.mark_dirty(row)
+
+        self._set_spectrum(row, mag, phasor)
+        self._strength[row] = float(strength)
+        self._last_used[row] = self.step
+        self._touch()
+
+    def update_trace(self, doc_id: str, q_wave: np.ndarray, eta: float | None = None):
+        """
+        Reinforce a trace with a query: blend the query wave into the trace by
+        eta, refresh its spectrum in place, fold the pending decay into its
+        strength and move that strength toward 1 by eta.
+        """
+        eta = self.eta if eta is None else eta
+        row = self.rows[doc_id]
+        w = (1.0 - eta) * self.wave(row) + eta * np.asarray(q_wave)
+        w = w / (np.linalg.norm(w) + 1e-8)
+        mag, phasor = spectra(w)
+        self._set_spectrum(row, mag, phasor)
+
+        s = float(self._strength_at(row))
+        self._strength[row] = s + eta * (1.0 - s)
+        self._last_used[row] = self.step
+        for index in (self.index, self.clusters, self.cascade):
+            if index is not None:
+                index.mark_dirty(row)
+        self._touch()
+
+    def decay_traces(self, steps: int = 1):
+        """
+        Advance the global step. Strengths decay lazily (_strength_at), so
+        this is O(1) whatever the number of traces or steps.
+        """
+        self.step += int(steps)
+        self._touch(rows=False)
+
+    # ---------- search ----------
+
+    def _scan(self, q_waves: np.ndarray, topk: int, K: int, lam: float,
+              rows: np.ndarray | None = None, clock=None) -> List[Tuple[np.ndarray, np.ndarray]]:
+        """
+        Score a block of queries against the store (or a subset of rows) in
+        one tiled pass, keeping a running top-k per query.
+        Returns per query (rows, scores), best first, ties by row order, with
+        rows tied at the k-th score kept for the doc-id tie-break (_rows_out).
+        With an instrument clock, top-k merging is charged to "select".
+        """
+        n = len(self) if rows is None else len(rows)
+        Q = len(q_waves)
+        best = [(np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.float32)) for _ in range(Q)]
+        if n == 0 or topk <= 0:
+            return best
+
+        prep = self._prepare(q_waves, K)
+        for d0 in range(0, n, self.doc_block):
+            if rows is None:
+                tile_rows = np.arange(d0, min(n, d0 + self.doc_block))
+                sel = slice(d0, d0 + len(tile_rows))
+            else:
+                tile_rows = rows[d0:d0 + self.doc_block]
+                sel = tile_rows
+            tile = self._spectral(sel)
+            strength = self._strength_at(sel)
+
+            for j in range(Q):
+                # one matvec per query keeps scores identical to single-query search
+                s = self._tile_scores(prep, j, tile, lam) * strength
+                if clock is None:
+                    best[j] = merge_topk(best[j], tile_rows, s, topk)
+                else:
+                    t0 = time.perf_counter()
+                    best[j] = merge_topk(best[j], tile_rows, s, topk)
+                    clock.split("select", time.perf_counter() - t0)
+        if clock is not None:
+            clock.docs += n * Q
+        return best
+
+    def _prepare(self, q_waves: np.ndarray, K: int):
+        """
+        Per-query scoring state for _tile_scores, computed once per scan:
+        ("dense", (w_mag, w_phc)) from query_weights, or ("bins", [(idx, q_mag, q_phc)]).
+        """
+        if self.precision == "exact" and K * self.gather_ratio >= self.N:
+            return "dense", query_weights(q_waves, K)
+        bins = [query_bins(q, K) for q in q_waves]
+        if self.precision == "exact":
+            bins = [(idx, q_mag, np.conj(q_phasor)) for idx, q_mag, q_phasor in bins]
+        return "bins", bins
+
+    def _tile_scores(self, prep, j: int, tile: List[np.ndarray], lam: float) -> np.ndarray:
+        mag_term, phase_term = self._tile_terms(prep, j, tile)
+        return mag_term + lam * phase_term
+
+    def _tile_terms(self, prep, j: int, tile: List[np.ndarray]) -> Tuple[np.ndarray, np.ndarray]:
+        """(mag_term, phase_term) of a tile: _tile_scores for any lam is mag + lam * phase."""
+        form, state = prep
+        if form == "dense":
+            w_mag, w_phc = state
+            return resonance_terms(w_mag[j], w_phc[j], tile[0], tile[1])
+        idx, q_mag, q_phasor = state[j]
+        if self.precision == "exact":
+            return gathered_terms(idx, q_mag, q_phasor, tile[0], tile[1])
+        return quant.code_terms(idx, q_mag, q_phasor, tile[0], tile[1], quant.PHASE_BITS[self.precision])
+
+    def build_index(self) -> SpectralIndex:
+        """
+        Build the bin-major copy of the spectral columns (as many bytes again)
+        that search scans instead of the row-major columns. Rows added or
+        replaced later are scored with the row kernel until the next build.
+        """
+        self.index = SpectralIndex.build(self)
+        return self.index
+
+    def build_clusters(self, nlist: int | None = None, seed: int = 0) -> ClusterIndex:
+        """
+        Build the approximate clustered index searched with nprobe
+        (default nlist = 4*sqrt(n)). Rows added later are always scored.
+        """
+        self.clusters = ClusterIndex.build(self, nlist=nlist, seed=seed)
+        self.clusters.store = self.fingerprint()
+        return self.clusters
+
+    def fingerprint(self, n: int | None = None, sample: int = 1024) -> dict:
+        """
+        Identity of the first n rows (default: all) for indexes saved apart
+        from the store: N, precision, encoder, a hash of the doc ids in row
+        order and a hash of an evenly spaced sample of traces (re-encoded or
+        rewritten rows change it).
+        """
+        n = len(self.ids) if n is None else n
+        rows = np.unique(np.linspace(0, n - 1, num=min(n, sample)).astype(np.int64))
+        traces = hashlib.sha1()
+        for attr in SPECTRAL_COLUMNS[self.precision]:
+            traces.update(np.ascontiguousarray(getattr(self, attr)[rows]).tobytes())
+        return {"count": n, "N": self.N, "precision": self.precision, "encoder": self.encoder_info,
+                "ids": hashlib.sha1("\n".join(self.ids[:n]).encode("utf-8")).hexdigest(),
+                "traces": traces.hexdigest()}
+
+    def build_cascade(self, bins: int = 64) -> CascadeIndex:
+        """
+        Build the low-resolution view (the store's `bins` strongest FFT bins)
+        searched with `survivors`. Rows added later are picked up on the next search.
+        """
+        self.cascade = CascadeIndex.build(self, bins=bins)
+        return self.cascade
+
+    def load_clusters(self, path: str) -> ClusterIndex:
+        clusters = ClusterIndex.load(path)
+        if clusters.centroid_mags.shape[1] != self.N or clusters.n > len(self):
+            raise ValueError(f"{path}: cluster index (N={clusters.centroid_mags.shape[1]}, "
+                             f"{clusters.n} rows) does not fit this store (N={self.N}, {len(self)} rows)")
+        if clusters.store != json.loads(json.dumps(self.fingerprint(clusters.n))):
+            raise ValueError(f"{path}: cluster index was built over other rows "
+                             f"(collection, row order, encoder or traces differ)")
+        self.clusters = clusters
+        return clusters
+
+    def quantized(self, precision: str) -> "MemoryStore":
+        """
+        Copy of this store with its spectra re-coded at another precision
+        (nothing is re-encoded; the encoder is shared). ids, rows and texts
+        are copied, so adding to either store leaves the other unchanged.
+        Converting from a compact precision keeps its quantization error.
+        """
+        out = MemoryStore(N=self.N, eta=self.eta, decay=self.decay, precision=precision)
+        out.encoder, out.encoder_info, out.step = self.encoder, dict(self.encoder_info), self.step
+        n = len(self.ids)
+        out.ids, out.rows = list(self.ids), dict(self.rows)
+        out.texts = self.texts[:n]          # own offsets and RAM rows over the same map
+        out._strength = np.array(self._strength[:n])
+        out._last_used = np.array(self._last_used[:n])
+        for attr, (_fname, dtype) in SPECTRAL_COLUMNS[precision].items():
+            setattr(out, attr, np.zeros((n, self.N), dtype=dtype))
+        for d0 in range(0, n, self.doc_block):
+            sel = slice(d0, min(n, d0 + self.doc_block))
+            out._set_spectrum(sel, *self._spectrum(sel))
+        return out
+
+    def _rows_out(self, rows: np.ndarray, scores: np.ndarray, topk: int):
+        """Result tuples for the final top-k only, ties by doc id (store.topk.finalize)."""
+        rows, scores = finalize((rows, scores), topk, self.ids)
+        strength = self._strength_at(np.asarray(rows, dtype=np.int64))
+        return [(self.ids[r], self.texts[r], float(s), float(st))
+                for r, s, st in zip(rows, scores, strength)]
 
     def search(self, query: str, topk: int = 3, K: int = 16, lam: float = 0.5,
-               restrict_ids: set[str] | None = None):
+               restrict_ids: set[str] | None = None, nprobe: int | None = None,
+               survivors: int | None = None):
         """
         Search the memory for documents matching the query.
         If restrict_ids is provided, only score those doc_ids.
+        With nprobe (and build_clusters()), score only the nprobe closest clusters.
+        With survivors (and build_cascade()), rank all traces at low resolution
+        and re-score only the best `survivors` at full resolution.
+        """
+        clock = self.instruments.clock() if self.instruments is not None else None
+        if self.cache is not None:
+            self.cache.sync(self.generation)
+            key = (query, topk, K, lam, restrict_key(restrict_ids), nprobe, survivors)
+            hit = self.cache.get_result(key)
+            q_wave = self._query_waves([query])[0]
+            if hit is not None:
+                if clock is not None:
+                    clock.lap("encode")
+                    self.instruments.finish(clock, "search", mode="cache")
+                return list(hit), q_wave
+        else:
+            q_wave = self._encode(query)
+        if clock is not None:
+            clock.lap("encode")
+
+        rows = None
+        if restrict_ids is not None:
+            rows = np.array(sorted(self.rows[d] for d in restrict_ids if d in self.rows),
+                            dtype=np.int64)
+
+        if rows is None and nprobe and self.clusters is not None:
+            mode = "clusters"
+            r, s = self.clusters.search(self, q_wave, topk, K, lam, nprobe)
+            scored = self.clusters.last_scored
+        elif rows is None and survivors and self.cascade is not None:
+            mode = "cascade"
+            (r, s), = self.cascade.search(self, q_wave[None, :], topk, K, lam, survivors)
+            scored = min(survivors, len(self))
+        elif rows is None and self.index is not None:
+            mode = "index"
+            r, s = self.index.search(self, q_wave, topk, K, lam)
+            scored = self.index.last_scored
+        else:
+            mode = "scan" if rows is None else "restrict"
+            (r, s), = self._scan(q_wave[None, :], topk, K, lam, rows=rows, clock=clock)
+            scored = 0                      # counted by _scan
+        if clock is not None:
+            clock.docs += scored
+            clock.lap("score")
+        out = self._rows_out(r, s, topk)
+        if self.cache is not None:
+            self.cache.put_result(key, out)
+        if clock is not None:
+            clock.lap("assemble")
+            self.instruments.finish(clock, "search", mode=mode)
+        return out, q_wave
+
+    def search_batch(self, queries: List[str], topk: int = 3, K: int = 16, lam: float = 0.5,
+                     nprobe: int | None = None, survivors: int | None = None):
+        """
+        Search a block of queries in one pass over the trace store.
+        Returns (per-query result lists as in search(), query waves (Q, N)).
         """
-        q_wave = self._encode(query)
-        scored = []
-        for doc_id, (text, wave, _, strength) in self.store.items():
-            if restrict_ids is not None and doc_id not in restrict_ids:
+        if len(queries) == 0:
+            return [], np.zeros((0, self.N), dtype=np.complex64)
+        clock = self.instruments.clock() if self.instruments is not None else None
+        q_waves = self._query_waves(list(queries))
+
+        results: List[list | None] = [None] * len(queries)
+        if self.cache is not None:
+            self.cache.sync(self.generation)
+            keys = [(q, topk, K, lam, None, nprobe, survivors) for q in queries]
+            for j, key in enumerate(keys):
+                hit = self.cache.get_result(key)
+                results[j] = list(hit) if hit is not None else None
+        todo = [j for j, r in enumerate(results) if r is None]
+        if clock is not None:
+            clock.lap("encode")
+
+        scored = 0
+        if nprobe and self.clusters is not None:
+            mode = "clusters"
+            best = []
+            for j in todo:
+                best.append(self.clusters.search(self, q_waves[j], topk, K, lam, nprobe))
+                scored += self.clusters.last_scored
+        elif survivors and self.cascade is not None:
+            mode = "cascade"
+            best = self.cascade.search(self, q_waves[todo], topk, K, lam, survivors) if todo else []
+            scored = min(survivors, len(self)) * len(todo)
+        elif self.index is not None:
+            mode = "index"
+            best = []
+            for j in todo:
+                best.append(self.index.search(self, q_waves[j], topk, K, lam))
+                scored += self.index.last_scored
+        else:
+            mode = "scan"
+            best = self._scan(q_waves[todo], topk, K, lam, clock=clock) if todo else []
+        if clock is not None:
+            clock.docs += scored
+            clock.lap("score")
+        for j, (r, s) in zip(todo, best):
+            results[j] = self._rows_out(r, s, topk)
+            if self.cache is not None:
+                self.cache.put_result(keys[j], results[j])
+        if clock is not None:
+            clock.lap("assemble")
+            self.instruments.finish(clock, "search", queries=len(queries), mode=mode,
+                                    cached=len(queries) - len(todo))
+        return results, q_waves
+
+    def rerank_batch(self, queries: List[str], candidates: np.ndarray, topk: int = 3, K: int = 16,
+                     lam: float = 0.5):
+        """
+        Second stage of two-stage retrieval: score each query only against its
+        own candidate rows (e.g. a FAISS shortlist mapped to store rows).
+        candidates is (Q, S) or a list of row arrays; entries < 0 are padding.
+        Returns (per-query result lists as in search(), query waves (Q, N)).
+        """
+        if len(queries) == 0:
+            return [], np.zeros((0, self.N), dtype=np.complex64)
+        clock = self.instruments.clock() if self.instruments is not None else None
+        q_waves = self._query_waves(list(queries))
+        if self.cache is not None:
+            self.cache.sync(self.generation)
+        if clock is not None:
+            clock.lap("encode")
+
+        results = []
+        for j, query in enumerate(queries):
+            rows = np.asarray(candidates[j], dtype=np.int64)
+            rows = np.unique(rows[(rows >= 0) & (rows < len(self))])   # sorted, like restrict_ids
+            key = (query, topk, K, lam, rows_key(rows), None, None)
+            hit = self.cache.get_result(key) if self.cache is not None else None
+            if hit is not None:
+                results.append(list(hit))
                 continue
+            (r, s), = self._scan(q_waves[j:j + 1], topk, K, lam, rows=rows, clock=clock)
+            if clock is not None:
+                clock.lap("score")
+            out = self._rows_out(r, s, topk)
+            if self.cache is not None:
+                self.cache.put_result(key, out)
+            results.append(out)
+            if clock is not None:
+                clock.lap("assemble")
+        if clock is not None:
+            self.instruments.finish(clock, "rerank", queries=len(queries), mode="rerank")
+        return results, q_waves
+
+    # ---------- persistence ----------
+
+    def save(self, path: str):
+        """
+        Write a binary snapshot directory. Each file is written to a temp name
+        and renamed into place (header last), so a store memory-mapped from the
+        same path keeps reading its old files until it is reloaded.
+        """
+        root = Path(path)
+        root.mkdir(parents=True, exist_ok=True)
+        n = len(self.ids)
+
+        def write(name: str, dump):
+            tmp = root / (name + ".tmp")
+            with open(tmp, "wb") as f:
+                out = dump(f)
+            os.replace(tmp, root / name)
+            return out
+
+        for attr, (fname, dtype) in self._columns().items():
+            col = np.ascontiguousarray(getattr(self, attr)[:n], dtype=dtype)
+            write(fname, col.tofile)
+        ids = self._id_lines(0, n)
+        write(IDS, lambda f: f.write(ids))
+        # streamed: rows still in the old file are copied as bytes, not decoded
+        bounds = write(TEXTS, lambda f: write_jsonl(self.texts, f, 0, n))
+        write(TEXT_OFFSETS, bounds.astype("<i8").tofile)
+        write(HEADER, lambda f: f.write(json.dumps(self._header(n, len(ids), int(bounds[-1])),
+                                                   indent=2).encode("utf-8")))
+
+    def _id_lines(self, lo: int, hi: int) -> bytes:
+        return "".join(d + "\n" for d in self.ids[lo:hi]).encode("utf-8")
+
+    def _header(self, n: int, ids_bytes: int, texts_bytes: int) -> dict:
+        header = {
+            "format": FORMAT,
+            "version": FORMAT_VERSION,
+            "N": self.N,
+            "eta": self.eta,
+            "decay": self.decay,
+            "step": self.step,
+            "count": n,
+            "precision": self.precision,
+            "encoder": self.encoder_info,
+            "columns": {**{fname: np.dtype(dtype).str for fname, dtype in self._columns().values()},
+                        TEXT_OFFSETS: "<i8"},
+            "sizes": {IDS: ids_bytes, TEXTS: texts_bytes},
+        }
+        if self.checkpoint is not None:
+            header["checkpoint"] = self.checkpoint
+        return header
+
+    def append_to(self, path: str, checkpoint: dict | None = None) -> int:
+        """
+        Append every row of this store to the snapshot at `path` (created if
+        missing) without rewriting the rows already there. Column, id and text
+        files are cut back to the header's committed size, extended, and the
+        header is rewritten last with the new count and `checkpoint`, so a
+        crash mid-append leaves the previous snapshot intact.
+
+        Doc ids are not checked against the snapshot; callers skip duplicates.
+        Returns the snapshot's new row count.
+        """
+        root = Path(path)
+        if not (root / HEADER).exists():
+            self.checkpoint = checkpoint
+            self.save(path)
+            return len(self.ids)
+
+        header = self.read_header(path)
+        if int(header["N"]) != self.N or header.get("precision", "exact") != self.precision:
+            raise ValueError(f"{path}: N/precision {header['N']}/{header.get('precision', 'exact')} "
+                             f"do not match this store ({self.N}/{self.precision})")
+        if header.get("encoder") and self.encoder_info and header["encoder"] != self.encoder_info:
+            raise ValueError(f"{path} was built with encoder {header['encoder']}, not {self.encoder_info}")
+
+        n_old, n = int(header["count"]), len(self.ids)
+        sizes = header.get("sizes") or _text_sizes(root, n_old)
+
+        def extend(name: str, committed: int, data: bytes):
+            with open(root / name, "r+b" if (root / name).exists() else "wb") as f:
+                if f.seek(0, os.SEEK_END) != committed:
+                    f.truncate(committed)
+                f.seek(committed)
+                f.write(data)
+
+        for attr, (fname, dtype) in self._columns().items():
+            col = np.ascontiguousarray(getattr(self, attr)[:n], dtype=dtype)
+            row_bytes = col.itemsize * (self.N if attr in SPECTRAL_COLUMNS[self.precision] else 1)
+            extend(fname, n_old * row_bytes, col.tobytes())
+        ids = self._id_lines(0, n)
+        buf = io.BytesIO()
+        bounds = write_jsonl(self.texts, buf, 0, n)
+        texts = buf.getvalue()
+
+        # text offsets: extend the committed index, or build it once for older snapshots
+        if _text_bounds(root, n_old, header) is not None:
+            prefix, committed = np.zeros(0, dtype=np.int64), 8 * (n_old + 1)
+        else:
+            prefix, committed = line_bounds(open_mmap(root / TEXTS), n_old), 0
+        extend(IDS, sizes[IDS], ids)
+        extend(TEXTS, sizes[TEXTS], texts)
+        extend(TEXT_OFFSETS, committed,
+               np.concatenate([prefix, bounds[1:] + sizes[TEXTS]]).astype("<i8").tobytes())
+
+        out = dict(header)
+        out.update(count=n_old + n, sizes={IDS: sizes[IDS] + len(ids), TEXTS: sizes[TEXTS] + len(texts)},
+                   columns={**header.get("columns", {}), TEXT_OFFSETS: "<i8"})
+        if checkpoint is not None:
+            out["checkpoint"] = checkpoint
+        tmp = root / (HEADER + ".tmp")
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(out, f, indent=2)
+        os.replace(tmp, root / HEADER)
+        return n_old + n
+
+    @staticmethod
+    def read_header(path: str) -> dict:
+        header_path = Path(path) / HEADER
+        if not header_path.exists():
+            raise FileNotFoundError(str(header_path))
+        with open(header_path, "r", encoding="utf-8") as f:
+            header = json.load(f)
+        if header.get("format") != FORMAT:
+            raise ValueError(f"{path} is not a {FORMAT} snapshot")
+        if int(header.get("version", 0)) > FORMAT_VERSION:
+            raise ValueError(f"{path} uses format version {header['version']}, "
+                             f"this build reads up to {FORMAT_VERSION}")
+        return header
+
+    @classmethod
+    def read_ids(cls, path: str) -> List[str]:
+        """Committed doc ids of a snapshot, without touching traces or texts."""
+        return _read_lines(Path(path) / IDS, int(cls.read_header(path)["count"]))
+
+    @classmethod
+    def load(cls, path: str, encoder=None, mmap: bool = True) -> "MemoryStore":
+        """
+        Open a snapshot written by save(). With mmap=True the trace columns are
+        copy-on-write memory maps: nothing is read until a search touches it,
+        pages are shared between processes through the page cache, and in-place
+        changes stay private to this process until the next save().
+        """
+        header = cls.read_header(path)
+        root = Path(path)
+        N, n = int(header["N"]), int(header["count"])
+
+        m = cls(N=N, eta=header["eta"], decay=header["decay"],
+                precision=header.get("precision", "exact"))
+        m.step = int(header["step"])
+        m.encoder_info = header.get("encoder", {})
+        m.checkpoint = header.get("checkpoint")
+
+        for attr, (fname, dtype) in m._columns().items():
+            shape = (n, N) if attr in SPECTRAL_COLUMNS[m.precision] else (n,)
+            if mmap and n > 0:
+                col = np.memmap(root / fname, dtype=dtype, mode="c", shape=shape)
+            else:
+                col = np.fromfile(root / fname, dtype=dtype, count=int(np.prod(shape))).reshape(shape)
+            setattr(m, attr, col)
 
-            base = resonance_score(q_wave, wave, K=K, lam=lam)
-            s = base * strength
-            scored.append((doc_id, text, s, strength))
+        m.ids = _read_lines(root / IDS, n)
+        m.texts = TextStore.open(root / TEXTS, n, _text_bounds(root, n, header))
+        m.rows = {d: r for r, d in enumerate(m.ids)}
 
-        scored.sort(key=lambda x: x[2], reverse=True)
-        return scored[:topk], q_wave
+        if encoder is not None:
+            m.set_encoder(encoder)
+        return m
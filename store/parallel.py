@@ -0,0 +1,257 @@
+# store/parallel.py
+# Multi-core full scan: trace columns in shared memory, one persistent worker pool.
+# Multi-core build: documents encoded by a pool straight into preallocated rows.
+
+from __future__ import annotations
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, List, Tuple
+import multiprocessing as mp
+import os
+from multiprocessing import shared_memory
+
+import numpy as np
+
+from store.memory import MemoryStore, SPECTRAL_COLUMNS
+from store.topk import merge_partials
+
+
+# ---------- worker side ----------
+
+class _ShardView(MemoryStore):
+    """Store over a row range of shared columns; only used for scoring."""
+
+    def __init__(self, N: int, precision: str, n: int, decay: float, step: int):
+        super().__init__(N=N, decay=decay, precision=precision)
+        self.step = step
+        self._n = n
+
+    def __len__(self):
+        return self._n
+
+
+_W: dict = {}      # per-worker state, filled once by _attach
+
+
+def _open_shm(name: str) -> shared_memory.SharedMemory:
+    # Pool workers share the parent's resource tracker, which already owns
+    # the block; the parent unlinks it in ParallelSearcher.close().
+    try:
+        return shared_memory.SharedMemory(name=name, track=False)   # Python 3.13+
+    except TypeError:
+        return shared_memory.SharedMemory(name=name)
+
+
+def _attach(N: int, precision: str, n: int, doc_block: int, decay: float, columns: dict):
+    blocks, arrays = [], {}
+    for attr, (name, dtype, shape) in columns.items():
+        shm = _open_shm(name)
+        blocks.append(shm)
+        arrays[attr] = np.ndarray(shape, dtype=dtype, buffer=shm.buf)
+    _W.update(N=N, precision=precision, n=n, doc_block=doc_block, decay=decay, arrays=arrays, blocks=blocks)
+
+
+def _scan_shard(bounds: Tuple[int, int], q_waves: np.ndarray, topk: int, K: int, lam: float, step: int):
+    lo, hi = bounds
+    view = _ShardView(_W["N"], _W["precision"], hi - lo, _W["decay"], step)
+    view.doc_block = _W["doc_block"]
+    for attr, arr in _W["arrays"].items():
+        setattr(view, attr, arr[lo:hi])
+    return [(r + lo, s) for r, s in view._scan(q_waves, topk, K, lam)]
+
+
+# ---------- parent side ----------
+
+class ParallelSearcher:
+    """
+    Sharded full scan over a snapshot of a MemoryStore.
+
+    The spectral, strength and last_used columns are copied once into shared memory;
+    pool workers attach to them at startup, so a query only ships its waves
+    (Q x N) and gets back per-shard top-k lists. Shard bounds fall on
+    doc_block multiples and shard results merge with the same row-order tie
+    break as MemoryStore._scan, so rankings are identical to mem.search_batch.
+
+    Decay steps are followed (the current step ships with each query), but
+    added or reinforced traces are not visible: build a new searcher (or
+    call close() and rebuild) after changing rows of the store.
+    """
+
+    def __init__(self, mem: MemoryStore, workers: int | None = None, shards: int | None = None):
+        self.mem = mem
+        self.n = len(mem)
+        self.row_version = mem.row_version
+        self.workers = workers or os.cpu_count() or 1
+        self._blocks: List[shared_memory.SharedMemory] = []
+
+        columns = {}
+        for attr in list(SPECTRAL_COLUMNS[mem.precision]) + ["_strength", "_last_used"]:
+            src = getattr(mem, attr)[:self.n]
+            shm = shared_memory.SharedMemory(create=True, size=max(1, src.nbytes))
+            self._blocks.append(shm)
+            dst = np.ndarray(src.shape, dtype=src.dtype, buffer=shm.buf)
+            dst[:] = src
+            columns[attr] = (shm.name, src.dtype.str, src.shape)
+
+        # several shards per worker keeps cores busy when shards finish unevenly
+        n_shards = shards or 4 * self.workers
+        step = -(-max(1, self.n) // n_shards)
+        step = -(-step // mem.doc_block) * mem.doc_block
+        self.shards = [(lo, min(self.n, lo + step)) for lo in range(0, self.n, step)]
+
+        self.pool = mp.get_context().Pool(
+            self.workers, initializer=_attach,
+            initargs=(mem.N, mem.precision, self.n, mem.doc_block, mem.decay, columns))
+
+    def _check(self):
+        if len(self.mem) != self.n or self.mem.row_version != self.row_version:
+            raise RuntimeError("MemoryStore changed since the ParallelSearcher was built; rebuild it")
+
+    def _scan(self, q_waves: np.ndarray, topk: int, K: int, lam: float):
+        self._check()
+        if topk <= 0:
+            return [(np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.float32)) for _ in range(len(q_waves))]
+        parts = self.pool.starmap(_scan_shard, [(b, q_waves, topk, K, lam, self.mem.step)
+                                                for b in self.shards])
+        return [merge_partials([shard_best[j] for shard_best in parts], topk) for j in range(len(q_waves))]
+
+    def search(self, query: str, topk: int = 3, K: int = 16, lam: float = 0.5,
+               restrict_ids: set[str] | None = None):
+        if restrict_ids is not None:
+            # a shortlist is small; scoring it in-process beats a fan-out
+            return self.mem.search(query, topk=topk, K=K, lam=lam, restrict_ids=restrict_ids)
+        q_wave = self.mem._encode(query)
+        (r, s), = self._scan(q_wave[None, :], topk, K, lam)
+        return self.mem._rows_out(r, s, topk), q_wave
+
+    def search_batch(self, queries: List[str], topk: int = 3, K: int = 16, lam: float = 0.5):
+        if len(queries) == 0:
+            return [], np.zeros((0, self.mem.N), dtype=np.complex64)
+        q_waves = self.mem._encode_batch(queries)
+        best = self._scan(q_waves, topk, K, lam)
+        return [self.mem._rows_out(r, s, topk) for r, s in best], q_waves
+
+    def rerank_batch(self, queries: List[str], candidates, topk: int = 3, K: int = 16, lam: float = 0.5):
+        # shortlists are small; score them in-process like restricted search()
+        return self.mem.rerank_batch(queries, candidates, topk=topk, K=K, lam=lam)
+
+    def close(self):
+        if self.pool is not None:
+            self.pool.terminate()
+            self.pool.join()
+            self.pool = None
+        for shm in self._blocks:
+            shm.close()
+            shm.unlink()
+        self._blocks = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+# ---------- parallel build ----------
+
+_B: dict = {}      # per-worker build state, filled once by _attach_build
+
+
+def _encode_into(arrays: dict, encoder, N: int, precision: str, lo: int, texts: List[str]) -> int:
+    """Encode texts exactly as add_documents() would and write them to rows lo.. of arrays."""
+    stage = MemoryStore(N=N, encoder=encoder, precision=precision)
+    stage.add_documents([(str(i), t) for i, t in enumerate(texts)])
+    for attr, arr in arrays.items():
+        arr[lo:lo + len(texts)] = getattr(stage, attr)[:len(texts)]
+    return len(texts)
+
+
+def _attach_build(encoder, N: int, precision: str, columns: dict):
+    blocks, arrays = [], {}
+    for attr, (name, dtype, shape) in columns.items():
+        shm = _open_shm(name)
+        blocks.append(shm)
+        arrays[attr] = np.ndarray(shape, dtype=dtype, buffer=shm.buf)
+    _B.update(encoder=encoder, N=N, precision=precision, arrays=arrays, blocks=blocks)
+
+
+def _encode_shared(chunk: Tuple[int, List[str]]) -> int:
+    lo, texts = chunk
+    return _encode_into(_B["arrays"], _B["encoder"], _B["N"], _B["precision"], lo, texts)
+
+
+def build_parallel(mem: MemoryStore, docs: List[Tuple[str, str]], workers: int,
+                   batch_size: int = 256, strength: float = 1.0,
+                   progress: Callable[[int], None] | None = None):
+    """
+    Same result as mem.add_documents(docs), encoded on `workers` cores.
+
+    Rows are assigned up front in document order (a repeated id keeps its
+    first row and its last text), then batches are encoded concurrently and
+    written into preallocated arrays by row index, so ids, row order and
+    trace bytes do not depend on which worker finished first.
+
+    Encoders holding a model (embed) run on a thread pool sharing that one
+    model, since inference releases the GIL; others (char) run on a process
+    pool writing into shared memory.
+    """
+    # ---- 1. Assign rows serially ----
+    last = {}
+    for doc_id, text in docs:
+        last[doc_id] = text
+    if not last:
+        return
+    mem._reserve(len(mem.ids) + sum(d not in mem.rows for d in last))
+    for doc_id, text in last.items():
+        if doc_id in mem.rows:
+            row = mem.rows[doc_id]
+            mem.texts[row] = text
+            for index in (mem.index, mem.clusters, mem.cascade):   # as in MemoryStore._put
+                if index is not None:
+                    index.mark_dirty(row)
+        else:
+            mem.rows[doc_id] = len(mem.ids)
+            mem.ids.append(doc_id)
+            mem.texts.append(text)
+    rows = np.array([mem.rows[d] for d in last], dtype=np.int64)
+    texts = list(last.values())
+    mem._strength[rows] = float(strength)
+    mem._last_used[rows] = mem.step
+    mem._touch()
+
+    # ---- 2. Encode batches concurrently into (n, N) spectral arrays ----
+    n = len(texts)
+    chunks = [(lo, texts[lo:lo + batch_size]) for lo in range(0, n, batch_size)]
+    spec = SPECTRAL_COLUMNS[mem.precision]
+    blocks: List[shared_memory.SharedMemory] = []
+    try:
+        if getattr(mem.encoder, "model", None) is not None:
+            arrays = {attr: np.zeros((n, mem.N), dtype=dtype) for attr, (_f, dtype) in spec.items()}
+            with ThreadPoolExecutor(max_workers=workers) as ex:
+                futures = [ex.submit(_encode_into, arrays, mem.encoder, mem.N, mem.precision, lo, t)
+                           for lo, t in chunks]
+                for fut in futures:
+                    done = fut.result()
+                    if progress:
+                        progress(done)
+        else:
+            arrays, columns = {}, {}
+            for attr, (_f, dtype) in spec.items():
+                shape = (n, mem.N)
+                shm = shared_memory.SharedMemory(create=True, size=max(1, n * mem.N * np.dtype(dtype).itemsize))
+                blocks.append(shm)
+                arrays[attr] = np.ndarray(shape, dtype=dtype, buffer=shm.buf)
+                columns[attr] = (shm.name, np.dtype(dtype).str, shape)
+            with mp.get_context().Pool(workers, initializer=_attach_build,
+                                       initargs=(mem.encoder, mem.N, mem.precision, columns)) as pool:
+                for done in pool.imap_unordered(_encode_shared, chunks):
+                    if progress:
+                        progress(done)
+
+        # ---- 3. Scatter into the store's columns ----
+        for attr, arr in arrays.items():
+            getattr(mem, attr)[rows] = arr
+    finally:
+        for shm in blocks:
+            shm.close()
+            shm.unlink()
+
@@ -0,0 +1,56 @@
+# store/quant.py
+# Compact trace codes: 8-bit magnitude + 8/16-bit phase per FFT bin.
+
+from functools import lru_cache
+import numpy as np
+
+PRECISIONS = ("exact", "q16", "q8")
+
+# phase bits per compact precision
+PHASE_BITS = {"q16": 16, "q8": 8}
+
+MAG_LEVELS = 255
+
+
+@lru_cache(maxsize=None)
+def phase_lut(bits: int):
+    """
+    cos/sin of every phase code. Code c stands for angle -pi + 2*pi*c / 2**bits.
+    """
+    L = 1 << bits
+    theta = -np.pi + 2.0 * np.pi * np.arange(L, dtype=np.float64) / L
+    return np.cos(theta).astype(np.float32), np.sin(theta).astype(np.float32)
+
+
+def quantize(mag: np.ndarray, phasor: np.ndarray, bits: int):
+    """
+    Max-normalized magnitudes (in [0, 1]) -> uint8; unit phasors -> phase codes.
+    Works on a single spectrum (N,) or a block (n, N).
+    """
+    L = 1 << bits
+    mag_codes = np.rint(np.clip(mag, 0.0, 1.0) * MAG_LEVELS).astype(np.uint8)
+    theta = np.angle(phasor).astype(np.float64)
+    phase_codes = np.rint((theta + np.pi) * (L / (2.0 * np.pi))).astype(np.int64) % L
+    return mag_codes, phase_codes.astype(np.uint16 if bits > 8 else np.uint8)
+
+
+def dequantize(mag_codes: np.ndarray, phase_codes: np.ndarray, bits: int):
+    cos_lut, sin_lut = phase_lut(bits)
+    mag = mag_codes.astype(np.float32) / MAG_LEVELS
+    phasor = (cos_lut[phase_codes] + 1j * sin_lut[phase_codes]).astype(np.complex64)
+    return mag, phasor
+
+
+def code_terms(idx: np.ndarray, q_mag: np.ndarray, q_phasor: np.ndarray,
+               mag_codes: np.ndarray, phase_codes: np.ndarray, bits: int):
+    """
+    Magnitude and phase terms of a tile of coded traces against one query's
+    top-K bins. Only the K gathered columns are touched: magnitudes are scaled
+    codes, and cos(q - m) = cos q * cos m + sin q * sin m is read from the phase LUT.
+    """
+    cos_lut, sin_lut = phase_lut(bits)
+    pc = phase_codes[:, idx]
+    mag_term = mag_codes[:, idx] @ (q_mag / MAG_LEVELS).astype(np.float32)
+    phase_term = cos_lut[pc] @ q_phasor.real.astype(np.float32) + sin_lut[pc] @ q_phasor.imag.astype(np.float32)
+    return mag_term, phase_term
+
@@ -0,0 +1,113 @@
+# store/query_cache.py
+# LRU caches for repeated queries: encoded query waves and ranked results.
+
+from __future__ import annotations
+from collections import OrderedDict
+from typing import Hashable, Tuple
+import hashlib
+
+import numpy as np
+
+
+class _LRU:
+    """OrderedDict LRU bounded by entry count and by (estimated) bytes."""
+
+    def __init__(self, max_entries: int, max_bytes: int):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.items: OrderedDict = OrderedDict()    # key -> (value, nbytes)
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key: Hashable):
+        item = self.items.get(key)
+        if item is None:
+            self.misses += 1
+            return None
+        self.items.move_to_end(key)
+        self.hits += 1
+        return item[0]
+
+    def put(self, key: Hashable, value, nbytes: int):
+        if nbytes > self.max_bytes or self.max_entries <= 0:
+            return
+        old = self.items.pop(key, None)
+        if old is not None:
+            self.bytes -= old[1]
+        self.items[key] = (value, nbytes)
+        self.bytes += nbytes
+        while len(self.items) > self.max_entries or self.bytes > self.max_bytes:
+            _key, (_value, size) = self.items.popitem(last=False)
+            self.bytes -= size
+            self.evictions += 1
+
+    def clear(self):
+        self.items.clear()
+        self.bytes = 0
+
+    def stats(self) -> dict:
+        return {"entries": len(self.items), "bytes": self.bytes, "hits": self.hits,
+                "misses": self.misses, "evictions": self.evictions}
+
+
+def restrict_key(restrict_ids) -> str | None:
+    """Order-independent fingerprint of a restrict set (None = full scan)."""
+    if restrict_ids is None:
+        return None
+    h = hashlib.sha1()
+    for d in sorted(restrict_ids):
+        h.update(d.encode("utf-8") + b"\n")
+    return h.hexdigest()
+
+
+def rows_key(rows: np.ndarray) -> str:
+    """Fingerprint of a sorted candidate row array."""
+    return "rows:" + hashlib.sha1(np.ascontiguousarray(rows, dtype=np.int64).tobytes()).hexdigest()
+
+
+class QueryCache:
+    """
+    Two LRUs in front of MemoryStore.search/search_batch:
+
+      waves:   (encoder identity, N, text) -> normalized query wave
+      results: (text, topk, K, lam, restrict fingerprint, nprobe, survivors) -> ranked hits
+
+    Results are only valid for one store generation: the store bumps
+    MemoryStore.generation on every mutation (adding, reinforcing or
+    decaying traces) and the result LRU is dropped the next time it is
+    consulted. Waves depend only on the encoder, so they survive mutations.
+    """
+
+    def __init__(self, max_entries: int = 10000, max_bytes: int = 256 << 20):
+        self.waves = _LRU(max_entries, max_bytes // 2)
+        self.results = _LRU(max_entries, max_bytes // 2)
+        self.generation = 0
+        self.invalidations = 0
+
+    def sync(self, generation: int):
+        if generation != self.generation:
+            if self.results.items:
+                self.invalidations += 1
+            self.results.clear()
+            self.generation = generation
+
+    def get_wave(self, key: Tuple) -> np.ndarray | None:
+        return self.waves.get(key)
+
+    def put_wave(self, key: Tuple, wave: np.ndarray):
+        wave = np.array(wave)
+        wave.setflags(write=False)          # shared by every hit; callers must not mutate it
+        self.waves.put(key, wave, wave.nbytes + 64 + len(key[-1]))
+
+    def get_result(self, key: Tuple):
+        return self.results.get(key)
+
+    def put_result(self, key: Tuple, rows: list):
+        size = 64 + len(key[0]) + sum(96 + len(doc_id) + len(text) for doc_id, text, _s, _st in rows)
+        self.results.put(key, tuple(rows), size)
+
+    def stats(self) -> dict:
+        return {"waves": self.waves.stats(), "results": self.results.stats(),
+                "invalidations": self.invalidations}
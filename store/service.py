@@ -0,0 +1,407 @@
+# store/service.py
+# Long-running HTTP/JSON search service around one loaded MemoryStore, with
+# request micro-batching: concurrent searches arriving within a short window
+# are scored together in one pass over the trace store (search_batch).
+#
+#   python -m store.service --path runs/memory --port 8080 --window-ms 3 --max-batch 64
+#
+#   POST /search  {"query": str, "topk": int, "K": int, "lam": float}
+#   POST /add     {"id": str, "text": str}  or  {"docs": [[id, text], ...]}
+#   GET  /stats   latency and batch-size summaries, counters
+#   GET  /health
+
+from __future__ import annotations
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Tuple
+import argparse
+import asyncio
+import json
+import math
+import time
+
+from store.instrument import Instruments, Summary
+from store.memory import MemoryStore
+
+_REASONS = {200: "OK", 400: "Bad Request", 404: "Not Found", 405: "Method Not Allowed",
+            413: "Payload Too Large", 500: "Internal Server Error", 503: "Service Unavailable"}
+
+
+class Overloaded(Exception):
+    """The pending-request queue is full; the client should back off and retry."""
+
+
+class _Request:
+    __slots__ = ("query", "topk", "K", "lam", "future", "enqueued")
+
+    def __init__(self, query: str, topk: int, K: int, lam: float, future: asyncio.Future):
+        self.query, self.topk, self.K, self.lam = query, topk, K, lam
+        self.future = future
+        self.enqueued = time.perf_counter()
+
+
+def _number(name: str, value, integer: bool):
+    """A JSON parameter as int (integer=True) or float; ValueError for anything else."""
+    kind = "an integer" if integer else "a number"
+    if isinstance(value, bool):
+        raise ValueError(f"'{name}' must be {kind}, got {value!r}")
+    try:
+        x = float(value)
+    except (TypeError, ValueError):
+        raise ValueError(f"'{name}' must be {kind}, got {value!r}")
+    if not math.isfinite(x) or (integer and not x.is_integer()):
+        raise ValueError(f"'{name}' must be {kind}, got {value!r}")
+    return int(x) if integer else x
+
+
+class SearchService:
+    """
+    Micro-batching front end for a MemoryStore.
+
+    search() enqueues a request and awaits its result. One batcher task
+    takes the first waiting request, keeps collecting for up to `window_ms`
+    (or until `max_batch`), groups the batch by (K, lam) and scores each
+    group with one search_batch call at the group's largest topk; smaller
+    topk are prefixes of the same ranking. Scoring and adds run on a single
+    worker thread, so the store is never touched concurrently and the event
+    loop keeps accepting requests while a batch is being scored.
+
+    At most `max_pending` searches wait at once; beyond that search()
+    raises Overloaded (HTTP 503) instead of queueing without bound.
+    """
+
+    def __init__(self, mem: MemoryStore, window_ms: float = 3.0, max_batch: int = 64,
+                 max_pending: int = 1024, topk: int = 10, K: int = 128, lam: float = 1.0):
+        self.mem = mem
+        self.window = window_ms / 1000.0
+        self.max_batch = max(1, max_batch)
+        self.max_pending = max_pending
+        self.defaults = {"topk": topk, "K": K, "lam": lam}
+        self.instruments = Instruments()
+        self.batch_sizes = Summary()
+        self.started = time.time()
+        self._queue: asyncio.Queue | None = None
+        self._batcher: asyncio.Task | None = None
+        self._worker = ThreadPoolExecutor(max_workers=1, thread_name_prefix="cic-score")
+
+    async def start(self):
+        self._queue = asyncio.Queue(maxsize=self.max_pending)
+        self._batcher = asyncio.get_running_loop().create_task(self._run_batches())
+
+    async def stop(self):
+        if self._batcher is not None:
+            self._batcher.cancel()
+            try:
+                await self._batcher
+            except asyncio.CancelledError:
+                pass
+        self._worker.shutdown(wait=True)
+
+    # ---------- requests ----------
+
+    async def search(self, query: str, topk: int | None = None, K: int | None = None,
+                     lam: float | None = None) -> List[Tuple[str, str, float, float]]:
+        topk, K, lam = self.params(topk, K, lam)
+        fut = asyncio.get_running_loop().create_future()
+        req = _Request(query, topk, K, lam, fut)
+        try:
+            self._queue.put_nowait(req)
+        except asyncio.QueueFull:
+            self.instruments.count("rejected")
+            raise Overloaded(f"{self.max_pending} searches pending")
+        rows = await fut
+        self.instruments.observe("service.request", time.perf_counter() - req.enqueued)
+        return rows
+
+    def params(self, topk=None, K=None, lam=None) -> Tuple[int, int, float]:
+        """
+        Parsed search parameters, with the service defaults for those left None.
+        Raises ValueError when one is not a number or out of range
+        (topk >= 0, 1 <= K <= N, finite lam).
+        """
+        topk = _number("topk", self.defaults["topk"] if topk is None else topk, integer=True)
+        K = _number("K", self.defaults["K"] if K is None else K, integer=True)
+        lam = _number("lam", self.defaults["lam"] if lam is None else lam, integer=False)
+        if topk < 0:
+            raise ValueError(f"'topk' must be >= 0, got {topk}")
+        if not 1 <= K <= self.mem.N:
+            raise ValueError(f"'K' must be between 1 and N={self.mem.N}, got {K}")
+        return topk, K, lam
+
+    async def add(self, docs: List[Tuple[str, str]]) -> int:
+        """Add documents on the scoring thread, between batches. Returns the store size."""
+        def run():
+            self.mem.add_documents(docs)
+            return len(self.mem)
+        n = await asyncio.get_running_loop().run_in_executor(self._worker, run)
+        self.instruments.count("added", len(docs))
+        return n
+
+    # ---------- batching ----------
+
+    async def _collect(self) -> List[_Request]:
+        loop = asyncio.get_running_loop()
+        batch = [await self._queue.get()]
+        deadline = loop.time() + self.window
+        while len(batch) < self.max_batch:
+            try:
+                batch.append(self._queue.get_nowait())
+                continue
+            except asyncio.QueueEmpty:
+                pass
+            timeout = deadline - loop.time()
+            if timeout <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(self._queue.get(), timeout))
+            except asyncio.TimeoutError:
+                break
+        return batch
+
+    async def _run_batches(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = await self._collect()
+            start = time.perf_counter()
+            for req in batch:
+                self.instruments.observe("service.queue_wait", start - req.enqueued)
+            self.batch_sizes.add(len(batch))
+            self.instruments.count("batches")
+            self.instruments.count("searches", len(batch))
+
+            groups: Dict[Tuple[int, float], List[_Request]] = {}
+            for req in batch:
+                groups.setdefault((req.K, req.lam), []).append(req)
+            for (K, lam), reqs in groups.items():
+                topk = max(r.topk for r in reqs)
+                try:
+                    results, _q = await loop.run_in_executor(
+                        self._worker, self.mem.search_batch, [r.query for r in reqs], topk, K, lam)
+                except Exception as e:
+                    for r in reqs:
+                        if not r.future.done():
+                            r.future.set_exception(e)
+                    continue
+                for r, rows in zip(reqs, results):
+                    if not r.future.done():
+                        r.future.set_result(rows[:r.topk])
+            self.instruments.observe("service.batch", time.perf_counter() - start)
+
+    def stats(self) -> dict:
+        snap = self.instruments.snapshot()
+        up = time.time() - self.started
+        b = self.batch_sizes
+        return {"uptime_s": up, "docs": len(self.mem), "pending": self._queue.qsize() if self._queue else 0,
+                "qps": snap["counters"].get("searches", 0) / max(up, 1e-9),
+                "window_ms": 1000.0 * self.window, "max_batch": self.max_batch,
+                "batch_size": {"count": b.count, "mean": b.sum / max(b.count, 1), "p50": b.quantile(0.5),
+                               "p95": b.quantile(0.95), "max": b.max},
+                **snap}
+
+
+# ---------- HTTP ----------
+
+class HttpError(Exception):
+    def __init__(self, status: int, message: str):
+        super().__init__(message)
+        self.status = status
+
+
+async def _read_request(reader: asyncio.StreamReader, max_body: int):
+    """(method, path, body bytes, keep_alive) of one HTTP/1.1 request, or None at EOF."""
+    line = await reader.readline()
+    if not line:
+        return None
+    try:
+        method, path, version = line.decode("latin-1").split()
+    except ValueError:
+        raise HttpError(400, "malformed request line")
+    headers = {}
+    while True:
+        h = await reader.readline()
+        if h in (b"\r\n", b"\n", b""):
+            break
+        name, _, value = h.decode("latin-1").partition(":")
+        headers[name.strip().lower()] = value.strip()
+    try:
+        length = int(headers.get("content-length") or 0)
+    except ValueError:
+        raise HttpError(400, "Content-Length is not an integer")
+    if length < 0:
+        raise HttpError(400, "Content-Length is negative")
+    if length > max_body:
+        raise HttpError(413, f"body over {max_body} bytes")
+    body = await reader.readexactly(length) if length else b""
+    keep_alive = headers.get("connection", "").lower() != "close" and version == "HTTP/1.1"
+    return method, path.split("?", 1)[0], body, keep_alive
+
+
+def _add_docs(req: dict) -> List[Tuple[str, str]]:
+    """(id, text) pairs of an /add body; HttpError 400 unless every id is a string
+    or integer and every text a string."""
+    usage = "send {'id', 'text'} or {'docs': [[id, text], ...]}"
+    if "docs" in req:
+        docs = req["docs"]
+        if not isinstance(docs, list) or not docs:
+            raise HttpError(400, f"'docs' must be a non-empty list: {usage}")
+    elif "id" in req and "text" in req:
+        docs = [[req["id"], req["text"]]]
+    else:
+        raise HttpError(400, usage)
+    out = []
+    for i, doc in enumerate(docs):
+        if not isinstance(doc, list) or len(doc) != 2:
+            raise HttpError(400, f"document {i} is not an [id, text] pair")
+        doc_id, text = doc
+        if isinstance(doc_id, bool) or not isinstance(doc_id, (str, int)) or not isinstance(text, str):
+            raise HttpError(400, f"document {i}: id must be a string or integer and text a string")
+        out.append((str(doc_id), text))
+    return out
+
+
+def _response(status: int, payload: dict, keep_alive: bool) -> bytes:
+    body = json.dumps(payload).encode("utf-8")
+    head = (f"HTTP/1.1 {status} {_REASONS.get(status, '')}\r\nContent-Type: application/json\r\n"
+            f"Content-Length: {len(body)}\r\nConnection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n")
+    return head.encode("latin-1") + body
+
+
+class SearchServer:
+    """asyncio HTTP/1.1 (keep-alive) JSON server in front of a SearchService."""
+
+    def __init__(self, service: SearchService, host: str = "127.0.0.1", port: int = 8080,
+                 max_body: int = 16 << 20):
+        self.service = service
+        self.host, self.port = host, port
+        self.max_body = max_body
+        self.server: asyncio.base_events.Server | None = None
+
+    async def start(self):
+        await self.service.start()
+        self.server = await asyncio.start_server(self._handle, self.host, self.port)
+        self.port = self.server.sockets[0].getsockname()[1]
+
+    async def stop(self):
+        if self.server is not None:
+            self.server.close()
+            await self.server.wait_closed()
+        await self.service.stop()
+
+    @property
+    def address(self) -> str:
+        return f"{self.host}:{self.port}"
+
+    async def _route(self, method: str, path: str, body: bytes) -> dict:
+        if path == "/health":
+            return {"ok": True}
+        if path == "/stats":
+            return self.service.stats()
+        if path not in ("/search", "/add"):
+            raise HttpError(404, f"no route {path}")
+        if method != "POST":
+            raise HttpError(405, f"{path} takes POST")
+        try:
+            req = json.loads(body or b"{}")
+        except ValueError:
+            raise HttpError(400, "body is not JSON")
+        if not isinstance(req, dict):
+            raise HttpError(400, "body must be a JSON object")
+
+        if path == "/search":
+            if not isinstance(req.get("query"), str):
+                raise HttpError(400, "'query' (string) is required")
+            try:
+                topk, K, lam = self.service.params(req.get("topk"), req.get("K"), req.get("lam"))
+            except ValueError as e:
+                raise HttpError(400, str(e))
+            start = time.perf_counter()
+            rows = await self.service.search(req["query"], topk, K, lam)
+            return {"results": [{"id": d, "text": t, "score": s, "strength": st} for d, t, s, st in rows],
+                    "latency_ms": 1000.0 * (time.perf_counter() - start)}
+
+        docs = _add_docs(req)
+        n = await self.service.add(docs)
+        return {"added": len(docs), "docs": n}
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        try:
+            while True:
+                keep_alive = False
+                try:
+                    req = await _read_request(reader, self.max_body)
+                    if req is None:
+                        break
+                    method, path, body, keep_alive = req
+                    status, payload = 200, await self._route(method, path, body)
+                except HttpError as e:
+                    status, payload = e.status, {"error": str(e)}
+                except Overloaded as e:
+                    status, payload = 503, {"error": str(e)}
+                except (asyncio.IncompleteReadError, ConnectionError):
+                    break
+                except Exception as e:
+                    status, payload = 500, {"error": f"{type(e).__name__}: {e}"}
+                writer.write(_response(status, payload, keep_alive))
+                await writer.drain()
+                if not keep_alive:
+                    break
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+
+
+def load_store(path: str, encoder_name: str | None = None, model_name: str | None = None,
+               device: str | None = None) -> MemoryStore:
+    """Load a snapshot and attach the encoder recorded in its header (or the one named)."""
+    from encoders.factory import make_encoder
+
+    mem = MemoryStore.load(path)
+    info = mem.encoder_info or {}
+    enc = make_encoder(encoder_name or info.get("name", "char"), N=mem.N,
+                       model_name=model_name or info.get("model", "all-MiniLM-L6-v2"), device=device)
+    mem.set_encoder(enc)
+    return mem
+
+
+def main():
+    ap = argparse.ArgumentParser("CWM search service")
+    ap.add_argument("--path", required=True, help="Snapshot directory (MemoryStore.save)")
+    ap.add_argument("--encoder", default=None, help="Override the encoder recorded in the snapshot")
+    ap.add_argument("--model", default=None)
+    ap.add_argument("--device", default=None)
+    ap.add_argument("--host", default="127.0.0.1")
+    ap.add_argument("--port", type=int, default=8080)
+    ap.add_argument("--window-ms", type=float, default=3.0, help="How long a batch collects requests")
+    ap.add_argument("--max-batch", type=int, default=64, help="Searches scored per store pass")
+    ap.add_argument("--max-pending", type=int, default=1024, help="Queued searches before 503s")
+    ap.add_argument("--topk", type=int, default=10)
+    ap.add_argument("--K", type=int, default=128)
+    ap.add_argument("--lam", type=float, default=1.0)
+    ap.add_argument("--save", action="store_true", help="Save the snapshot (with added docs) on shutdown")
+    args = ap.parse_args()
+
+    mem = load_store(args.path, args.encoder, args.model, args.device)
+    service = SearchService(mem, window_ms=args.window_ms, max_batch=args.max_batch,
+                            max_pending=args.max_pending, topk=args.topk, K=args.K, lam=args.lam)
+    server = SearchServer(service, host=args.host, port=args.port)
+
+    async def serve():
+        await server.start()
+        print(f"[service] {len(mem)} traces from {args.path} on http://{server.address} "
+              f"(window {args.window_ms} ms, max batch {args.max_batch})", flush=True)
+        try:
+            await asyncio.Event().wait()
+        finally:
+            await server.stop()
+
+    try:
+        asyncio.run(serve())
+    except KeyboardInterrupt:
+        pass
+    if args.save:
+        mem.save(args.path)
+        print(f"[service] saved {len(mem)} traces to {args.path}")
+
+
+if __name__ == "__main__":
+    main()
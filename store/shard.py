@@ -0,0 +1,268 @@
+# store/shard.py
+# Multi-node scatter/gather: shard servers over TCP and a coordinator that merges them.
+#
+# Wire format, both directions: !II (header length, payload length), a JSON
+# header, then a raw payload. Search requests carry the query waves as
+# complex128 bytes, the precision local search scores them at; replies carry
+# per-query hits in the JSON header.
+
+from __future__ import annotations
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Tuple
+import argparse
+import json
+import socket
+import socketserver
+import struct
+import threading
+
+import numpy as np
+
+from store.memory import MemoryStore
+from store.topk import finalize, merge_hits
+
+_FRAME = struct.Struct("!II")
+
+
+def _recv_exact(sock: socket.socket, n: int) -> bytes:
+    buf = bytearray()
+    while len(buf) < n:
+        chunk = sock.recv(n - len(buf))
+        if not chunk:
+            raise ConnectionError("connection closed")
+        buf += chunk
+    return bytes(buf)
+
+
+def send_msg(sock: socket.socket, header: dict, payload: bytes = b""):
+    head = json.dumps(header).encode("utf-8")
+    sock.sendall(_FRAME.pack(len(head), len(payload)) + head + payload)
+
+
+def recv_msg(sock: socket.socket) -> Tuple[dict, bytes]:
+    n_head, n_payload = _FRAME.unpack(_recv_exact(sock, _FRAME.size))
+    header = json.loads(_recv_exact(sock, n_head).decode("utf-8"))
+    return header, _recv_exact(sock, n_payload)
+
+
+# ---------- shard server ----------
+
+def slice_store(mem: MemoryStore, lo: int, hi: int) -> MemoryStore:
+    """Rows [lo, hi) of a store as a new store sharing the column memory."""
+    out = MemoryStore(N=mem.N, eta=mem.eta, decay=mem.decay, precision=mem.precision)
+    out.encoder_info, out.step = mem.encoder_info, mem.step
+    for attr in mem._columns():
+        setattr(out, attr, getattr(mem, attr)[lo:hi])
+    out.ids = mem.ids[lo:hi]
+    out.texts = mem.texts[lo:hi]
+    out.rows = {d: r for r, d in enumerate(out.ids)}
+    return out
+
+
+class _Handler(socketserver.BaseRequestHandler):
+
+    def handle(self):
+        mem: MemoryStore = self.server.mem
+        while True:
+            try:
+                header, payload = recv_msg(self.request)
+            except (ConnectionError, OSError):
+                return
+            op = header.get("op")
+            try:
+                if op == "search":
+                    q_waves = np.frombuffer(payload, dtype=np.complex128).reshape(-1, mem.N)
+                    rows = None
+                    if header.get("restrict") is not None:
+                        rows = np.array(sorted(mem.rows[d] for d in header["restrict"] if d in mem.rows),
+                                        dtype=np.int64)
+                    topk = int(header["topk"])
+                    best = [finalize(b, topk, mem.ids)
+                            for b in mem._scan(q_waves, topk, int(header["K"]), float(header["lam"]), rows=rows)]
+                    results = [[[int(r), mem.ids[r], mem.texts[r], float(s), float(st)]
+                                for r, s, st in zip(rs, ss, mem._strength_at(rs))] for rs, ss in best]
+                    send_msg(self.request, {"ok": True, "results": results})
+                elif op == "info":
+                    send_msg(self.request, {"ok": True, "N": mem.N, "count": len(mem),
+                                            "precision": mem.precision, "encoder": mem.encoder_info})
+                else:
+                    send_msg(self.request, {"ok": False, "error": f"unknown op: {op}"})
+            except Exception as e:
+                send_msg(self.request, {"ok": False, "error": f"{type(e).__name__}: {e}"})
+
+
+class ShardServer(socketserver.ThreadingTCPServer):
+    """Serves one MemoryStore (usually a slice of a snapshot) to coordinators."""
+
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self, mem: MemoryStore, host: str = "127.0.0.1", port: int = 0):
+        self.mem = mem
+        super().__init__((host, port), _Handler)
+
+    @property
+    def address(self) -> str:
+        host, port = self.server_address[:2]
+        return f"{host}:{port}"
+
+    def serve_in_thread(self) -> threading.Thread:
+        t = threading.Thread(target=self.serve_forever, daemon=True)
+        t.start()
+        return t
+
+
+# ---------- coordinator ----------
+
+class ShardCoordinator:
+    """
+    Fans queries out to shard servers and merges their partial top-k lists.
+
+    Each shard replies best first with ties by doc id, and the lists are
+    k-way merged on (score, doc id), so full scans over shards that split
+    one store into consecutive ranges (see shard_range) return exactly the
+    single-store ranking. A shard that errors or misses the timeout is
+    skipped: the call still returns, with last_partial set and the shard
+    listed in last_failed.
+
+    Exposes search/search_batch like MemoryStore, so evaluation.runner can
+    use it as its search backend.
+    """
+
+    def __init__(self, addresses: List[str], encoder, timeout: float = 5.0):
+        self.addresses = list(addresses)
+        self.encoder = encoder
+        self.N = int(encoder.N)
+        self.timeout = timeout
+        self._socks: List[socket.socket | None] = [None] * len(self.addresses)
+        self._pool = ThreadPoolExecutor(max_workers=max(1, len(self.addresses)))
+        self.last_partial = False
+        self.last_failed: List[str] = []
+        self.partial_calls = 0
+
+    def _encode_batch(self, texts: List[str]) -> np.ndarray:
+        return MemoryStore._encode_batch(self, texts)
+
+    def _conn(self, i: int) -> socket.socket:
+        if self._socks[i] is None:
+            host, port = self.addresses[i].rsplit(":", 1)
+            self._socks[i] = socket.create_connection((host, int(port)), timeout=self.timeout)
+        self._socks[i].settimeout(self.timeout)
+        return self._socks[i]
+
+    def _drop(self, i: int):
+        # a late reply would desync the stream, so never reuse a failed socket
+        if self._socks[i] is not None:
+            try:
+                self._socks[i].close()
+            except OSError:
+                pass
+            self._socks[i] = None
+
+    def _call(self, i: int, header: dict, payload: bytes = b"") -> dict:
+        try:
+            sock = self._conn(i)
+            send_msg(sock, header, payload)
+            reply, _ = recv_msg(sock)
+        except (OSError, ConnectionError, ValueError):
+            self._drop(i)
+            raise
+        if not reply.get("ok"):
+            raise RuntimeError(f"shard {self.addresses[i]}: {reply.get('error')}")
+        return reply
+
+    def info(self) -> List[dict]:
+        return [self._call(i, {"op": "info"}) for i in range(len(self.addresses))]
+
+    def _scatter(self, q_waves: np.ndarray, topk: int, K: int, lam: float,
+                 restrict_ids: set[str] | None = None):
+        header = {"op": "search", "topk": topk, "K": K, "lam": lam,
+                  "restrict": sorted(restrict_ids) if restrict_ids is not None else None}
+        payload = np.ascontiguousarray(q_waves, dtype=np.complex128).tobytes()
+        futures = [self._pool.submit(self._call, i, header, payload) for i in range(len(self.addresses))]
+
+        merged: List[List[list]] = [[] for _ in range(len(q_waves))]
+        failed = []
+        for i, fut in enumerate(futures):
+            try:
+                reply = fut.result()
+            except Exception:
+                failed.append(self.addresses[i])
+                continue
+            for j, hits in enumerate(reply["results"]):
+                merged[j].append([(i, *hit) for hit in hits])
+
+        self.last_failed = failed
+        self.last_partial = bool(failed)
+        self.partial_calls += bool(failed)
+        # each shard's list is best first, ties by doc id: a k-way merge keeps that order
+        return [[(doc_id, text, score, strength)
+                 for _i, _r, doc_id, text, score, strength in merge_hits(per_shard, topk, score=4, doc_id=2)]
+                for per_shard in merged]
+
+    def search(self, query: str, topk: int = 3, K: int = 16, lam: float = 0.5,
+               restrict_ids: set[str] | None = None):
+        q_waves = self._encode_batch([query])
+        return self._scatter(q_waves, topk, K, lam, restrict_ids)[0], q_waves[0]
+
+    def search_batch(self, queries: List[str], topk: int = 3, K: int = 16, lam: float = 0.5):
+        if len(queries) == 0:
+            return [], np.zeros((0, self.N), dtype=np.complex64)
+        q_waves = self._encode_batch(queries)
+        return self._scatter(q_waves, topk, K, lam), q_waves
+
+    def close(self):
+        for i in range(len(self._socks)):
+            self._drop(i)
+        self._pool.shutdown(wait=False)
+
+
+# ---------- CLI ----------
+
+def shard_range(i: int, k: int, n: int, doc_block: int = MemoryStore.doc_block) -> Tuple[int, int]:
+    """
+    Rows of the i-th of k shards. Bounds fall on doc_block multiples so each
+    shard scans the same tiles a single store would, keeping scores bitwise
+    equal to the unsharded scan.
+    """
+    step = -(-n // k)
+    step = -(-step // doc_block) * doc_block
+    return min(n, i * step), min(n, (i + 1) * step)
+
+
+def _parse_rows(spec: str | None, n: int) -> Tuple[int, int]:
+    if not spec:
+        return 0, n
+    lo, hi = spec.split(":")
+    return int(lo or 0), min(n, int(hi)) if hi else n
+
+
+def main():
+    ap = argparse.ArgumentParser("CWM shard server")
+    ap.add_argument("--path", required=True, help="Snapshot directory (MemoryStore.save)")
+    ap.add_argument("--rows", default=None, help="Row range lo:hi of the snapshot to serve (default: all)")
+    ap.add_argument("--shard", default=None, help="i/n: serve the i-th of n row ranges (doc_block aligned)")
+    ap.add_argument("--host", default="127.0.0.1")
+    ap.add_argument("--port", type=int, default=7001)
+    args = ap.parse_args()
+
+    mem = MemoryStore.load(args.path)
+    n = len(mem)
+    if args.shard:
+        i, k = (int(x) for x in args.shard.split("/"))
+        lo, hi = shard_range(i, k, n)
+    else:
+        lo, hi = _parse_rows(args.rows, n)
+
+    server = ShardServer(slice_store(mem, lo, hi), host=args.host, port=args.port)
+    print(f"[shard] serving rows {lo}:{hi} of {args.path} on {server.address}", flush=True)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,142 @@
+# store/spectral_index.py
+# Bin-major scan layout: a transposed copy of the traces, so a query reads only
+# its K bins of every row instead of whole rows. Every row is still scored.
+
+import numpy as np
+
+from encoders.resonance import query_bins
+from store import quant
+from store.topk import empty, merge_topk
+
+
+class SpectralIndex:
+    """
+    Bin-major (transposed) copy of the store's spectral columns: bin b of
+    every indexed row is one contiguous slice, so a query reads only its
+    top-K bins (K/N of the trace bytes) instead of whole rows. This is a
+    full scan in another memory layout, not a pruning index: no row is
+    skipped, and the copy doubles the trace memory.
+
+    Search runs in two passes over the indexed rows:
+
+    1. scan pass: every row's score from the K bin slices, in float32.
+       It sums the same <= 3K products of magnitude <= 1 as the row-major
+       kernel, so both are within `err` of the true score, and
+       |scan pass - row kernel| <= 2 * err.
+    2. rescore: rows within 2 * err of the k-th best score (ties included)
+       are scored again with the store's own row-major kernel, so the
+       top-k rows are the scan's and the scores match it up to float32
+       rounding of the BLAS tiling.
+
+    Only rows below `n` are indexed; rows appended later, and rows whose
+    spectrum changed in place (mark_dirty), are scored with the row kernel.
+    last_scored counts every row a search scored (all of them);
+    last_rescored counts the rows of pass 2 and the unindexed rows.
+    """
+
+    tile = 1 << 13           # rows per scan-pass step (3K bin slices stay in cache)
+
+    def __init__(self, precision: str, columns):
+        self.precision = precision
+        # exact: (3N, n) float32 = [mag; Re(phasor); Im(phasor)] per bin
+        # q16/q8: ((N, n) uint8 magnitude codes, (N, n) phase codes)
+        self.columns = columns
+        self.n = columns.shape[1] if precision == "exact" else columns[0].shape[1]
+        self.dirty: set[int] = set()        # indexed rows rewritten since the build
+        self.last_scored = 0                # rows scored by the last search (every row)
+        self.last_rescored = 0              # of those, rows scored again with the row kernel
+        self.total_scored = 0
+        self.total_rescored = 0
+        self.searches = 0
+
+    @classmethod
+    def build(cls, mem, block: int = 4096) -> "SpectralIndex":
+        n, N = len(mem), mem.N
+        if mem.precision == "exact":
+            columns = np.empty((3 * N, n), dtype=np.float32)
+        else:
+            columns = tuple(np.empty((N, n), dtype=col.dtype) for col in mem._spectral(slice(0, 0)))
+        for d0 in range(0, n, block):
+            sel = slice(d0, min(n, d0 + block))
+            if mem.precision == "exact":
+                mags, phasors = mem._spectrum(sel)
+                columns[:N, sel] = mags.T
+                columns[N:2 * N, sel] = phasors.real.T
+                columns[2 * N:, sel] = phasors.imag.T
+            else:
+                for out, col in zip(columns, mem._spectral(sel)):
+                    out[:, sel] = col.T
+        return cls(mem.precision, columns)
+
+    def mark_dirty(self, row: int):
+        self.dirty.add(int(row))
+
+    def _scan_pass(self, idx: np.ndarray, q_mag: np.ndarray, q_phasor: np.ndarray, lam: float,
+                sel: slice) -> np.ndarray:
+        """Scan-pass scores (mag + lam * phase, before strength) of indexed rows sel."""
+        qr, qi = q_phasor.real.astype(np.float32), q_phasor.imag.astype(np.float32)
+        if self.precision == "exact":
+            N = len(self.columns) // 3
+            w = np.concatenate([q_mag, lam * qr, lam * qi]).astype(np.float32)
+            return w @ self.columns[np.concatenate([idx, idx + N, idx + 2 * N]), sel]
+        mag_codes, phase_codes = self.columns
+        cos_lut, sin_lut = quant.phase_lut(quant.PHASE_BITS[self.precision])
+        pc = phase_codes[idx, sel]
+        mag = (q_mag / quant.MAG_LEVELS).astype(np.float32) @ mag_codes[idx, sel]
+        return mag + lam * (qr @ cos_lut[pc] + qi @ sin_lut[pc])
+
+    def search(self, mem, q_wave: np.ndarray, topk: int, K: int, lam: float):
+        """
+        Exact top-k for one query. Returns (rows, scores), best first with
+        ties by row order, the same rows MemoryStore._scan would return.
+        """
+        best = empty()
+        n_all = len(mem)
+        if n_all == 0 or topk <= 0:
+            self.last_scored = self.last_rescored = 0
+            return best
+
+        idx, q_mag, q_phasor = query_bins(q_wave, K)
+        prep = mem._prepare(q_wave[None, :], K)
+        strength = mem._strength_at(slice(0, n_all))
+        rescored = 0
+
+        def score(rows: np.ndarray):
+            nonlocal best, rescored
+            for d0 in range(0, len(rows), mem.doc_block):
+                tile_rows = rows[d0:d0 + mem.doc_block]
+                s = mem._tile_scores(prep, 0, mem._spectral(tile_rows), lam) * strength[tile_rows]
+                best = merge_topk(best, tile_rows, s, topk)
+            rescored += len(rows)
+
+        # ---- 1. Row-kernel scores of rows the copy does not cover ----
+        if n_all > self.n:
+            score(np.arange(self.n, n_all, dtype=np.int64))
+        dirty = np.array(sorted(r for r in self.dirty if r < self.n), dtype=np.int64)
+        if len(dirty):
+            score(dirty)
+
+        # ---- 2. Scan pass over the indexed rows (dirty ones excluded) ----
+        if self.n:
+            approx = np.empty(self.n, dtype=np.float32)
+            for d0 in range(0, self.n, self.tile):
+                sel = slice(d0, min(self.n, d0 + self.tile))
+                approx[sel] = self._scan_pass(idx, q_mag, q_phasor, lam, sel) * strength[sel]
+            approx[dirty] = -np.inf
+            # both passes sum <= 3K products of magnitude <= 1: float32 error <= gamma * sum|terms|
+            s_abs = float(np.abs(strength[:self.n]).max())
+            err = 2.0 * (3 * len(idx) + 2) * float(np.finfo(np.float32).eps) \
+                * len(idx) * (1.0 + 2.0 * abs(lam)) * s_abs
+
+            # ---- 3. Row-kernel rescore of rows that can reach the top-k ----
+            k = min(topk, self.n - len(dirty))
+            if k > 0:
+                kth = np.partition(approx, self.n - k)[self.n - k]
+                score(np.flatnonzero(approx >= kth - 2.0 * err).astype(np.int64))
+
+        self.last_scored = n_all
+        self.last_rescored = rescored
+        self.total_scored += n_all
+        self.total_rescored += rescored
+        self.searches += 1
+        return best
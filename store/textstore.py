@@ -0,0 +1,203 @@
+# store/textstore.py
+# Out-of-RAM document text. Rows are byte ranges of one memory-mapped line
+# file (a snapshot's texts.jsonl, or a doc_id<TAB>text collection TSV) and
+# are decoded only when read, so search materializes the returned hits alone.
+
+from __future__ import annotations
+from array import array
+from typing import Dict, Iterable, List, Tuple
+import codecs
+import json
+import mmap
+
+import numpy as np
+
+FORMATS = ("jsonl", "tsv")        # jsonl: one JSON string per line; tsv: raw UTF-8 text spans
+
+
+def open_mmap(path) -> mmap.mmap | None:
+    """Read-only map of a file (None when it is empty, which mmap cannot map)."""
+    with open(path, "rb") as f:
+        if f.seek(0, 2) == 0:
+            return None
+        return mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+
+def line_bounds(buf, n: int, block: int = 1 << 26) -> np.ndarray:
+    """Byte offsets of the first n lines of buf (n + 1 values), by a blockwise newline scan."""
+    parts, found, pos = [np.zeros(1, dtype=np.int64)], 0, 0
+    size = len(buf) if buf is not None else 0
+    while found < n and pos < size:
+        chunk = np.frombuffer(buf, dtype=np.uint8, count=min(block, size - pos), offset=pos)
+        nl = np.flatnonzero(chunk == 10)[:n - found].astype(np.int64) + (pos + 1)
+        parts.append(nl)
+        found += len(nl)
+        pos += len(chunk)
+    if found < n:
+        raise ValueError(f"expected {n} lines, found {found}")
+    return np.concatenate(parts)
+
+
+class TextStore:
+    """
+    List-like texts by row. Rows opened from a file are (start, end) byte
+    ranges of its map; rows appended or replaced afterwards live in RAM
+    until the owner saves them (write_jsonl). Slices are views that share
+    the map, and link() points rows at spans of another store over the
+    same file, so texts held by a collection are never copied.
+    """
+
+    def __init__(self, buf=None, starts: np.ndarray | None = None, ends: np.ndarray | None = None,
+                 fmt: str = "jsonl"):
+        if fmt not in FORMATS:
+            raise ValueError(f"Unknown text format: {fmt} (choose from {FORMATS})")
+        self.fmt = fmt
+        self._buf = buf
+        self._starts = np.zeros(0, dtype=np.int64) if starts is None else starts
+        self._ends = np.zeros(0, dtype=np.int64) if ends is None else ends
+        self._n = len(self._starts)
+        self._ram: Dict[int, str] = {}
+
+    @classmethod
+    def open(cls, path, n: int, bounds: np.ndarray | None = None) -> "TextStore":
+        """
+        The first n lines of a JSON-lines file. bounds (n + 1 offsets, e.g.
+        a memory-mapped index) saves the newline scan.
+        """
+        if n == 0:
+            return cls()
+        buf = open_mmap(path)
+        if bounds is None:
+            bounds = line_bounds(buf, n)
+        return cls(buf, bounds[:n], bounds[1:n + 1])
+
+    def __len__(self):
+        return self._n
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            return self._view(*i.indices(self._n))
+        if i < 0:
+            i += self._n
+        if not 0 <= i < self._n:
+            raise IndexError("text row out of range")
+        text = self._ram.get(i)
+        if text is not None:
+            return text
+        raw = self._buf[self._starts[i]:self._ends[i]]
+        return json.loads(raw) if self.fmt == "jsonl" else raw.decode("utf-8")
+
+    def __iter__(self):
+        for i in range(self._n):
+            yield self[i]
+
+    def __setitem__(self, i: int, text: str):
+        if not 0 <= i < self._n:
+            raise IndexError("text row out of range")
+        self._ram[i] = text
+
+    def append(self, text: str):
+        self._reserve(self._n + 1)
+        self._ram[self._n] = text
+        self._n += 1
+
+    def link(self, rows: Iterable[int], src: "TextStore", src_rows: Iterable[int]):
+        """
+        Point rows at src's texts src_rows instead of RAM copies. Both stores
+        must read the same file; a repeated row keeps its last source.
+        """
+        if self._buf is None and not (self._n - len(self._ram)):
+            self._buf, self.fmt = src._buf, src.fmt
+        elif self._buf is not src._buf:
+            raise ValueError("cannot link texts of a different file")
+        last = dict(zip(rows, src_rows))
+        if not last:
+            return
+        self._reserve(self._n)
+        r = np.fromiter(last.keys(), dtype=np.int64, count=len(last))
+        s = np.fromiter(last.values(), dtype=np.int64, count=len(last))
+        self._starts[r], self._ends[r] = src._starts[s], src._ends[s]
+        for row in last:
+            self._ram.pop(row, None)
+
+    def line(self, i: int) -> bytes:
+        """Row i as one texts.jsonl line: file bytes as they are when possible."""
+        if i not in self._ram and self.fmt == "jsonl":
+            return bytes(self._buf[self._starts[i]:self._ends[i]])
+        return (json.dumps(self[i], ensure_ascii=False) + "\n").encode("utf-8")
+
+    def _view(self, lo: int, hi: int, step: int) -> "TextStore":
+        if step != 1:
+            raise ValueError("text store slices must be contiguous")
+        hi = max(lo, hi)
+        starts, ends = self._starts[lo:hi], self._ends[lo:hi]
+        starts.flags.writeable = ends.flags.writeable = False     # appends/links copy first
+        out = TextStore(self._buf, starts, ends, self.fmt)
+        out._ram = {i - lo: t for i, t in self._ram.items() if lo <= i < hi}
+        return out
+
+    def _reserve(self, n: int):
+        """Grow the offset arrays (doubling), copying maps and views before writing."""
+        if n <= len(self._starts) and self._starts.flags.writeable and self._ends.flags.writeable:
+            return
+        cap = max(n, 2 * self._n, 16)
+        for name in ("_starts", "_ends"):
+            grown = np.zeros(cap, dtype=np.int64)
+            grown[:self._n] = getattr(self, name)[:self._n]
+            setattr(self, name, grown)
+
+
+def write_jsonl(texts, f, lo: int = 0, hi: int | None = None, chunk: int = 4096) -> np.ndarray:
+    """
+    Write rows [lo, hi) of a TextStore (or a list of str) to f as JSON lines.
+    Returns their byte offsets from the first written byte (hi - lo + 1 values).
+    """
+    hi = len(texts) if hi is None else hi
+    bounds = np.zeros(hi - lo + 1, dtype=np.int64)
+    pending: List[bytes] = []
+    pos = 0
+    for k, i in enumerate(range(lo, hi)):
+        line = texts.line(i) if isinstance(texts, TextStore) else \
+            (json.dumps(texts[i], ensure_ascii=False) + "\n").encode("utf-8")
+        pos += len(line)
+        bounds[k + 1] = pos
+        pending.append(line)
+        if len(pending) >= chunk:
+            f.write(b"".join(pending))
+            pending = []
+    f.write(b"".join(pending))
+    return bounds
+
+
+def read_tsv(path) -> Tuple[List[str], TextStore]:
+    """
+    Index a doc_id<TAB>text file (lines without a tab split at the first
+    whitespace; blank and one-field lines skipped; a UTF-8 BOM ignored).
+    Returns the doc ids and a TextStore whose rows are the text spans.
+    """
+    ids: List[str] = []
+    starts, ends = array("q"), array("q")
+    offset = 0
+    with open(path, "rb") as f:
+        for raw in f:
+            pos, offset = offset, offset + len(raw)
+            if pos == 0 and raw.startswith(codecs.BOM_UTF8):
+                raw, pos = raw[len(codecs.BOM_UTF8):], len(codecs.BOM_UTF8)
+            line = raw.strip()
+            if not line:
+                continue
+            if b"\t" in line:
+                doc_id, text = line.split(b"\t", 1)
+            else:
+                parts = line.split(None, 1)
+                if len(parts) != 2:
+                    continue
+                doc_id, text = parts
+            end = pos + len(raw.rstrip())
+            ids.append(doc_id.decode("utf-8"))
+            starts.append(end - len(text))
+            ends.append(end)
+    if not ids:
+        return ids, TextStore(fmt="tsv")
+    return ids, TextStore(open_mmap(path), np.frombuffer(starts, dtype=np.int64),
+                          np.frombuffer(ends, dtype=np.int64), fmt="tsv")
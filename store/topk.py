@@ -0,0 +1,97 @@
+# store/topk.py
+# Deterministic top-k: partial selection over score arrays, streaming merges
+# of tiles/chunks/shards, and the final doc-id tie-break.
+#
+# Ordering everywhere is score descending, ties by doc id. Doc ids are only
+# looked up at the very end: while streaming, a running top-k is ordered by
+# (score, row) and keeps every row tied with its k-th score (the "tie tail"),
+# so no row that could win a doc-id tie-break is dropped early.
+
+from __future__ import annotations
+from typing import Iterable, List, Sequence, Tuple
+import heapq
+import itertools
+
+import numpy as np
+
+Best = Tuple[np.ndarray, np.ndarray]           # (rows int64, scores float32), best first
+
+
+def empty() -> Best:
+    return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.float32)
+
+
+def candidates(scores: np.ndarray, k: int) -> np.ndarray:
+    """
+    Positions of every score >= the k-th largest (argpartition, O(n)),
+    unordered. Ties with the k-th are all kept, so the result may exceed k.
+    """
+    n = len(scores)
+    if n <= k:
+        return np.arange(n)
+    kth = np.partition(scores, n - k)[n - k]
+    return np.nonzero(scores >= kth)[0]
+
+
+def _cut(order: np.ndarray, s: np.ndarray, k: int) -> np.ndarray:
+    """Truncate a best-first order to k, plus the rows tied with the k-th score."""
+    if len(order) <= k:
+        return order
+    kth = s[order[k - 1]]
+    return order[:k + int(np.count_nonzero(s[order[k:]] == kth))]
+
+
+def merge_topk(best: Best, rows: np.ndarray, scores: np.ndarray, topk: int) -> Best:
+    """
+    Fold a tile of (rows, scores) into a running top-k, best first, ties by
+    row, keeping the tie tail. Once k rows are held, tile scores below the
+    running k-th are rejected with one comparison; only survivors are
+    partitioned and sorted.
+    """
+    if topk <= 0:
+        return best
+    r_prev, s_prev = best
+    if len(s_prev) >= topk:
+        live = np.flatnonzero(scores >= s_prev[topk - 1])
+        if len(live) == 0:
+            return best
+        keep = live[candidates(scores[live], topk)]
+    else:
+        keep = candidates(scores, topk)
+    r_all = np.concatenate([r_prev, rows[keep]])
+    s_all = np.concatenate([s_prev, scores[keep]])
+    order = _cut(np.lexsort((r_all, -s_all)), s_all, topk)
+    return r_all[order], s_all[order]
+
+
+def merge_partials(parts: Iterable[Best], topk: int) -> Best:
+    """k-way merge of partial top-k lists (chunks, shards, cascade stages) over disjoint rows."""
+    parts = [p for p in parts if len(p[0])]
+    if not parts:
+        return empty()
+    rows = np.concatenate([r for r, _s in parts])
+    scores = np.concatenate([s for _r, s in parts])
+    order = _cut(np.lexsort((rows, -scores)), scores, topk)
+    return rows[order], scores[order]
+
+
+def finalize(best: Best, topk: int, ids: Sequence[str]) -> Best:
+    """
+    Final order of a running top-k: score descending, ties by doc id
+    (ids[row]), cut to exactly topk. Touches ids of the kept rows only.
+    """
+    rows, scores = best
+    if len(rows) == 0:
+        return best
+    keys = np.array([ids[r] for r in rows])
+    order = np.lexsort((keys, -scores))[:topk]
+    return rows[order], scores[order]
+
+
+def merge_hits(lists: Iterable[List[tuple]], topk: int, score: int = 2, doc_id: int = 0) -> List[tuple]:
+    """
+    k-way merge of finished hit lists (e.g. (doc_id, text, score, strength)
+    from several shards), each already best first with ties by doc id.
+    """
+    key = lambda h: (-h[score], h[doc_id])
+    return list(itertools.islice(heapq.merge(*lists, key=key), topk))
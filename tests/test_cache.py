@@ -0,0 +1,47 @@
+# tests/test_cache.py
+# Cached results never outlive a mutation: add, reinforce and decay invalidate them.
+
+import pytest
+
+from encoders.factory import CharWaveEncoder
+from store.memory import MemoryStore
+
+DOCS = [(f"d{i}", f"wave {i} phase memory trace {i * 7 % 13}") for i in range(100)]
+QUERY = "phase memory trace"
+
+
+def make_store():
+    mem = MemoryStore(N=64, decay=0.5, encoder=CharWaveEncoder(N=64))
+    mem.add_documents(DOCS)
+    return mem
+
+
+MUTATIONS = {
+    "add": lambda m: m.add_document("new", QUERY),
+    "replace": lambda m: m.add_document("d40", QUERY),
+    "update_trace": lambda m: m.update_trace("d7", m._encode(QUERY), eta=0.9),
+    "decay": lambda m: m.decay_traces(3),
+}
+
+
+@pytest.mark.parametrize("mutation", sorted(MUTATIONS))
+@pytest.mark.parametrize("batch", [False, True])
+def test_mutation_invalidates_cached_results(mutation, batch):
+    cached, plain = make_store(), make_store()
+    cache = cached.enable_cache()
+
+    def search(m):
+        if batch:
+            return m.search_batch([QUERY], topk=5, K=16)[0][0]
+        return m.search(QUERY, topk=5, K=16)[0]
+
+    before = search(cached)
+    assert search(cached) == before and cache.results.hits == 1
+
+    MUTATIONS[mutation](cached)
+    MUTATIONS[mutation](plain)
+    after = search(cached)
+    assert after == search(plain)
+    assert after != before
+    assert cache.invalidations == 1 and cache.results.hits == 1
+    assert search(cached) == after and cache.results.hits == 2
@@ -0,0 +1,38 @@
+# tests/test_embed_wave.py
+# Closed-form embed spectra against the FFT path (offline stand-in sentence model).
+
+import numpy as np
+
+from benchmarks.bench import StubSentenceModel
+from encoders.embed_wave import EmbedWaveEncoder, check_direct_spectra
+from store.memory import MemoryStore
+
+TEXTS = [f"passage {i} about waves and phase {i * 7 % 11}" for i in range(1500)]
+QUERIES = [f"query {i} on wave memory" for i in range(20)]
+
+
+def test_direct_spectra_is_opt_in():
+    assert not EmbedWaveEncoder(N=128, model=StubSentenceModel()).direct_spectra
+
+
+def test_direct_spectra_match_fft_on_signal_bins():
+    enc = EmbedWaveEncoder(N=512, model=StubSentenceModel(), direct_spectra=True)
+    check = check_direct_spectra(enc, TEXTS[:64], K=128)
+    assert check["max_mag_err"] < 1e-4
+    assert check["max_phase_err_topk"] < 1e-3
+
+
+def test_direct_spectra_keep_the_fft_ranking():
+    stores = []
+    for direct in (False, True):
+        mem = MemoryStore(N=512, encoder=EmbedWaveEncoder(N=512, model=StubSentenceModel(),
+                                                          direct_spectra=direct))
+        mem.add_documents([(f"d{i}", t) for i, t in enumerate(TEXTS)])
+        stores.append(mem)
+    for K in (16, 128):
+        fft, _ = stores[0].search_batch(QUERIES, topk=10, K=K, lam=1.0)
+        direct, _ = stores[1].search_batch(QUERIES, topk=10, K=K, lam=1.0)
+        # scores drift by a few 1e-2, so near-ties may swap places inside the top 10
+        overlap = [len({h[0] for h in a} & {h[0] for h in b}) / 10 for a, b in zip(fft, direct)]
+        assert np.mean(overlap) >= 0.95
+        assert np.allclose([a[0][2] for a in fft], [b[0][2] for b in direct], atol=0.05)
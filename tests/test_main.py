@@ -0,0 +1,45 @@
+# tests/test_main.py
+# The CLI attaches the snapshot's own encoder and never overrides a mismatch.
+
+import json
+import os
+
+import pytest
+
+from encoders.factory import CharWaveEncoder
+from main import get_mem
+from store.memory import HEADER, MemoryStore
+
+
+@pytest.fixture
+def snapshot(tmp_path):
+    path = str(tmp_path / "memory")
+    mem = MemoryStore(N=64, encoder=CharWaveEncoder(N=64))
+    mem.add_documents([("a", "wave phase"), ("b", "memory trace")])
+    mem.save(path)
+    return path
+
+
+def test_get_mem_uses_the_snapshot_encoder(snapshot):
+    m = get_mem(snapshot, N=1024)
+    assert m.encoder.name == "char" and m.encoder.N == 64
+    assert m.search("wave phase", topk=1)[0][0][0] == "a"
+
+
+def test_get_mem_rejects_another_encoder(snapshot):
+    class Other(CharWaveEncoder):
+        name = "other"
+
+    with pytest.raises(ValueError):
+        get_mem(snapshot, encoder=Other(N=64))
+
+
+def test_get_mem_rejects_char_on_an_embed_snapshot(snapshot):
+    with open(os.path.join(snapshot, HEADER), encoding="utf-8") as f:
+        header = json.load(f)
+    header["encoder"] = {"name": "embed", "N": 64, "model": "all-MiniLM-L6-v2"}
+    with open(os.path.join(snapshot, HEADER), "w", encoding="utf-8") as f:
+        json.dump(header, f)
+
+    with pytest.raises(ValueError):
+        get_mem(snapshot, encoder=CharWaveEncoder(N=64), encoder_name="char")
@@ -0,0 +1,29 @@
+# tests/test_parallel.py
+# Parallel builds must leave the store and its indexes as add_documents would.
+
+import numpy as np
+
+from encoders.factory import CharWaveEncoder
+from store.memory import MemoryStore
+from store.parallel import build_parallel
+
+DOCS = [(f"d{i}", f"wave {i} phase memory trace {i * 7 % 13}") for i in range(200)]
+
+
+def test_replacing_a_row_marks_every_index_dirty():
+    mem = MemoryStore(N=64, encoder=CharWaveEncoder(N=64))
+    mem.add_documents(DOCS)
+    mem.build_index()
+    mem.build_clusters(nlist=8)
+    mem.build_cascade(bins=16)
+
+    build_parallel(mem, [("d5", "a rewritten passage"), ("d200", "a new passage")], workers=2)
+    for index in (mem.index, mem.clusters, mem.cascade):
+        assert index.dirty == {5}
+
+    q = CharWaveEncoder(N=64).encode_text("a rewritten passage")
+    q = q / (np.linalg.norm(q) + 1e-8)
+    (rows, _), = mem._scan(q[None, :], 3, 8, 0.5)
+    assert rows[0] == 5
+    assert mem.index.search(mem, q, 3, 8, 0.5)[0][0] == 5
+    assert mem.clusters.search(mem, q, 3, 8, 0.5, nprobe=8)[0][0] == 5
@@ -0,0 +1,47 @@
+# tests/test_quant.py
+# Compact trace precisions: independent copies, rankings read from the codes.
+
+import numpy as np
+import pytest
+
+from encoders.factory import CharWaveEncoder
+from store.memory import MemoryStore
+
+DOCS = [(f"d{i}", f"wave {i} phase {i * 13 % 7} memory signal {i % 5}") for i in range(300)]
+
+
+def make_store(precision="exact"):
+    mem = MemoryStore(N=128, encoder=CharWaveEncoder(N=128), precision=precision)
+    mem.add_documents(DOCS)
+    return mem
+
+
+def test_quantized_copy_is_independent():
+    mem = make_store()
+    q8 = mem.quantized("q8")
+    q8.add_document("new", "a passage only the copy has")
+    mem.add_document("d3", "a rewritten passage")
+    mem.add_document("other", "a passage only the source has")
+
+    assert len(q8) == len(DOCS) + 1 and len(mem) == len(DOCS) + 1
+    assert "new" in q8.rows and "new" not in mem.rows
+    assert "other" in mem.rows and "other" not in q8.rows
+    assert q8.ids[-1] == "new" and mem.ids[-1] == "other"
+    assert q8.texts[3] == DOCS[3][1] and mem.texts[3] == "a rewritten passage"
+
+
+@pytest.mark.parametrize("precision", ["q16", "q8"])
+@pytest.mark.parametrize("K", [8, 32])
+def test_code_scores_match_dequantized_spectra(precision, K):
+    exact = make_store()
+    coded = exact.quantized(precision)
+    decoded = coded.quantized("exact")
+    q = exact._encode("phase memory signal")[None, :]
+    (rows, scores), = coded._scan(q, 20, K, 0.5)
+    (rd, sd), = decoded._scan(q, 20, K, 0.5)
+    assert np.array_equal(rows, rd)
+    assert np.allclose(scores, sd, rtol=1e-4, atol=1e-4)
+
+    (re, se), = exact._scan(q, 20, K, 0.5)
+    assert len(set(rows.tolist()) & set(re.tolist())) >= 16
+    assert abs(scores[0] - se[0]) < 0.05 * abs(se[0])
@@ -0,0 +1,74 @@
+# tests/test_runner.py
+# End-to-end runs of evaluation.runner on a tiny synthetic collection.
+
+import os
+import subprocess
+import sys
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+WORDS = ("wave phase memory trace signal spectrum query document resonance bin "
+         "river mountain cloud garden engine harbor").split()
+
+
+@pytest.fixture(scope="module")
+def corpus(tmp_path_factory):
+    d = tmp_path_factory.mktemp("corpus")
+    with open(d / "collection.tsv", "w", encoding="utf-8") as f:
+        for i in range(300):
+            f.write(f"d{i}\t" + " ".join(WORDS[(i * 7 + j * 3) % len(WORDS)] for j in range(12)) + "\n")
+    with open(d / "queries.tsv", "w", encoding="utf-8") as f:
+        for i in range(8):
+            f.write(f"q{i}\t{WORDS[i]} {WORDS[i + 5]}\n")
+    with open(d / "qrels.txt", "w", encoding="utf-8") as f:
+        for i in range(8):
+            f.write(f"q{i} 0 d{i * 11} 1\n")
+    return d
+
+
+def run_runner(corpus, *flags):
+    args = [sys.executable, "-m", "evaluation.runner",
+            "--collection", str(corpus / "collection.tsv"), "--queries", str(corpus / "queries.tsv"),
+            "--qrels", str(corpus / "qrels.txt"), "--encoder", "char", "--N", "64", "--K", "8",
+            "--topk", "10", "--log-dir", str(corpus / "logs"), *flags]
+    env = dict(os.environ, PYTHONPATH=ROOT)
+    proc = subprocess.run(args, cwd=ROOT, env=env, capture_output=True, text=True, timeout=300)
+    assert proc.returncode == 0, proc.stderr[-2000:]
+    return proc.stdout
+
+
+@pytest.mark.parametrize("batch", ["1", "4"])
+def test_search_workers_with_nprobe(corpus, batch):
+    out = run_runner(corpus, "--search-workers", "2", "--nprobe", "4", "--batch", batch)
+    assert "Approximate (nprobe=4" in out
+    assert "Overlap with full scan" in out
+
+
+def test_search_workers_with_cascade(corpus):
+    out = run_runner(corpus, "--search-workers", "2", "--cascade", "50", "--cascade-bins", "16")
+    assert "Cascade stages per query" in out
+    assert "Overlap with full scan" in out
+
+
+def test_clusters_path_rejects_other_collection(corpus, tmp_path):
+    path = str(tmp_path / "clusters")
+    assert "Built clustered index" in run_runner(corpus, "--nprobe", "4", "--clusters-path", path)
+    assert "Loaded clustered index" in run_runner(corpus, "--nprobe", "4", "--clusters-path", path)
+
+    other = tmp_path / "other"
+    other.mkdir()
+    for name in ("queries.tsv", "qrels.txt"):
+        (other / name).write_bytes((corpus / name).read_bytes())
+    lines = (corpus / "collection.tsv").read_text(encoding="utf-8").splitlines(keepends=True)
+    (other / "collection.tsv").write_text("".join(reversed(lines)), encoding="utf-8")
+    out = run_runner(other, "--nprobe", "4", "--clusters-path", path)
+    assert "Ignoring stale clustered index" in out and "Built clustered index" in out
+
+
+def test_latency_is_per_query_by_default(corpus):
+    out = run_runner(corpus)
+    assert "Latency mean=" in out and "amortized" not in out
+
+    out = run_runner(corpus, "--batch", "4")
+    assert "Latency (amortized over blocks of 4 queries)" in out and "block mean=" in out
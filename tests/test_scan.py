@@ -0,0 +1,36 @@
+# tests/test_scan.py
+# The gathered top-K kernel, the dense weight product and the scalar reference score the same.
+
+import numpy as np
+import pytest
+
+from benchmarks.bench import synthetic_store
+from encoders.char_wave import char_to_waves
+from encoders.factory import CharWaveEncoder
+from encoders.resonance import resonance_score
+from store.memory import MemoryStore
+
+
+@pytest.mark.parametrize("K", [4, 16])
+def test_gathered_scan_matches_dense(K):
+    mem = synthetic_store(3000, 256)
+    q = char_to_waves(["waves resonate in memory", "phase of a spectrum"], N=256)
+    assert mem._prepare(q, K)[0] == "bins"
+    gathered = mem._scan(q, 30, K, 0.75)
+
+    mem.gather_ratio = mem.N
+    assert mem._prepare(q, K)[0] == "dense"
+    for (r, s), (rd, sd) in zip(gathered, mem._scan(q, 30, K, 0.75)):
+        assert np.array_equal(r, rd)
+        assert np.allclose(s, sd, rtol=1e-5, atol=1e-6)
+
+
+def test_scan_matches_reference_resonance_score():
+    texts = [f"wave {i} phase memory {i * 7 % 5}" for i in range(40)]
+    mem = MemoryStore(N=128, decay=0.0, encoder=CharWaveEncoder(N=128))
+    mem.add_documents([(f"d{i}", t) for i, t in enumerate(texts)])
+    q = mem._encode("phase memory")
+    for K in (8, 64):
+        (rows, scores), = mem._scan(q[None, :], 40, K, 0.5)
+        ref = [resonance_score(q, mem._encode(texts[r]), K=K, lam=0.5) for r in rows]
+        assert np.allclose(scores, ref, rtol=1e-4, atol=1e-4)
@@ -0,0 +1,23 @@
+# tests/test_search.py
+# A block of queries searched together ranks and scores as one search() per query.
+
+import numpy as np
+import pytest
+
+from benchmarks.bench import synthetic_store
+
+QUERIES = ["waves resonate in memory", "phase of a spectrum", "memory", "resonate waves"]
+
+
+@pytest.mark.parametrize("K,lam", [(8, 0.5), (64, 1.0)])
+@pytest.mark.parametrize("mode", ["scan", "index"])
+def test_search_batch_matches_search(mode, K, lam):
+    mem = synthetic_store(3000, 128)
+    if mode == "index":
+        mem.build_index()
+    batch, waves = mem.search_batch(QUERIES, topk=10, K=K, lam=lam)
+    for query, hits, wave in zip(QUERIES, batch, waves):
+        single, q_wave = mem.search(query, topk=10, K=K, lam=lam)
+        assert [h[0] for h in hits] == [h[0] for h in single]
+        assert np.allclose([h[2] for h in hits], [h[2] for h in single], rtol=1e-5, atol=1e-6)
+        assert np.allclose(wave, q_wave)
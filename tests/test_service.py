@@ -0,0 +1,101 @@
+# tests/test_service.py
+# HTTP search service: malformed requests are 400s, not 500s.
+
+import asyncio
+import json
+
+import pytest
+
+from encoders.factory import CharWaveEncoder
+from store.memory import MemoryStore
+from store.service import SearchServer, SearchService
+
+
+async def _send(port: int, raw: bytes):
+    reader, writer = await asyncio.open_connection("127.0.0.1", port)
+    writer.write(raw)
+    await writer.drain()
+    data = await reader.read()
+    writer.close()
+    head, _, payload = data.partition(b"\r\n\r\n")
+    return int(head.split()[1]), json.loads(payload)
+
+
+def _post(path: str, body: bytes) -> bytes:
+    return (f"POST {path} HTTP/1.1\r\nHost: x\r\nConnection: close\r\n"
+            f"Content-Length: {len(body)}\r\n\r\n").encode("latin-1") + body
+
+
+def _serve(requests):
+    """Status and JSON reply of each raw request, sent one after another to a fresh server."""
+    mem = MemoryStore(N=64, encoder=CharWaveEncoder(N=64))
+    mem.add_documents([(f"d{i}", f"wave {i} phase memory") for i in range(50)])
+
+    async def run():
+        server = SearchServer(SearchService(mem, window_ms=1.0, K=16), port=0)
+        await server.start()
+        try:
+            return [await _send(server.port, raw) for raw in requests]
+        finally:
+            await server.stop()
+    return asyncio.run(run()), mem
+
+
+def _search(bodies):
+    return _serve([_post("/search", body) for body in bodies])[0]
+
+
+@pytest.mark.parametrize("body", [
+    {"query": "wave", "topk": "ten"},
+    {"query": "wave", "topk": -1},
+    {"query": "wave", "topk": 2.5},
+    {"query": "wave", "K": "many"},
+    {"query": "wave", "K": 0},
+    {"query": "wave", "K": 65},
+    {"query": "wave", "lam": "high"},
+    {"query": "wave", "lam": True},
+    ["wave"],
+])
+def test_malformed_search_is_a_400(body):
+    (status, payload), = _search([json.dumps(body).encode("utf-8")])
+    assert status == 400
+    assert "error" in payload
+
+
+def test_explicit_topk_zero_is_kept():
+    (s0, p0), (s3, p3), (sd, pd) = _search([b'{"query": "wave", "topk": 0}',
+                                            b'{"query": "wave", "topk": 3}',
+                                            b'{"query": "wave"}'])
+    assert (s0, s3, sd) == (200, 200, 200)
+    assert p0["results"] == []
+    assert len(p3["results"]) == 3
+    assert len(pd["results"]) == 10
+
+
+@pytest.mark.parametrize("body", [
+    {"docs": ["abc"]},
+    {"docs": 5},
+    {"docs": []},
+    {"docs": [["d1", None]]},
+    {"docs": [["d1", "text", "extra"]]},
+    {"docs": [[None, "text"]]},
+    {"id": "d1", "text": None},
+    {"id": "d1"},
+])
+def test_malformed_add_is_a_400(body):
+    (reply,), mem = _serve([_post("/add", json.dumps(body).encode("utf-8"))])
+    assert reply[0] == 400 and "error" in reply[1]
+    assert len(mem) == 50
+
+
+def test_add_stores_texts():
+    (reply,), mem = _serve([_post("/add", b'{"docs": [["new", "fresh text"], [7, "seven"]]}')])
+    assert reply == (200, {"added": 2, "docs": 52})
+    assert mem.texts[mem.rows["new"]] == "fresh text" and mem.texts[mem.rows["7"]] == "seven"
+
+
+@pytest.mark.parametrize("length", [b"abc", b"-5"])
+def test_bad_content_length_is_a_400(length):
+    raw = b"POST /search HTTP/1.1\r\nHost: x\r\nConnection: close\r\nContent-Length: " + length + b"\r\n\r\n"
+    (reply,), _mem = _serve([raw])
+    assert reply[0] == 400 and "Content-Length" in reply[1]["error"]
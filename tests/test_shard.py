@@ -0,0 +1,29 @@
+# tests/test_shard.py
+# Scatter/gather over shard servers returns the single store's ranking and scores.
+
+from encoders.factory import CharWaveEncoder
+from store.memory import MemoryStore
+from store.shard import ShardCoordinator, ShardServer, shard_range, slice_store
+
+QUERIES = ["wave phase memory", "resonance of a signal", "harbor engine garden"]
+
+
+def test_sharded_search_matches_single_store():
+    mem = MemoryStore(N=128, encoder=CharWaveEncoder(N=128))
+    mem.add_documents([(f"d{i}", f"wave {i} phase {i * 13 % 7} memory signal {i % 5}") for i in range(2500)])
+
+    servers = [ShardServer(slice_store(mem, *shard_range(i, 2, len(mem)))) for i in range(2)]
+    for s in servers:
+        s.serve_in_thread()
+    coord = ShardCoordinator([s.address for s in servers], CharWaveEncoder(N=128))
+    try:
+        for K in (8, 64):
+            local, _ = mem.search_batch(QUERIES, topk=20, K=K, lam=1.0)
+            remote, _ = coord.search_batch(QUERIES, topk=20, K=K, lam=1.0)
+            assert [[(d, s) for d, _t, s, _st in hits] for hits in remote] == \
+                   [[(d, s) for d, _t, s, _st in hits] for hits in local]
+    finally:
+        coord.close()
+        for s in servers:
+            s.shutdown()
+            s.server_close()
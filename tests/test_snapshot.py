@@ -0,0 +1,48 @@
+# tests/test_snapshot.py
+# A saved store loads back to the same rows and results, and only with its own encoder.
+
+import numpy as np
+import pytest
+
+from encoders.factory import CharWaveEncoder
+from store.memory import MemoryStore
+
+DOCS = [(f"d{i}", f"wave {i} phase memory trace {i * 7 % 13}") for i in range(120)]
+
+
+@pytest.fixture
+def saved(tmp_path):
+    mem = MemoryStore(N=64, decay=0.1, encoder=CharWaveEncoder(N=64))
+    mem.add_documents(DOCS)
+    mem.update_trace("d3", mem._encode("phase memory"))
+    mem.decay_traces(2)
+    path = str(tmp_path / "memory")
+    mem.save(path)
+    return mem, path
+
+
+@pytest.mark.parametrize("mmap", [True, False])
+def test_save_load_round_trip(saved, mmap):
+    mem, path = saved
+    m = MemoryStore.load(path, encoder=CharWaveEncoder(N=64), mmap=mmap)
+    assert m.ids == mem.ids and list(m.texts) == list(mem.texts)
+    assert m.step == mem.step and m.encoder_info == mem.encoder_info
+    assert np.array_equal(m.mags, mem.mags) and np.array_equal(m.phasors, mem.phasors)
+    assert np.array_equal(m.strength, mem.strength) and np.array_equal(m.last_used, mem.last_used)
+    for query in ("phase memory", "wave 7"):
+        assert m.search(query, topk=5)[0] == mem.search(query, topk=5)[0]
+
+
+def test_load_rejects_a_mismatched_encoder(saved):
+    class Other(CharWaveEncoder):
+        name = "other"
+
+    _mem, path = saved
+    with pytest.raises(ValueError):
+        MemoryStore.load(path, encoder=CharWaveEncoder(N=128))
+    with pytest.raises(ValueError):
+        MemoryStore.load(path, encoder=Other(N=64))
+    m = MemoryStore.load(path)
+    with pytest.raises(ValueError):
+        m.set_encoder(Other(N=64))
+    assert m.encoder is None
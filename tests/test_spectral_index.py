@@ -0,0 +1,36 @@
+# tests/test_spectral_index.py
+# The bin-major scan must return the rows the row-major scan returns.
+
+import numpy as np
+import pytest
+
+from benchmarks.bench import synthetic_store
+from encoders.char_wave import char_to_wave
+
+
+@pytest.mark.parametrize("precision", ["exact", "q8"])
+@pytest.mark.parametrize("K,lam", [(8, 0.0), (8, 1.0), (48, 2.0)])
+def test_index_matches_scan(precision, K, lam):
+    mem = synthetic_store(5000, 128, precision=precision)
+    mem.build_index()
+    q = char_to_wave("waves resonate in memory", N=128)
+    (rows, scores), = mem._scan(q[None, :], 50, K, lam)
+    r, s = mem.index.search(mem, q, 50, K, lam)
+    assert np.array_equal(r, rows)
+    assert np.allclose(s, scores, rtol=1e-5, atol=1e-6)
+    assert mem.index.last_scored == len(mem)
+    assert mem.index.last_rescored < len(mem) // 4
+
+
+def test_index_scores_replaced_and_appended_rows():
+    mem = synthetic_store(2000, 64)
+    mem.build_index()
+    mem.add_document("syn7", "waves resonate in memory")
+    mem.add_document("new", "memory waves resonate")
+    assert mem.index is not None and 7 in mem.index.dirty
+
+    q = char_to_wave("waves resonate in memory", N=64)
+    (rows, scores), = mem._scan(q[None, :], 20, 16, 1.0)
+    r, s = mem.index.search(mem, q, 20, 16, 1.0)
+    assert np.array_equal(r, rows)
+    assert np.allclose(s, scores, rtol=1e-5, atol=1e-6)
@@ -0,0 +1,58 @@
+# tests/test_traces.py
+# Reinforcement blends the query into a trace; strengths decay lazily by step.
+
+import numpy as np
+import pytest
+
+from encoders.factory import CharWaveEncoder
+from store.memory import MemoryStore
+
+DOCS = [(f"d{i}", f"wave {i} phase memory trace {i * 7 % 13}") for i in range(20)]
+
+
+def make_store(decay=0.2, eta=0.1):
+    mem = MemoryStore(N=64, eta=eta, decay=decay, encoder=CharWaveEncoder(N=64))
+    mem.add_documents(DOCS)
+    return mem
+
+
+@pytest.mark.parametrize("eta", [None, 0.5])
+def test_update_trace_blends_query_and_strength(eta):
+    mem = make_store()
+    mem.decay_traces(2)
+    row = mem.rows["d3"]
+    old, q = mem.wave(row), mem._encode("resonant query")
+    s = float(mem.strength[row])
+    assert s == pytest.approx(0.8 ** 2)
+
+    mem.update_trace("d3", q, eta=eta)
+    e = mem.eta if eta is None else eta
+    want = (1 - e) * old + e * q
+    want /= np.linalg.norm(want)
+    assert np.allclose(mem.wave(row), want, atol=1e-5)
+    assert mem.strength[row] == pytest.approx(s + e * (1 - s))
+    assert mem.last_used[row] == mem.step
+    assert mem.strength[mem.rows["d4"]] == pytest.approx(s)
+
+
+def test_lazy_decay_formula():
+    mem = make_store(decay=0.25)
+    mem.decay_traces(2)
+    mem.add_document("late", "a passage added two steps later", strength=0.5)
+    mem.decay_traces(1)
+    mem.decay_traces(2)
+
+    assert mem.step == 5
+    assert np.allclose(mem.strength[:len(DOCS)], 0.75 ** 5)
+    assert mem.strength[mem.rows["late"]] == pytest.approx(0.5 * 0.75 ** 3)
+    assert np.array_equal(mem.last_used[:len(DOCS)], np.zeros(len(DOCS)))
+
+    mem.add_document("now", "a passage added at the current step", strength=0.3)
+    assert mem.strength[mem.rows["now"]] == np.float32(0.3)
+    assert mem.search("a passage added at the current step", topk=1)[0][0][3] == pytest.approx(0.3)
+
+
+def test_no_decay_keeps_strength():
+    mem = make_store(decay=0.0)
+    mem.decay_traces(10)
+    assert np.array_equal(mem.strength, np.ones(len(DOCS), dtype=np.float32))